@@ -4,38 +4,241 @@
 #Scaffold and Driver given by Professor Soroush Vosoughi
 #Alpha Beta Search module for chess
 
+import itertools
+import json
+import time
 import chess
-from math import inf
+from operator import itemgetter
+from EndgameTables import EndgameTables, MATE
+from IncrementalEval import IncrementalEval
+from OpeningBook import OpeningBook
+from PawnStructure import PawnHashTable, PAWN_EVAL_MODES, file_threat
+from SearchBoard import SearchBoard
+from SearchStats import SearchStats
+from TranspositionTable import TranspositionTable, position_key, unpack_move, EXACT, LOWER, UPPER
+
+# piece values used only to order moves
+ORDER_VALUES = {
+    chess.PAWN: 100,
+    chess.KNIGHT: 350,
+    chess.BISHOP: 360,
+    chess.ROOK: 500,
+    chess.QUEEN: 900,
+    chess.KING: 0,
+}
+
+MAX_PLY = 128
+
+# scores are integer centipawns for the side to move, a mate ply plies from the
+# root scores MATE - ply (-MATE + ply for the side getting mated), so shorter
+# mates score higher. INF lies outside every score and only bounds windows
+INF = MATE + 1
+# scores at least this far from 0 are mates, not evals
+MATE_BOUND = MATE - 2 * MAX_PLY
+
+# width of the zero window used by principal variation search, one centipawn
+NULL_WINDOW = 1
+
+# late move reductions start after this many moves at a node
+LMR_MIN_INDEX = 3
+
+# "game": the search ends a line where chess.Board.is_game_over() would (fivefold
+# repetition, 75 moves); "search": any repetition since the last capture or pawn
+# move, or 50 moves, is scored as a draw right away
+DRAW_RULES = ("game", "search")
+
+def is_mate_score(score) -> bool:
+    return abs(score) >= MATE_BOUND
+
+
+# moves until mate of a mate score, negative when the side to move is mated
+def mate_in(score: int) -> int:
+    moves = (MATE - abs(score) + 1) // 2
+    return moves if score > 0 else -moves
+
+
+# "mate in 3" / "mated in 2" / "35" for reports
+def score_text(score) -> str:
+    if not is_mate_score(score):
+        return str(score)
+    moves = mate_in(score)
+    return f"mate in {moves}" if moves > 0 else f"mated in {-moves}"
+
+
+# mate scores in the transposition table are counted from the stored position,
+# not from the root, so they stay right when it is reached at another ply
+def score_to_tt(score: int, ply: int) -> int:
+    if score >= MATE_BOUND:
+        return score + ply
+    if score <= -MATE_BOUND:
+        return score - ply
+    return score
+
+
+def score_from_tt(score: int, ply: int) -> int:
+    if score >= MATE_BOUND:
+        return score - ply
+    if score <= -MATE_BOUND:
+        return score + ply
+    return score
+
+
+# eval weights file (Tuner.py output): {"weights": {...}, "material_values": {"pawn": 100, ...},
+# "piece_square_tables": {"pawn": [64 values], ...}}, every section optional
+def load_weights(path: str):
+    with open(path) as f:
+        data = json.load(f)
+    material = {chess.PIECE_NAMES.index(name): value for name, value in data.get("material_values", {}).items()}
+    tables = {chess.PIECE_NAMES.index(name): list(table)
+              for name, table in data.get("piece_square_tables", {}).items()}
+    for table in tables.values():
+        if len(table) != 64:
+            raise ValueError(f"{path}: piece square tables need 64 entries")
+    return data.get("weights", {}), material, tables
+
+
+def save_weights(path: str, weights: dict, material_values: dict = None, piece_square_tables: dict = None):
+    data = {"weights": weights}
+    if material_values:
+        data["material_values"] = {chess.piece_name(pt): value for pt, value in material_values.items()}
+    if piece_square_tables:
+        data["piece_square_tables"] = {chess.piece_name(pt): list(table) for pt, table in piece_square_tables.items()}
+    with open(path, "w") as f:
+        json.dump(data, f, indent=1)
+
 
 #alphabeta ai class, for chess game
 #if not specificed, depth of 3
 class AlphaBetaAI():
-    def __init__(self, depth = 3, eval_fcn = None, weights = None, extension_cap: int = 2):
+    def __init__(self, depth = 3, eval_fcn = None, weights = None, extension_cap: int = 2,
+                 hash_mb: float = 16, tt = None, incremental: bool = True,
+                 mobility_mode: str = None, mobility_piece_weights = None,
+                 quiescence: bool = True, qdepth: int = 8, delta_margin: int = 200,
+                 pvs: bool = True, null_move: bool = True, lmr: bool = True, futility: bool = True,
+                 stats: bool = True, book=None, book_selection: str = "weighted",
+                 endgame=None, pawn_eval: str = "compat", pawn_hash_entries: int = 16384,
+                 batch_eval: bool = False, search_board: bool = True, draw_rule: str = "game"):
         self.depth = depth
+        # with quiescence on, leaves are resolved by a capture/evasion only search
+        # (at most qdepth plies, delta pruned with delta_margin), otherwise the old
+        # all-captures extension rule capped by extension_cap is used
         self.extension_cap = extension_cap
+        self.quiescence = quiescence
+        self.qdepth = qdepth
+        self.delta_margin = delta_margin
+        self.pvs = pvs
+        # forward pruning, each one can be switched off on its own
+        self.null_move = null_move
+        self.lmr = lmr
+        self.futility = futility
+        self.prune_counts = {}
+        # per search counters (SearchStats in self.stats), stats=False skips the
+        # few that cost anything (eval calls, seldepth, extensions)
+        self.collect_stats = stats
+        self.stats = None
+        self._search_start = None
+        self._tt_base = (0, 0)
+        # listeners called with the finished SearchStats after every choose_move
+        self.on_search_end = []
         default_weights = {
             "material": 1.0,
             "piece_square": 0.1,
             "king_safety": 0.2,
             "mobility": 0.05,
+            "pawn_structure": 0.5,
         }
+        # weights may also be a path to a weights file (see load_weights)
+        material_values, piece_square_tables = {}, {}
+        if isinstance(weights, str):
+            weights, material_values, piece_square_tables = load_weights(weights)
         if weights:
             default_weights.update(weights)
         self.weights = default_weights
+        # "legal" (default) is the old legal move count of both sides, "attacks"
+        # counts pseudo-legal target squares from attack bitboards (much cheaper,
+        # different numbers, so opt in); batch_eval only has "attacks" and picks it
+        if mobility_mode is None:
+            mobility_mode = "attacks" if batch_eval else "legal"
+        if mobility_mode not in ("attacks", "legal"):
+            raise ValueError(f"unknown mobility_mode {mobility_mode!r}")
+        self.mobility_mode = mobility_mode
+        self.mobility_piece_weights = {pt: 1 for pt in chess.PIECE_TYPES}
+        if mobility_piece_weights:
+            self.mobility_piece_weights.update(mobility_piece_weights)
+        # pawn structure and king shelter from pawn bitboards, cached per pawn
+        # formation + king squares; "compat" (default) is the old king safety
+        # only, "full" adds the pawn terms under weights["pawn_structure"]
+        if pawn_eval not in PAWN_EVAL_MODES:
+            raise ValueError(f"unknown pawn_eval {pawn_eval!r}")
+        self.pawn_eval = pawn_eval
+        self.pawn_table = PawnHashTable(pawn_hash_entries)
+        self._pawn_base = (0, 0)
         self.eval_fcn = eval_fcn or self.pieces_eval
         self.pv = None
-        self.piece_square_tables = self._create_piece_square_tables()
-    # simple move ordering helper (PV, checks)
-    def order_moves(self, board, moves, pv=None):
-        
-        values = {
+        self.material_values = {
             chess.PAWN: 100,
-            chess.KNIGHT: 350,
-            chess.BISHOP: 360,
+            chess.KNIGHT: 320,
+            chess.BISHOP: 330,
             chess.ROOK: 500,
             chess.QUEEN: 900,
             chess.KING: 0,
         }
+        self.material_values.update(material_values)
+        self.piece_square_tables = self._create_piece_square_tables()
+        self.piece_square_tables.update(piece_square_tables)
+        # material + pst kept as running sums during the search when the eval is
+        # plain pieces_eval (ours or an identically configured instance's)
+        self._inc = None
+        self._inc_active = False
+        if incremental and self._is_pieces_eval(self.eval_fcn):
+            self._inc = IncrementalEval(self.material_values, self.piece_square_tables)
+        # numpy scoring of all children of a frontier node in one batch (BatchEval.py),
+        # the search then reads their evals from it instead of computing them one by one
+        self._batch = None
+        self._batch_base = (0, 0)
+        if batch_eval:
+            if not self._is_pieces_eval(self.eval_fcn):
+                raise ValueError("batch_eval needs the built-in pieces_eval")
+            from BatchEval import BatchEvaluator
+            self._batch = BatchEvaluator(self)
+        # the search runs on a SearchBoard copy of the position (faster make/unmake,
+        # incremental hash key); a custom eval_fcn keeps getting the chess.Board
+        self.search_board = search_board and self._is_pieces_eval(self.eval_fcn)
+        # zobrist keys of every position from the start of the game to the current
+        # node, ply indexed, for repetition detection without walking the board's stack
+        if draw_rule not in DRAW_RULES:
+            raise ValueError(f"unknown draw_rule {draw_rule!r}")
+        self.draw_rule = draw_rule
+        self._keys = []
+        # transposition table, kept between moves so a game reuses earlier work
+        # pass tt to share one table between players, hash_mb = 0 disables it
+        self.tt = tt if tt is not None else (TranspositionTable(hash_mb) if hash_mb else None)
+        # root moves of a restricted search (IDAI root_moves), its root result is
+        # not the position's best move so it stays out of the table
+        self._root_moves = None
+        self._node_count = 0
+        self._qnode_count = 0
+        # move ordering state: two killer slots per ply and a butterfly history
+        # table indexed color * 4096 + from * 64 + to
+        self._killers = [[None, None] for _ in range(MAX_PLY)]
+        self._history = [0] * (2 * 64 * 64)
+        self._cutoffs = 0
+        self._first_move_cutoffs = 0
+        # polyglot book (path or OpeningBook), positions found in it are not searched
+        if isinstance(book, str):
+            book = OpeningBook(book, book_selection)
+        self.book = book
+        self.book_moves = 0
+        # KPK/KRK/KQK tables (path, True for the default cache, or EndgameTables),
+        # three piece positions inside the search get their exact score from them
+        if endgame is True:
+            endgame = EndgameTables()
+        elif isinstance(endgame, str):
+            endgame = EndgameTables(endgame)
+        self.endgame = endgame
+    # simple move ordering helper (PV, checks)
+    def order_moves(self, board, moves, pv=None):
+        values = ORDER_VALUES
 
         scored = []
         # score moves 
@@ -54,41 +257,142 @@ class AlphaBetaAI():
                 attacker = board.piece_at(move.from_square)
                 attacker_val = values.get(attacker.piece_type, 0) if attacker else 0
                 score += 1000 + (victim_val - attacker_val)
-            board.push(move)
-            if board.is_check():
+            if board.gives_check(move):
                 score += 50
-            board.pop()
             scored.append((score, move))
             # sort moves by score descending
         scored.sort(reverse=True, key=lambda x: x[0])
         return [m for _, m in scored]
-    
+
+    # staged, lazy move ordering used inside the search
+    # hash move -> captures/promotions by MVV-LVA -> killers -> quiets by history
+    # (checks first), later stages are only generated if no cutoff happened yet
+    # legal is the node's legal move list, every stage is filtered out of it
+    def _staged_moves(self, board: chess.Board, hash_move, ply: int, legal=None):
+        if legal is None:
+            legal = list(board.generate_legal_moves())
+        if hash_move is not None and board.is_legal(hash_move):
+            yield hash_move
+        else:
+            hash_move = None
+
+        for move in self._ordered_captures(board, legal):
+            if move != hash_move:
+                yield move
+
+        killers = self._killers[ply] if ply < MAX_PLY else (None, None)
+        tried = [hash_move]
+        for killer in killers:
+            if (killer is not None and killer not in tried and not killer.promotion
+                    and not board.is_capture(killer) and board.is_legal(killer)):
+                tried.append(killer)
+                yield killer
+
+        history = self._history
+        side = 0 if board.turn == chess.WHITE else 4096
+        ep_square = board.ep_square
+        quiets = []
+        # moves to empty squares, castling last (the order the old separate
+        # generation of quiet moves and castling moves gave)
+        occupied = board.occupied
+        king = board.king(board.turn)
+        castling = []
+        candidates = []
+        for move in legal:
+            if move.promotion or occupied & chess.BB_SQUARES[move.to_square]:
+                continue
+            if move.from_square == king and board.is_castling(move):
+                castling.append(move)
+            else:
+                candidates.append(move)
+        for move in itertools.chain(candidates, castling):
+            if move in tried:
+                continue
+            if move.to_square == ep_square and board.is_en_passant(move):
+                continue
+            score = history[side + (move.from_square << 6) + move.to_square]
+            if board.gives_check(move):
+                score += 1 << 30
+            quiets.append((score, move))
+        quiets.sort(key=itemgetter(0), reverse=True)
+        for _, move in quiets:
+            yield move
+
+    # legal captures and promotions, most valuable victim / least valuable attacker first
+    # taken from legal when the node already generated its moves
+    def _ordered_captures(self, board: chess.Board, legal=None):
+        values = ORDER_VALUES
+        captures = []
+        if legal is None:
+            moves = board.generate_legal_captures()
+        else:
+            moves = self._captures_of(board, legal)
+        for move in moves:
+            victim = board.piece_type_at(move.to_square) or chess.PAWN  # en passant
+            attacker = board.piece_type_at(move.from_square)
+            score = values[victim] * 10 - values[attacker]
+            if move.promotion:
+                score += values[move.promotion] * 10
+            captures.append((score, move))
+        # quiet promotions are tried with the captures
+        promotions = board.pieces_mask(chess.PAWN, board.turn) & (chess.BB_RANK_7 if board.turn else chess.BB_RANK_2)
+        if promotions:
+            if legal is None:
+                moves = board.generate_legal_moves(promotions, chess.BB_ALL & ~board.occupied)
+            else:
+                enemy = board.occupied_co[not board.turn]
+                moves = [move for move in legal if move.promotion and not enemy & chess.BB_SQUARES[move.to_square]]
+            for move in moves:
+                captures.append((values[move.promotion] * 10, move))
+        captures.sort(key=itemgetter(0), reverse=True)
+        return [move for _, move in captures]
+
+    # the captures among legal, in their order (en passant goes by the ep square)
+    def _captures_of(self, board: chess.Board, legal):
+        enemy = board.occupied_co[not board.turn]
+        squares = chess.BB_SQUARES
+        ep_square = board.ep_square
+        return [move for move in legal if enemy & squares[move.to_square]
+                or (move.to_square == ep_square and board.is_en_passant(move))]
+
+    # a move caused a cutoff at this node: update killers/history and stats
+    def _record_cutoff(self, board: chess.Board, move: chess.Move, depth: int, ply: int, index: int):
+        self._cutoffs += 1
+        if index == 0:
+            self._first_move_cutoffs += 1
+        if move.promotion or board.is_capture(move):
+            return
+        if ply < MAX_PLY:
+            killers = self._killers[ply]
+            if killers[0] != move:
+                killers[1] = killers[0]
+                killers[0] = move
+        side = 0 if board.turn == chess.WHITE else 4096
+        self._history[side + (move.from_square << 6) + move.to_square] += depth * depth
+
+    # halve history scores so older iterations/moves count less
+    def _age_history(self):
+        self._history = [h >> 1 for h in self._history]
+
+    def first_move_cutoff_rate(self) -> float:
+        return self._first_move_cutoffs / self._cutoffs if self._cutoffs else 0.0
+
     #returns best move for curr board state
     #alpha + beta work with minimax to prune branches
-    #alpha is the best score the max could get
-    #beta is the best score the min could get
-    #basically same as minimax otherwise
+    #alpha is the best score the side to move is sure of
+    #beta is the best score the opponent lets it get
+    #negamax: one search fcn, the score is flipped at every ply
     
     def choose_move(self, board: chess.Board):
-        c = board.turn
-        bestVal = -inf
-        bestMove = None
-        alpha = -inf
-        beta = inf
+        move = self._book_move(board)
+        if move is not None:
+            return move
+        board = self._search_position(board)
+        self._begin_search(board)
         moves = list(board.legal_moves)
         ordered = self.order_moves(board, moves, pv=self.pv)
-
-        for move in ordered:
-            board.push(move)
-            value = self.min_value(board, self.depth - 1, c, alpha, beta, 1)
-            board.pop()
-
-            if value > bestVal:
-                bestVal = value
-                bestMove = move
-
-            if bestVal > alpha:
-                alpha = bestVal
+        bestVal, bestMove = self.search_root(board, ordered, self.depth, -INF, INF)
+        self._end_search()
 
         if bestMove is not None:
             self.pv = bestMove
@@ -101,71 +405,482 @@ class AlphaBetaAI():
             bestMove = legal[0]
         return bestMove
 
+    # the board the search itself works on, see search_board
+    def _search_position(self, board: chess.Board):
+        if self.search_board and type(board) is chess.Board:
+            return SearchBoard.from_board(board)
+        return board
+
+    def _book_move(self, board: chess.Board):
+        if self.book is None:
+            return None
+        move = self.book.choose(board)
+        if move is not None:
+            self.book_moves += 1
+        return move
+
+    # searches the root moves in the given order inside (alpha, beta)
+    # returns (score, move), fail-soft: score <= alpha / >= beta are bounds
+    def search_root(self, board: chess.Board, moves, depth: int, alpha: int, beta: int):
+        alpha_orig = alpha
+        # nothing beats a mate on the first move, finding one ends the search
+        if beta > MATE - 1:
+            beta = MATE - 1
+        bestVal = -INF
+        bestMove = None
+        for index, move in enumerate(moves):
+            self._push(board, move)
+            value = self._search_child(board, depth - 1, alpha, beta, 1, index)
+            self._pop(board)
+
+            if value > bestVal:
+                bestVal = value
+                bestMove = move
+                if value > alpha:
+                    alpha = value
+                if value >= beta:
+                    break
+
+        if bestMove is not None and self.tt is not None and self._root_moves is None:
+            self._tt_store(position_key(board), depth, bestVal, alpha_orig, beta, bestMove, 0)
+        return bestVal, bestMove
+
 
-    def cutoff_test(self, board: chess.Board, depth: int, ply: int):
-        if board.is_game_over():
+    # legal: the node's legal moves if already generated, game end then comes from it
+    def cutoff_test(self, board: chess.Board, depth: int, ply: int, legal=None):
+        if self._game_over(board, legal):
             return True
         if ply >= self.depth + self.extension_cap:
             return True
         if depth > 0:
             return False
-        if self._should_extend(board):
+        if not self.quiescence and self._should_extend(board, legal):
+            if self.stats is not None:
+                self.stats.extensions += 1
             return False
         return True
-    #max value fcn - tries to maximize score
-    def max_value(self, board: chess.Board, depth: int, c: bool, alpha: float, beta: float, ply: int):
-        if self.cutoff_test(board, depth, ply):
-            return self.evaluate(board, c)
-        v = -inf
-        moves = list(board.legal_moves)
+    # chess.Board.is_game_over() without generating moves again or walking the
+    # board's move stack: no legal move, bare kings etc, 75 moves, fivefold repetition
+    def _game_over(self, board: chess.Board, legal=None) -> bool:
+        if legal is None or not self._keys:
+            return board.is_game_over()
+        if not legal or board.is_insufficient_material():
+            return True
+        return board.halfmove_clock >= 150 or self._is_repetition(board, 5)
+
+    # the current position count - 1 more times since the last capture or pawn move,
+    # only every other ply can hold the same side to move
+    def _is_repetition(self, board: chess.Board, count: int = 3) -> bool:
+        keys = self._keys
+        last = len(keys) - 1
+        key = keys[last]
+        for index in range(last - 2, max(0, last - board.halfmove_clock) - 1, -2):
+            if keys[index] == key:
+                count -= 1
+                if count <= 1:
+                    return True
+        return False
+
+    # draw_rule "search": a draw inside the tree is any repetition or 50 moves
+    def _is_search_draw(self, board: chess.Board) -> bool:
+        return board.halfmove_clock >= 100 or self._is_repetition(board, 2)
+
+    # keys of the game's positions up to the root, the start of the search's key stack
+    def _game_keys(self, board: chess.Board):
+        if type(board) is SearchBoard:
+            return board.history_keys()
+        replay = board.root()
+        keys = [position_key(replay)]
+        for move in board.move_stack:
+            replay.push(move)
+            keys.append(position_key(replay))
+        return keys
 
-        for move in self.order_moves(board, moves, pv=self.pv):
+    # per search setup shared by choose_move implementations
+    def _begin_search(self, board: chess.Board):
+        self._node_count = 0
+        self._qnode_count = 0
+        self.prune_counts = {"null_cutoffs": 0, "lmr_reductions": 0, "lmr_researches": 0,
+                             "futility_prunes": 0, "razor_cutoffs": 0}
+        self._search_start = time.perf_counter()
+        self._keys = self._game_keys(board)
+        self.stats = SearchStats() if self.collect_stats else None
+        if self.tt is not None:
+            self._tt_base = (self.tt.probes, self.tt.hits)
+        self._pawn_base = (self.pawn_table.probes, self.pawn_table.hits)
+        if self._batch is not None:
+            self._batch_base = (self._batch.positions, self._batch.hits)
+        self._cutoffs = 0
+        self._first_move_cutoffs = 0
+        # killers are ply indexed so they mean nothing for a new root
+        for killers in self._killers:
+            killers[0] = killers[1] = None
+        self._age_history()
+        if self.tt is not None:
+            self.tt.new_search()
+        if self._inc is not None:
+            self._inc.reset(board)
+            self._inc_active = True
+
+    def _end_search(self, notify: bool = True):
+        self._inc_active = False
+        if self.stats is not None:
+            self._sync_stats()
+            for listener in self.on_search_end if notify else ():
+                listener(self.stats)
+
+    # copies the running counters into self.stats
+    def _sync_stats(self):
+        stats = self.stats
+        stats.nodes = self._node_count
+        stats.qnodes = self._qnode_count
+        stats.beta_cutoffs = self._cutoffs
+        stats.first_move_cutoffs = self._first_move_cutoffs
+        if self.tt is not None:
+            stats.tt_probes = self.tt.probes - self._tt_base[0]
+            stats.tt_hits = self.tt.hits - self._tt_base[1]
+        stats.pawn_probes = self.pawn_table.probes - self._pawn_base[0]
+        stats.pawn_hits = self.pawn_table.hits - self._pawn_base[1]
+        if self._batch is not None:
+            stats.batch_evals = self._batch.positions - self._batch_base[0]
+            stats.batch_hits = self._batch.hits - self._batch_base[1]
+        for name, count in self.prune_counts.items():
+            setattr(stats, name, count)
+        stats.seconds = time.perf_counter() - self._search_start
+        return stats
+
+    # best line from the transposition table, following stored best moves
+    def principal_variation(self, board: chess.Board, max_length: int = MAX_PLY):
+        pv = []
+        if self.tt is None:
+            return [self.pv] if self.pv is not None and board.is_legal(self.pv) else pv
+        seen = set()
+        while len(pv) < max_length:
+            key = position_key(board)
+            if key in seen:
+                break
+            seen.add(key)
+            move = unpack_move(self.tt.best_move(key))
+            if move is None or not board.is_legal(move):
+                break
             board.push(move)
-            v = max(v, self.min_value(board, depth - 1, c, alpha, beta, ply + 1))
+            pv.append(move)
+        for _ in pv:
             board.pop()
-            if v >= beta:
-                return v
-            if v > alpha:
-                alpha = v
-        return v
-    # min value fcn - tries to minimize score
-    def min_value(self, board: chess.Board, depth: int, c: bool, alpha: float, beta: float, ply: int):
-        if self.cutoff_test(board, depth, ply):
-            return self.evaluate(board, c)
-        v = inf
-        moves = list(board.legal_moves)
+        return pv
 
-        for move in self.order_moves(board, moves, pv=self.pv):
+    # make/unmake used inside the search, keeps incremental eval sums in step
+    def _push(self, board: chess.Board, move: chess.Move):
+        if self._inc_active:
+            self._inc.push(board, move)
+        else:
             board.push(move)
-            v = min(v, self.max_value(board, depth - 1, c, alpha, beta, ply + 1))
-            board.pop()
-            if v <= alpha:
-                return v
-            if v < beta:
-                beta = v
+        self._keys.append(position_key(board))
+
+    def _pop(self, board: chess.Board):
+        self._keys.pop()
+        if self._inc_active:
+            return self._inc.pop(board)
+        return board.pop()
+
+    # called on entry to every interior/leaf node, subclasses hook limits in here
+    def _enter_node(self):
+        self._node_count += 1
+
+    def _enter_qnode(self):
+        self._qnode_count += 1
+
+    # looks up the position in the transposition table, scores are stored from
+    # the side to move's view so both players can share one table
+    # returns (key, cutoff value or None, hash move)
+    def _tt_probe(self, board: chess.Board, depth: int, alpha: int, beta: int, ply: int):
+        key = position_key(board)
+        entry = self.tt.probe(key)
+        if entry is None:
+            return key, None, None
+        tt_depth, bound, score, code = entry
+        if tt_depth >= depth:
+            score = score_from_tt(score, ply)
+            if bound == EXACT:
+                return key, score, None
+            if bound == LOWER and score >= beta:
+                return key, score, None
+            if bound == UPPER and score <= alpha:
+                return key, score, None
+        return key, None, unpack_move(code)
+
+    def _tt_store(self, key: int, depth: int, value: int, alpha: int, beta: int, move, ply: int):
+        if value <= alpha:
+            bound = UPPER
+        elif value >= beta:
+            bound = LOWER
+        else:
+            bound = EXACT
+        self.tt.store(key, depth, bound, score_to_tt(value, ply), move)
+
+    # searches one child (already pushed) with principal variation search:
+    # the first move gets the full window, later moves a null window that is only
+    # widened again if they turn out better than alpha
+    # a late move reduction first tries the child reduction plies shallower
+    def _search_child(self, board: chess.Board, depth: int, alpha: int, beta: int, ply: int,
+                      index: int, reduction: int = 0):
+        if reduction:
+            self.prune_counts["lmr_reductions"] += 1
+            if self.pvs:
+                value = -self.negamax(board, depth - reduction, -alpha - NULL_WINDOW, -alpha, ply)
+            else:
+                value = -self.negamax(board, depth - reduction, -beta, -alpha, ply)
+            if value <= alpha:
+                return value
+            self.prune_counts["lmr_researches"] += 1
+        if index == 0 or not self.pvs:
+            return -self.negamax(board, depth, -beta, -alpha, ply)
+        value = -self.negamax(board, depth, -alpha - NULL_WINDOW, -alpha, ply)
+        if alpha < value < beta:
+            value = -self.negamax(board, depth, -beta, -alpha, ply)
+        return value
+
+    # margins for frontier futility pruning (depth 1, 2) and razoring, in eval units
+    def _futility_margin(self, depth: int) -> int:
+        piece = chess.BISHOP if depth <= 1 else chess.ROOK
+        return round(self.weights["material"] * self.material_values[piece])
+
+    def _razor_margin(self, depth: int) -> int:
+        return round(self.weights["material"] * self.material_values[chess.PAWN] * (2 + depth))
+
+    #negamax fcn - score of the position for the side to move
+    def negamax(self, board: chess.Board, depth: int, alpha: int, beta: int, ply: int):
+        self._enter_node()
+        stats = self.stats
+        if stats is not None and ply > stats.seldepth:
+            stats.seldepth = ply
+        if self.endgame is not None and ply:
+            value = self._probe_endgame(board, ply)
+            if value is not None:
+                return value
+        if ply:
+            if self.draw_rule == "search" and self._is_search_draw(board):
+                return 0
+            # mate distance pruning: nothing here beats being mated now or
+            # mating on the next ply, so a window outside that is already decided
+            if alpha < -MATE + ply:
+                alpha = -MATE + ply
+            if beta > MATE - ply - 1:
+                beta = MATE - ply - 1
+            if alpha >= beta:
+                return alpha
+        # the only move generation of this node, game end and every move stage use it
+        legal = list(board.generate_legal_moves())
+        if self.cutoff_test(board, depth, ply, legal):
+            if self.quiescence and depth <= 0:
+                return self.quiesce(board, alpha, beta, 0, ply, legal)
+            return self.evaluate(board, board.turn, legal, ply)
+        use_tt = self.tt is not None and depth > 0
+        hash_move = None
+        if use_tt:
+            key, cached, hash_move = self._tt_probe(board, depth, alpha, beta, ply)
+            if cached is not None:
+                return cached
+
+        turn = board.turn
+        in_check = board.is_check()
+        pv_node = beta - alpha > NULL_WINDOW
+        static_eval = None
+        if not in_check and not pv_node:
+            if self.futility and depth <= 2:
+                static_eval = self._static_eval(board, turn)
+                # razoring: hopelessly below alpha, check the captures only
+                if self.quiescence and static_eval + self._razor_margin(depth) <= alpha:
+                    value = self.quiesce(board, alpha, beta, 0, ply, legal)
+                    if value <= alpha:
+                        self.prune_counts["razor_cutoffs"] += 1
+                        return value
+            # null move: give the opponent a free move, if we still beat beta the
+            # real moves will too. skipped without pieces (zugzwang) and twice in a row
+            if (self.null_move and depth >= 3 and board.move_stack and board.move_stack[-1]
+                    and board.occupied_co[turn] & ~(board.pawns | board.kings)):
+                if static_eval is None:
+                    static_eval = self._static_eval(board, turn)
+                if static_eval >= beta:
+                    reduction = 3 if depth > 6 else 2
+                    self._push(board, chess.Move.null())
+                    value = -self.negamax(board, depth - 1 - reduction, -beta, -beta + NULL_WINDOW, ply + 1)
+                    self._pop(board)
+                    if value >= beta:
+                        self.prune_counts["null_cutoffs"] += 1
+                        # an unproven mate from a null move search is not trusted
+                        return beta if value >= MATE_BOUND else value
+
+        futile = (self.futility and static_eval is not None and depth <= 2
+                  and static_eval + self._futility_margin(depth) <= alpha)
+        # a node expected to fail high stops after a move or two, prefetching
+        # there would mostly score children that are never visited
+        if (self._batch is not None and depth == 1
+                and (pv_node or (static_eval is not None and static_eval < beta))):
+            self._prefetch_children(board, futile, legal)
+        killers = self._killers[ply] if ply < MAX_PLY else ()
+        alpha_orig = alpha
+        v = -INF
+        best = None
+
+        for index, move in enumerate(self._staged_moves(board, hash_move, ply, legal)):
+            quiet = not move.promotion and not board.is_capture(move)
+            self._push(board, move)
+            reduction = 0
+            if quiet and not in_check and index and not board.is_check():
+                if futile:
+                    # this quiet move can't lift the frontier node above alpha
+                    self._pop(board)
+                    self.prune_counts["futility_prunes"] += 1
+                    bound = static_eval + self._futility_margin(depth)
+                    if bound > v:
+                        v = bound
+                    continue
+                if self.lmr and depth >= 3 and index >= LMR_MIN_INDEX and move not in killers:
+                    reduction = 2 if index >= 3 * LMR_MIN_INDEX and depth >= 5 else 1
+            value = self._search_child(board, depth - 1, alpha, beta, ply + 1, index, reduction)
+            self._pop(board)
+            if value > v:
+                v = value
+                best = move
+                if v >= beta:
+                    self._record_cutoff(board, move, depth, ply, index)
+                    break
+                if v > alpha:
+                    alpha = v
+        if use_tt:
+            self._tt_store(key, depth, v, alpha_orig, beta, best, ply)
         return v
-    
+
+    # frontier node: the children's static evals in one batch, quiet moves are
+    # left out when futility pruning will skip them anyway
+    def _prefetch_children(self, board: chess.Board, futile: bool, legal=None):
+        moves = list(board.generate_legal_moves()) if legal is None else legal
+        if futile:
+            moves = [m for m in moves if m.promotion or board.is_capture(m)]
+        if len(moves) > 1:
+            self._batch.prefetch(board, moves)
+
+    def _probe_endgame(self, board: chess.Board, ply: int):
+        if chess.popcount(board.occupied) != 3:
+            return None
+        value = self.endgame.probe_score(board, ply)
+        if value is not None and self.stats is not None:
+            self.stats.endgame_hits += 1
+        return value
+
+    # max/min view kept for callers that think in terms of the root color c
+    def max_value(self, board: chess.Board, depth: int, c: bool, alpha: int, beta: int, ply: int):
+        return self.negamax(board, depth, alpha, beta, ply)
+
+    def min_value(self, board: chess.Board, depth: int, c: bool, alpha: int, beta: int, ply: int):
+        return -self.negamax(board, depth, -beta, -alpha, ply)
+
+    # quiescence search, scores from the side to move's point of view
+    # stand pat on the static eval, then only captures/promotions (all evasions
+    # when in check) until the position is quiet or qdepth plies are used
+    # legal: the horizon node's legal moves, passed on by negamax
+    def quiesce(self, board: chess.Board, alpha: int, beta: int, qply: int, ply: int = 0, legal=None):
+        if qply:
+            self._enter_qnode()
+            stats = self.stats
+            if stats is not None and ply + qply > stats.seldepth:
+                stats.seldepth = ply + qply
+            if self.endgame is not None:
+                value = self._probe_endgame(board, ply + qply)
+                if value is not None:
+                    return value
+        turn = board.turn
+        in_check = board.is_check()
+
+        if in_check:
+            if legal is None:
+                legal = list(board.generate_legal_moves())
+            if qply >= self.qdepth:
+                return self.evaluate(board, turn, legal, ply + qply)
+            best = -INF
+            moves = self._ordered_captures(board, legal)
+            ordered = set(moves)
+            moves += [m for m in legal if m not in ordered]
+            if not moves:
+                return self.evaluate(board, turn, legal, ply + qply)
+        else:
+            # the horizon node still gets the full terminal check (stalemate etc.)
+            stand_pat = self.evaluate(board, turn, legal, ply) if qply == 0 else self._static_eval(board, turn)
+            if stand_pat >= beta or qply >= self.qdepth:
+                return stand_pat
+            if stand_pat > alpha:
+                alpha = stand_pat
+            best = stand_pat
+            moves = self._ordered_captures(board, legal)
+
+        material_weight = self.weights["material"]
+        values = self.material_values
+        for move in moves:
+            if not in_check and not move.promotion:
+                # delta pruning: even winning the victim for free can't reach alpha
+                victim = board.piece_type_at(move.to_square) or chess.PAWN
+                if stand_pat + material_weight * values[victim] + self.delta_margin <= alpha:
+                    continue
+            self._push(board, move)
+            value = -self.quiesce(board, -beta, -alpha, qply + 1, ply)
+            self._pop(board)
+            if value > best:
+                best = value
+                if value >= beta:
+                    return value
+                if value > alpha:
+                    alpha = value
+        return best
+
+    # eval without the terminal checks, for quiet positions inside quiescence
+    def _static_eval(self, board: chess.Board, c: bool):
+        if self.stats is not None:
+            self.stats.eval_calls += 1
+        if self._batch is not None:
+            score = self._batch.cached(board)
+            if score is not None:
+                return score if c == chess.WHITE else -score
+        if self._inc_active:
+            return self.incremental_eval(board, c)
+        return self.eval_fcn(board, c)
 
     # if terminal state, return utility val, else use pieces
-    def evaluate(self, board: chess.Board, c: bool):
-        util = self.terminal(board, c)
+    # ply is the distance from the root, a mate there scores MATE - ply
+    def evaluate(self, board: chess.Board, c: bool, legal=None, ply: int = 0):
+        util = self.terminal(board, c, legal, ply)
         if util is not None:
             return util
-        return self.eval_fcn(board, c)
+        return self._static_eval(board, c)
     
-    # evals for terminal state
-    def terminal(self, board: chess.Board, c: bool):
+    # evals for terminal state, mate / stalemate straight from legal when given
+    def terminal(self, board: chess.Board, c: bool, legal=None, ply: int = 0):
+        if legal is not None:
+            if not legal:
+                if board.is_check():
+                    return MATE - ply if (not board.turn) == c else -MATE + ply
+                return 0
+            return 0 if board.is_insufficient_material() else None
         if board.is_checkmate():
             winner = not board.turn
-            return inf if winner == c else -inf
+            return MATE - ply if winner == c else -MATE + ply
         if board.is_stalemate() or board.is_insufficient_material():
-            return 0.0
+            return 0
         return None
     
     def pieces_eval(self, board: chess.Board, c: bool):
         material = self._material_score(board)
         piece_square = self._piece_square_score(board)
-        king_safety = self._king_safety_score(board)
+        return self._combine_eval(board, c, material, piece_square)
+
+    # same as pieces_eval but material/pst come from the running sums
+    def incremental_eval(self, board: chess.Board, c: bool, inc: IncrementalEval = None):
+        inc = inc or self._inc
+        return self._combine_eval(board, c, float(inc.material), float(inc.piece_square))
+
+    def _combine_eval(self, board: chess.Board, c: bool, material: float, piece_square: float):
+        pawns, shelter = self._pawn_entry(board)
+        king_safety = shelter + self._file_threats(board)
         mobility = self._mobility_score(board)
 
         score = (
@@ -173,23 +888,31 @@ class AlphaBetaAI():
             + self.weights["piece_square"] * piece_square
             + self.weights["king_safety"] * king_safety
             + self.weights["mobility"] * mobility
+            + self.weights["pawn_structure"] * pawns
         )
-        return float(score) if c == chess.WHITE else float(-score)
+        # rounded to whole centipawns, the same for both colors
+        score = round(score)
+        return score if c == chess.WHITE else -score
 
     def composite_eval(self, board: chess.Board, c: bool):
         return self.pieces_eval(board, c)
 
+    # true if fcn is pieces_eval of an instance configured like this one, so
+    # the incremental sums give the same numbers it would
+    def _is_pieces_eval(self, fcn) -> bool:
+        if getattr(fcn, "__func__", None) is not AlphaBetaAI.pieces_eval:
+            return False
+        owner = fcn.__self__
+        return owner is self or (owner.weights == self.weights
+                                 and owner.material_values == self.material_values
+                                 and owner.mobility_mode == self.mobility_mode
+                                 and owner.pawn_eval == self.pawn_eval
+                                 and owner.mobility_piece_weights == self.mobility_piece_weights
+                                 and owner.piece_square_tables == self.piece_square_tables)
+
     def _material_score(self, board: chess.Board) -> float:
-        values = {
-            chess.PAWN: 100,
-            chess.KNIGHT: 320,
-            chess.BISHOP: 330,
-            chess.ROOK: 500,
-            chess.QUEEN: 900,
-            chess.KING: 0,
-        }
         score = 0
-        for piece_type, val in values.items():
+        for piece_type, val in self.material_values.items():
             score += len(board.pieces(piece_type, chess.WHITE)) * val
             score -= len(board.pieces(piece_type, chess.BLACK)) * val
         return float(score)
@@ -203,11 +926,25 @@ class AlphaBetaAI():
                 score -= table[chess.square_mirror(square)]
         return float(score)
 
+    # (pawn structure, shelter) of the position, white's point of view
+    def _pawn_entry(self, board: chess.Board):
+        white = board.pawns & board.occupied_co[chess.WHITE]
+        black = board.pawns & board.occupied_co[chess.BLACK]
+        return self.pawn_table.lookup(white, black, board.king(chess.WHITE), board.king(chess.BLACK),
+                                      self.pawn_eval == "full")
+
+    def _file_threats(self, board: chess.Board) -> int:
+        return (file_threat(board, chess.WHITE, board.king(chess.WHITE))
+                - file_threat(board, chess.BLACK, board.king(chess.BLACK)))
+
     def _king_safety_score(self, board: chess.Board) -> float:
-        white = self._king_safety_for_color(board, chess.WHITE)
-        black = self._king_safety_for_color(board, chess.BLACK)
-        return white - black
+        return float(self._pawn_entry(board)[1] + self._file_threats(board))
+
+    def _pawn_structure_score(self, board: chess.Board) -> float:
+        return float(self._pawn_entry(board)[0])
 
+    # square by square king safety the bitboard version replaced, kept as the
+    # reference the compat mode is checked against (PawnStructure.py __main__)
     def _king_safety_for_color(self, board: chess.Board, color: bool) -> float:
         king_square = board.king(color)
         if king_square is None:
@@ -263,6 +1000,39 @@ class AlphaBetaAI():
         return float(penalty)
 
     def _mobility_score(self, board: chess.Board) -> float:
+        if self.mobility_mode == "legal":
+            return self._legal_mobility_score(board)
+        return self._attack_mobility_score(board)
+
+    # pseudo-legal mobility straight from the bitboards, the board is never touched
+    # pieces count attacked squares not holding an own piece, pawns count single
+    # pushes to empty squares plus captures, each optionally weighted by piece type
+    def _attack_mobility_score(self, board: chess.Board) -> float:
+        weights = self.mobility_piece_weights
+        occupied = board.occupied
+        score = 0
+        for color in chess.COLORS:
+            own = board.occupied_co[color]
+            enemy = board.occupied_co[not color]
+            total = 0
+            for piece_type in (chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN, chess.KING):
+                count = 0
+                for square in chess.scan_forward(board.pieces_mask(piece_type, color)):
+                    count += chess.popcount(board.attacks_mask(square) & ~own)
+                total += weights[piece_type] * count
+
+            pawns = board.pieces_mask(chess.PAWN, color)
+            if color == chess.WHITE:
+                pushes = (pawns << 8) & ~occupied & chess.BB_ALL
+                captures = (((pawns & ~chess.BB_FILE_A) << 7) | ((pawns & ~chess.BB_FILE_H) << 9)) & enemy
+            else:
+                pushes = (pawns >> 8) & ~occupied
+                captures = (((pawns & ~chess.BB_FILE_H) >> 7) | ((pawns & ~chess.BB_FILE_A) >> 9)) & enemy
+            total += weights[chess.PAWN] * (chess.popcount(pushes) + chess.popcount(captures))
+            score += total if color == chess.WHITE else -total
+        return float(score)
+
+    def _legal_mobility_score(self, board: chess.Board) -> float:
         original_turn = board.turn
         try:
             board.turn = chess.WHITE
@@ -337,10 +1107,10 @@ class AlphaBetaAI():
             ],
         }
 
-    def _should_extend(self, board: chess.Board) -> bool:
+    def _should_extend(self, board: chess.Board, legal=None) -> bool:
         if board.is_check():
             return True
-        legal_moves = list(board.legal_moves)
+        legal_moves = list(board.legal_moves) if legal is None else legal
         if not legal_moves:
             return False
         captures = [move for move in legal_moves if board.is_capture(move)]
@@ -0,0 +1,447 @@
+#Code Modified/writter by Larbalestier, Noah; F006B9P
+#26 October 2025
+#PA3 COSC 076, 25F
+#Scaffold and Driver given by Professor Soroush Vosoughi
+#Local HTTP/JSON analysis service: asyncio front-end, IDAI worker processes, result cache
+
+import asyncio
+import json
+import math
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from http import HTTPStatus
+
+import chess
+from AlphaBetaAI import is_mate_score, mate_in
+from IDAI import IDAI
+from TranspositionTable import position_key, unpack_move
+
+DEFAULT_PORT = 8080
+# limits used when a request gives none, and the caps on what it may ask for
+DEFAULT_DEPTH = 4
+MAX_DEPTH = 64
+MAX_MULTIPV = 16
+MAX_BODY = 64 * 1024
+# latency percentiles are taken over this many of the last requests
+LATENCY_WINDOW = 10000
+
+
+# ---- worker processes: one warm IDAI each, its transposition table outlives requests
+
+_AI = None
+
+
+# fixed_depth: a request's depth is searched as asked (it is part of the cache key)
+def _worker_init(config: dict):
+    global _AI
+    _AI = IDAI(verbose=False, ponder=False, fixed_depth=True, **config)
+
+
+# {"cp": 35} / {"mate": -2} from the side to move's view, like uci scores
+def score_json(score):
+    if score is None:
+        return None
+    if is_mate_score(score):
+        return {"mate": mate_in(score)}
+    return {"cp": score}
+
+
+# multipv lines by searching again without the better lines' first moves,
+# a movetime is split evenly between the lines
+def analyse(fen: str, depth: int, movetime, nodes, multipv: int) -> dict:
+    ai = _AI
+    board = chess.Board(fen)
+    ai.depth = depth
+    ai.max_nodes = nodes
+    budget = movetime / 1000.0 / multipv if movetime else None
+    start = time.perf_counter()
+    remaining = list(board.legal_moves)
+    lines = []
+    total_nodes = 0
+    while remaining and len(lines) < multipv:
+        # the first line is a normal search, only the later ones restrict the root
+        move = ai.choose_move(board, time_budget=budget, root_moves=remaining if lines else None)
+        total_nodes += ai._node_count + ai._qnode_count
+        info = ai.iterations[-1] if ai.iterations else None
+        pv = info.pv if info is not None and info.pv and info.pv[0] == move else [move]
+        lines.append({
+            "multipv": len(lines) + 1,
+            "move": move.uci(),
+            "depth": info.depth if info is not None else 0,
+            "score": score_json(info.score if info is not None else None),
+            "pv": [m.uci() for m in pv],
+        })
+        remaining.remove(move)
+    return {
+        "fen": fen,
+        "bestmove": lines[0]["move"] if lines else None,
+        "lines": lines,
+        "nodes": total_nodes,
+        "seconds": round(time.perf_counter() - start, 4),
+    }
+
+
+# (board, (depth, movetime, nodes, multipv)) from a request body, ValueError if bad
+def parse_request(body: bytes):
+    try:
+        request = json.loads(body or b"{}")
+    except ValueError:
+        raise ValueError("body is not json")
+    if not isinstance(request, dict) or "fen" not in request:
+        raise ValueError("need a json object with a fen")
+    try:
+        board = chess.Board(request["fen"])
+        for uci in request.get("moves", []):
+            board.push_uci(uci)
+    except ValueError as error:
+        raise ValueError(f"bad position: {error}")
+    if not board.is_valid():
+        raise ValueError("invalid position")
+    if board.is_game_over():
+        raise ValueError("the game is over in this position")
+
+    limits = []
+    for name in ("depth", "movetime", "nodes", "multipv"):
+        value = request.get(name)
+        if value is not None and (not isinstance(value, int) or value <= 0):
+            raise ValueError(f"{name} must be a positive integer")
+        limits.append(value)
+    depth, movetime, nodes, multipv = limits
+    if depth is None:
+        # a time or node budget alone runs until it is used up
+        depth = MAX_DEPTH if movetime or nodes else DEFAULT_DEPTH
+    return board, (min(depth, MAX_DEPTH), movetime, nodes, min(multipv or 1, MAX_MULTIPV))
+
+
+# nearest rank percentile of sorted values
+def percentile(values, p: float) -> float:
+    if not values:
+        return 0.0
+    return values[max(0, math.ceil(p / 100.0 * len(values)) - 1)]
+
+
+#POST /analyse runs a search in the worker pool, GET /metrics reports the service
+#identical requests in flight share one search, finished ones come from an LRU cache
+#keyed on the zobrist key and the limits (no history: repetitions aren't seen)
+class AnalysisServer():
+    def __init__(self, workers: int = 2, cache_size: int = 4096, hash_mb: float = 16, endgame=None):
+        config = {"hash_mb": hash_mb}
+        if endgame:
+            config["endgame"] = endgame
+        self.workers = workers
+        self.pool = ProcessPoolExecutor(workers, initializer=_worker_init, initargs=(config,))
+        self.cache_size = cache_size
+        self._cache = OrderedDict()
+        self._inflight = {}
+        self._latencies = deque(maxlen=LATENCY_WINDOW)
+        self._server = None
+        self.requests = 0
+        self.searches = 0
+        self.cache_hits = 0
+        self.coalesced = 0
+        self.errors = 0
+
+    async def analyse(self, board: chess.Board, limits) -> dict:
+        key = (position_key(board), limits)
+        result = self._cache.get(key)
+        if result is not None:
+            self._cache.move_to_end(key)
+            self.cache_hits += 1
+            return result
+        future = self._inflight.get(key)
+        if future is not None:
+            self.coalesced += 1
+            return await asyncio.shield(future)
+
+        self.searches += 1
+        future = asyncio.get_running_loop().run_in_executor(self.pool, analyse, board.fen(), *limits)
+        self._inflight[key] = future
+        try:
+            result = await asyncio.shield(future)
+        finally:
+            del self._inflight[key]
+        self._cache[key] = result
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+        return result
+
+    def metrics(self) -> dict:
+        latencies = sorted(self._latencies)
+        lookups = self.cache_hits + self.coalesced + self.searches
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "workers": self.workers,
+            # searches submitted to the pool, the ones past the worker count wait
+            "in_flight": len(self._inflight),
+            "queue_depth": max(0, len(self._inflight) - self.workers),
+            "searches": self.searches,
+            "cache_hits": self.cache_hits,
+            "coalesced": self.coalesced,
+            "cache_hit_rate": self.cache_hits / lookups if lookups else 0.0,
+            "cache_entries": len(self._cache),
+            "latency_ms": {name: round(percentile(latencies, p) * 1000, 2)
+                           for name, p in (("p50", 50), ("p90", 90), ("p99", 99), ("max", 100))},
+        }
+
+    # one connection, requests are answered in order until it closes (keep-alive)
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request = await read_message(reader)
+                if request is None:
+                    break
+                (method, path, version), headers, body = request
+                status, payload = await self.dispatch(method, path, body)
+                keep_alive = version == "HTTP/1.1" and headers.get("connection", "").lower() != "close"
+                write_response(writer, status, payload, keep_alive)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        except asyncio.CancelledError:
+            # server shutting down with the connection idle, nothing left to answer
+            pass
+        except ValueError as error:
+            write_response(writer, HTTPStatus.BAD_REQUEST, {"error": str(error)}, False)
+        finally:
+            writer.close()
+
+    async def dispatch(self, method: str, path: str, body: bytes):
+        if path == "/metrics":
+            if method != "GET":
+                return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "use GET"}
+            return HTTPStatus.OK, self.metrics()
+        if path != "/analyse":
+            return HTTPStatus.NOT_FOUND, {"error": f"no route {path}"}
+        if method != "POST":
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "use POST"}
+
+        start = time.perf_counter()
+        self.requests += 1
+        try:
+            board, limits = parse_request(body)
+            result = await self.analyse(board, limits)
+            status = HTTPStatus.OK
+        except ValueError as error:
+            self.errors += 1
+            return HTTPStatus.BAD_REQUEST, {"error": str(error)}
+        except Exception as error:
+            self.errors += 1
+            return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{error.__class__.__name__}: {error}"}
+        self._latencies.append(time.perf_counter() - start)
+        return status, result
+
+    async def start(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT):
+        self._server = await asyncio.start_server(self.handle, host, port)
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self, host: str = "127.0.0.1", port: int = DEFAULT_PORT):
+        port = await self.start(host, port)
+        print(f"analysis server on http://{host}:{port}/analyse ({self.workers} workers)")
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+        self.pool.shutdown(wait=True, cancel_futures=True)
+
+
+# ---- minimal HTTP/1.1 over asyncio streams, used by the server and the load test
+
+# ((method or version, path or status, version or reason), headers, body), None at eof
+async def read_message(reader):
+    line = await reader.readline()
+    if not line:
+        return None
+    start = line.decode("latin-1").rstrip("\r\n").split(" ", 2)
+    if len(start) != 3:
+        raise ValueError("bad start line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    length = int(headers.get("content-length", 0))
+    if length > MAX_BODY:
+        raise ValueError("body too large")
+    body = await reader.readexactly(length) if length else b""
+    return tuple(start), headers, body
+
+
+def write_response(writer, status: HTTPStatus, payload: dict, keep_alive: bool):
+    body = json.dumps(payload).encode()
+    head = (f"HTTP/1.1 {status.value} {status.phrase}\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\nConnection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    writer.write(head.encode("latin-1") + body)
+
+
+async def http_request(reader, writer, method: str, path: str, payload=None):
+    body = json.dumps(payload).encode() if payload is not None else b""
+    head = (f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Type: application/json\r\n"
+            f"Content-Length: {len(body)}\r\n\r\n")
+    writer.write(head.encode("latin-1") + body)
+    await writer.drain()
+    (_, status, _), _, data = await read_message(reader)
+    return int(status), json.loads(data)
+
+
+# concurrency keep-alive clients send requests bodies from a shared list
+# returns the client side view (throughput, latencies, status counts) and /metrics
+async def load_test(host: str, port: int, bodies, concurrency: int = 8) -> dict:
+    pending = deque(bodies)
+    latencies = []
+    statuses = {}
+
+    async def client():
+        reader, writer = await asyncio.open_connection(host, port)
+        try:
+            while pending:
+                body = pending.popleft()
+                start = time.perf_counter()
+                status, _ = await http_request(reader, writer, "POST", "/analyse", body)
+                latencies.append(time.perf_counter() - start)
+                statuses[status] = statuses.get(status, 0) + 1
+        finally:
+            writer.close()
+            await writer.wait_closed()
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client() for _ in range(concurrency)))
+    seconds = time.perf_counter() - start
+    reader, writer = await asyncio.open_connection(host, port)
+    _, metrics = await http_request(reader, writer, "GET", "/metrics")
+    writer.close()
+    await writer.wait_closed()
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "seconds": round(seconds, 3),
+        "requests_per_second": round(len(latencies) / seconds, 1) if seconds else 0.0,
+        "statuses": statuses,
+        "latency_ms": {name: round(percentile(latencies, p) * 1000, 2)
+                       for name, p in (("p50", 50), ("p90", 90), ("p99", 99), ("max", 100))},
+        "server": metrics,
+    }
+
+
+# requests over the bench positions, each asked repeats times (so later ones hit
+# the cache or join a search in flight)
+def load_bodies(repeats: int, limits: dict, seed: int = 1):
+    import random
+    from bench import BENCH_POSITIONS
+    fens = [fen for group in BENCH_POSITIONS.values() for fen in group]
+    bodies = [dict(limits, fen=fen) for fen in fens for _ in range(repeats)]
+    random.Random(seed).shuffle(bodies)
+    return bodies
+
+
+# multipv lines after the first search a restricted root, they must leave the
+# root entry the full search stored untouched; their entries below the root are
+# right for any root and stay shared like those of earlier requests
+def check_multipv_table(fen: str, depth: int = 4, multipv: int = 3):
+    _worker_init({"hash_mb": 4})
+    ai = _AI
+    ai.depth = depth
+    board = chess.Board(fen)
+    key = position_key(board)
+    best = ai.choose_move(board)
+    entry = ai.tt.probe(key)
+    assert entry is not None and unpack_move(entry[3]) == best, (best, entry)
+    lines = [best]
+    remaining = [move for move in board.legal_moves if move != best]
+    while remaining and len(lines) < multipv:
+        move = ai.choose_move(board, root_moves=remaining)
+        assert ai.tt.probe(key) == entry, (move, entry, ai.tt.probe(key))
+        lines.append(move)
+        remaining.remove(move)
+    assert ai.principal_variation(board, 1) == [best], ai.principal_variation(board, 1)
+    return [move.uci() for move in lines]
+
+
+# in process server on a free port: answers, errors, coalescing and the cache
+async def selftest(workers: int = 2):
+    server = AnalysisServer(workers=workers, cache_size=64, hash_mb=4)
+    port = await server.start("127.0.0.1", 0)
+    try:
+        reader, writer = await asyncio.open_connection("127.0.0.1", port)
+        status, result = await http_request(reader, writer, "POST", "/analyse",
+                                            {"fen": "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1", "depth": 3})
+        assert status == 200 and result["bestmove"] == "d1d8" and result["lines"][0]["score"] == {"mate": 1}, result
+        print("mate in 1       ->", result["lines"][0])
+        status, result = await http_request(reader, writer, "POST", "/analyse",
+                                            {"fen": chess.STARTING_FEN, "depth": 2, "multipv": 3})
+        assert status == 200 and len({line["move"] for line in result["lines"]}) == 3, result
+        print("multipv 3       ->", [(line["move"], line["score"]) for line in result["lines"]])
+        # the requested depth is the searched one, also with 46 legal moves
+        status, result = await http_request(reader, writer, "POST", "/analyse",
+                                            {"fen": "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+                                             "depth": 4, "multipv": 2})
+        assert status == 200 and [line["depth"] for line in result["lines"]] == [4, 4], result
+        for body, expected in (({"fen": "not a fen"}, 400), ({"fen": chess.STARTING_FEN, "depth": -1}, 400)):
+            status, result = await http_request(reader, writer, "POST", "/analyse", body)
+            assert status == expected, (body, status, result)
+        status, _ = await http_request(reader, writer, "GET", "/nowhere")
+        assert status == 404
+        writer.close()
+        await writer.wait_closed()
+
+        searches = server.searches
+        report = await load_test("127.0.0.1", port, load_bodies(4, {"depth": 2}), concurrency=6)
+        assert report["statuses"] == {200: report["requests"]}, report
+        # 12 positions asked 4 times each: one search per position, the rest shared
+        assert server.searches - searches == 12, server.metrics()
+        print("load test       ->", {k: report[k] for k in ("requests", "requests_per_second", "latency_ms")})
+        print("server metrics  ->", report["server"])
+    finally:
+        await server.close()
+    print("ok")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="local HTTP/JSON analysis service")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="run the server")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--workers", type=int, default=2)
+    serve.add_argument("--cache", type=int, default=4096, help="cached results")
+    serve.add_argument("--hash", type=float, default=16, help="transposition table MB per worker")
+    serve.add_argument("--endgame", action="store_true", help="probe the KPK/KRK/KQK tables")
+    load = sub.add_parser("loadtest", help="hammer a running server with the bench positions")
+    load.add_argument("--host", default="127.0.0.1")
+    load.add_argument("--port", type=int, default=DEFAULT_PORT)
+    load.add_argument("--repeats", type=int, default=10, help="times each position is asked")
+    load.add_argument("--concurrency", type=int, default=8)
+    load.add_argument("--depth", type=int, default=3)
+    load.add_argument("--multipv", type=int, default=1)
+    test = sub.add_parser("selftest", help="start a server in process and check it")
+    test.add_argument("--workers", type=int, default=2)
+    args = parser.parse_args()
+
+    if args.command == "serve":
+        server = AnalysisServer(args.workers, args.cache, args.hash, endgame=args.endgame or None)
+        try:
+            asyncio.run(server.serve_forever(args.host, args.port))
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.pool.shutdown(wait=False, cancel_futures=True)
+    elif args.command == "loadtest":
+        bodies = load_bodies(args.repeats, {"depth": args.depth, "multipv": args.multipv})
+        print(json.dumps(asyncio.run(load_test(args.host, args.port, bodies, args.concurrency)), indent=1))
+    else:
+        from bench import BENCH_POSITIONS
+        fens = [fen for group in BENCH_POSITIONS.values() for fen in group]
+        for fen in fens:
+            check_multipv_table(fen)
+        print(f"multipv root    -> table entry unchanged on {len(fens)} positions")
+        asyncio.run(selftest(args.workers))
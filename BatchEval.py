@@ -0,0 +1,291 @@
+#Code Modified/writter by Larbalestier, Noah; F006B9P
+#26 October 2025
+#PA3 COSC 076, 25F
+#Scaffold and Driver given by Professor Soroush Vosoughi
+#NumPy batched evaluation of sibling positions (needs numpy)
+
+import chess
+import numpy as np
+from PawnStructure import FILE_THREAT_PENALTY
+
+# piece index in the 12 x 64 encoding: white pawn..king, then black pawn..king
+PIECE_INDEX = {(color, pt): (0 if color == chess.WHITE else 6) + pt - 1
+               for color in chess.COLORS for pt in chess.PIECE_TYPES}
+
+_ALL = np.uint64(chess.BB_ALL)
+_NOT_A = np.uint64(chess.BB_ALL & ~chess.BB_FILE_A)
+_NOT_H = np.uint64(chess.BB_ALL & ~chess.BB_FILE_H)
+_NOT_AB = np.uint64(chess.BB_ALL & ~(chess.BB_FILE_A | chess.BB_FILE_B))
+_NOT_GH = np.uint64(chess.BB_ALL & ~(chess.BB_FILE_G | chess.BB_FILE_H))
+
+# (square delta, mask of target squares that didn't wrap around the board)
+NORTH, SOUTH, EAST, WEST = (8, _ALL), (-8, _ALL), (1, _NOT_A), (-1, _NOT_H)
+ROOK_DIRS = (NORTH, SOUTH, EAST, WEST)
+BISHOP_DIRS = ((9, _NOT_A), (7, _NOT_H), (-7, _NOT_A), (-9, _NOT_H))
+KNIGHT_STEPS = ((17, _NOT_A), (15, _NOT_H), (10, _NOT_AB), (6, _NOT_GH),
+                (-6, _NOT_AB), (-10, _NOT_GH), (-15, _NOT_A), (-17, _NOT_H))
+KING_STEPS = ROOK_DIRS + BISHOP_DIRS
+
+
+def _shift(bb, delta: int):
+    return bb << np.uint64(delta) if delta > 0 else bb >> np.uint64(-delta)
+
+
+def _popcount(values):
+    return np.bitwise_count(values).astype(np.int64)
+
+
+# squares attacked along one direction by every piece in gen (kogge-stone fill),
+# the rays of different pieces in one direction never overlap
+def _ray_attacks(gen, empty, delta: int, mask):
+    pro = empty & mask
+    gen = gen | (pro & _shift(gen, delta))
+    pro = pro & _shift(pro, delta)
+    gen = gen | (pro & _shift(gen, 2 * delta))
+    pro = pro & _shift(pro, 2 * delta)
+    gen = gen | (pro & _shift(gen, 4 * delta))
+    return _shift(gen, delta) & mask
+
+
+# the 12 bitboards of a position in PIECE_INDEX order
+def bitboards(board: chess.Board):
+    white = board.occupied_co[chess.WHITE]
+    black = board.occupied_co[chess.BLACK]
+    masks = (board.pawns, board.knights, board.bishops, board.rooks, board.queens, board.kings)
+    return [m & white for m in masks] + [m & black for m in masks]
+
+
+# (pawns, knights, bishops, rooks, queens, kings, white), what the score depends on
+def _bitboards_key(bbs):
+    return (bbs[0] | bbs[6], bbs[1] | bbs[7], bbs[2] | bbs[8], bbs[3] | bbs[9], bbs[4] | bbs[10],
+            bbs[5] | bbs[11], bbs[0] | bbs[1] | bbs[2] | bbs[3] | bbs[4] | bbs[5])
+
+
+# the 12 bitboards after a legal move, without pushing it on the board
+def child_bitboards(board: chess.Board, parent, move: chess.Move):
+    bbs = list(parent)
+    us = board.turn
+    from_bb = chess.BB_SQUARES[move.from_square]
+    to_bb = chess.BB_SQUARES[move.to_square]
+    piece_type = board.piece_type_at(move.from_square)
+    own = 0 if us == chess.WHITE else 6
+    enemy = 6 - own
+    bbs[own + piece_type - 1] ^= from_bb
+    if board.occupied_co[not us] & to_bb:
+        bbs[enemy + board.piece_type_at(move.to_square) - 1] ^= to_bb
+    elif piece_type == chess.PAWN and move.to_square == board.ep_square:
+        captured = move.to_square - 8 if us == chess.WHITE else move.to_square + 8
+        bbs[enemy] ^= chess.BB_SQUARES[captured]
+    if move.promotion:
+        bbs[own + move.promotion - 1] |= to_bb
+        return bbs
+    bbs[own + piece_type - 1] |= to_bb
+    if piece_type == chess.KING and abs(move.to_square - move.from_square) == 2:
+        rank = chess.square_rank(move.from_square)
+        if move.to_square > move.from_square:
+            rook_move = chess.BB_SQUARES[chess.square(7, rank)] | chess.BB_SQUARES[chess.square(5, rank)]
+        else:
+            rook_move = chess.BB_SQUARES[chess.square(0, rank)] | chess.BB_SQUARES[chess.square(3, rank)]
+        bbs[own + chess.ROOK - 1] ^= rook_move
+    return bbs
+
+
+#evaluates many positions in one go: material + piece-square as dot products of
+#the 12x64 occupancy with the engine's tables, attack mobility and rook/queen
+#file threats from shifted bitboards, pawn structure / king shelter through the
+#engine's pawn hash table. the numbers are exactly the ones AlphaBetaAI.pieces_eval
+#gives (same float operations in the same order), "attacks" mobility only
+class BatchEvaluator():
+    def __init__(self, ai):
+        if ai.mobility_mode != "attacks":
+            raise ValueError("batched evaluation needs mobility_mode='attacks'")
+        self.ai = ai
+        material = np.zeros(12, dtype=np.int64)
+        piece_square = np.zeros(768, dtype=np.int64)
+        for (color, pt), index in PIECE_INDEX.items():
+            sign = 1 if color == chess.WHITE else -1
+            material[index] = sign * ai.material_values.get(pt, 0)
+            table = ai.piece_square_tables.get(pt)
+            if table is None:
+                continue
+            for sq in chess.SQUARES:
+                piece_square[index * 64 + sq] = sign * table[sq if color == chess.WHITE else chess.square_mirror(sq)]
+        self._material = material
+        self._piece_square = piece_square
+        # scores of the last prefetched set of siblings, keyed like position_key below
+        self._cache = {}
+        self.batches = 0
+        self.positions = 0
+        self.hits = 0
+
+    # drop-in eval_fcn: score of one position for color c
+    def __call__(self, board: chess.Board, c: bool) -> float:
+        score = self.evaluate_bitboards([bitboards(board)])[0]
+        return score if c == chess.WHITE else -score
+
+    # white's point of view scores of the children reached by moves
+    def evaluate_children(self, board: chess.Board, moves):
+        parent = bitboards(board)
+        return self.evaluate_bitboards([child_bitboards(board, parent, move) for move in moves])
+
+    # scores the children in one batch and keeps them until the next prefetch
+    def prefetch(self, board: chess.Board, moves):
+        parent = bitboards(board)
+        children = [child_bitboards(board, parent, move) for move in moves]
+        scores = self.evaluate_bitboards(children)
+        self._cache = {_bitboards_key(bbs): score for bbs, score in zip(children, scores)}
+
+    # prefetched white's point of view score of the position, None if it wasn't
+    def cached(self, board: chess.Board):
+        score = self._cache.get((board.pawns, board.knights, board.bishops, board.rooks,
+                                 board.queens, board.kings, board.occupied_co[chess.WHITE]))
+        if score is not None:
+            self.hits += 1
+        return score
+
+    def clear(self):
+        self._cache = {}
+
+    # white's point of view scores of positions given as lists of 12 bitboards
+    def evaluate_bitboards(self, positions):
+        self.batches += 1
+        self.positions += len(positions)
+        ai = self.ai
+        weights = ai.weights
+        bbs = np.array(positions, dtype=np.uint64).T
+        white = np.bitwise_or.reduce(bbs[0:6], axis=0)
+        black = np.bitwise_or.reduce(bbs[6:12], axis=0)
+        occupied = white | black
+
+        material = (_popcount(bbs).T @ self._material).astype(np.float64)
+        bits = np.unpackbits(bbs.T.astype("<u8").view(np.uint8), axis=1, bitorder="little")
+        piece_square = (bits @ self._piece_square).astype(np.float64)
+
+        lookup = ai.pawn_table.lookup
+        full = ai.pawn_eval == "full"
+        entries = [lookup(wp, bp, wk.bit_length() - 1 if wk else None, bk.bit_length() - 1 if bk else None, full)
+                   for wp, bp, wk, bk in zip(bbs[0].tolist(), bbs[6].tolist(), bbs[5].tolist(), bbs[11].tolist())]
+        pawns = np.array([entry[0] for entry in entries], dtype=np.int64)
+        shelter = np.array([entry[1] for entry in entries], dtype=np.int64)
+        king_safety = shelter + self._file_threats(bbs, ~occupied)
+
+        score = (
+            weights["material"] * material
+            + weights["piece_square"] * piece_square
+            + weights["king_safety"] * king_safety
+            + weights["mobility"] * self._mobility(bbs, white, black, occupied)
+            + weights["pawn_structure"] * pawns
+        )
+        # whole centipawns, rint rounds halves to even like round() in pieces_eval
+        return np.rint(score).astype(np.int64).tolist()
+
+    # rook/queen first in front of each king on its file, white minus black
+    def _file_threats(self, bbs, empty):
+        white_ray = _ray_attacks(bbs[5], empty, *NORTH)
+        black_ray = _ray_attacks(bbs[11], empty, *SOUTH)
+        white_hit = (white_ray & (bbs[9] | bbs[10])) != 0
+        black_hit = (black_ray & (bbs[3] | bbs[4])) != 0
+        return FILE_THREAT_PENALTY * (white_hit.astype(np.int64) - black_hit.astype(np.int64))
+
+    # same summation order as AlphaBetaAI._attack_mobility_score
+    def _mobility(self, bbs, white, black, occupied):
+        weights = self.ai.mobility_piece_weights
+        empty = ~occupied
+        # rows: white then black
+        own = np.stack([white, black])
+        free = ~own
+        counts = {}
+        for pt, steps in ((chess.KNIGHT, KNIGHT_STEPS), (chess.KING, KING_STEPS)):
+            gen = bbs[[pt - 1, 6 + pt - 1]]
+            count = 0
+            for delta, mask in steps:
+                count = count + _popcount(_shift(gen, delta) & mask & free)
+            counts[pt] = count
+        for pt, dirs in ((chess.BISHOP, BISHOP_DIRS), (chess.ROOK, ROOK_DIRS)):
+            # rows: own pieces of type pt, white then black, then queens
+            gen = bbs[[pt - 1, 6 + pt - 1, 4, 10]]
+            side_free = np.concatenate([free, free])
+            count = 0
+            for delta, mask in dirs:
+                count = count + _popcount(_ray_attacks(gen, empty, delta, mask) & side_free)
+            counts[pt] = count[0:2]
+            counts[chess.QUEEN] = count[2:4] + counts.get(chess.QUEEN, 0)
+
+        wp, bp = bbs[0], bbs[6]
+        counts[chess.PAWN] = np.stack([
+            _popcount(_shift(wp, 8) & empty) + _popcount(((_shift(wp, 7) & _NOT_H) | (_shift(wp, 9) & _NOT_A)) & black),
+            _popcount(_shift(bp, -8) & empty) + _popcount(((_shift(bp, -7) & _NOT_A) | (_shift(bp, -9) & _NOT_H)) & white),
+        ])
+        total = 0
+        for pt in (chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN, chess.KING):
+            total = total + weights[pt] * counts[pt]
+        total = total + weights[chess.PAWN] * counts[chess.PAWN]
+        return (total[0] - total[1]).astype(np.float64)
+
+
+if __name__ == "__main__":
+    import random
+    import sys
+    import time
+    from AlphaBetaAI import AlphaBetaAI
+
+    # per leaf cost of scoring every child of a node: scalar push/pieces_eval/pop
+    # against one batched call, and a check that both give the same numbers
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    rng = random.Random(5)
+    ai = AlphaBetaAI(hash_mb=0, mobility_mode="attacks")
+    batch = BatchEvaluator(ai)
+    parents = []
+    while len(parents) < count:
+        board = chess.Board()
+        for _ in range(rng.randrange(4, 80)):
+            moves = list(board.legal_moves)
+            if not moves:
+                break
+            board.push(rng.choice(moves))
+        if not board.is_game_over():
+            parents.append(board)
+
+    leaves = 0
+    scalar_time = 0.0
+    batch_time = 0.0
+    for board in parents:
+        moves = list(board.legal_moves)
+        start = time.perf_counter()
+        expected = []
+        for move in moves:
+            board.push(move)
+            expected.append(ai.pieces_eval(board, chess.WHITE))
+            board.pop()
+        scalar_time += time.perf_counter() - start
+        start = time.perf_counter()
+        actual = batch.evaluate_children(board, moves)
+        batch_time += time.perf_counter() - start
+        assert expected == actual, (board.fen(), [(m.uci(), e, a) for m, e, a in zip(moves, expected, actual) if e != a][:3])
+        leaves += len(moves)
+    print(f"{leaves} leaves of {len(parents)} nodes, batched scores identical to pieces_eval")
+    print(f"scalar  {scalar_time / leaves * 1e6:7.1f} us/leaf (push + pieces_eval + pop)")
+    print(f"batched {batch_time / leaves * 1e6:7.1f} us/leaf ({leaves / len(parents):.1f} children per batch)")
+
+    # whole searches: the frontier batches give the same tree, the time shows
+    # what is left after the batches that beta cutoffs make partly useless; so
+    # far that is nothing, batched searches take as long as scalar ones or longer
+    from IDAI import IDAI
+    fens = [chess.STARTING_FEN,
+            "r1bqkb1r/pppp1ppp/2n2n2/4p3/2B1P3/5N2/PPPP1PPP/RNBQK2R w KQkq - 4 4",
+            "r2q1rk1/pp2bppp/2n1pn2/3p4/3P4/2NBPN2/PP3PPP/R2Q1RK1 w - - 0 10"]
+    for depth in (3, 4):
+        results = []
+        for batch_eval in (False, True):
+            engine = IDAI(depth, verbose=False, batch_eval=batch_eval, hash_mb=16, mobility_mode="attacks")
+            start = time.perf_counter()
+            moves, nodes = [], 0
+            for fen in fens:
+                moves.append(engine.choose_move(chess.Board(fen)))
+                nodes += engine.stats.total_nodes
+            results.append((moves, nodes, time.perf_counter() - start, engine.stats))
+        (plain_moves, plain_nodes, plain_time, _), (batch_moves, batch_nodes, batch_time, stats) = results
+        assert plain_moves == batch_moves and plain_nodes == batch_nodes
+        print(f"depth {depth}: {plain_nodes} nodes, scalar {plain_time:.2f}s, batched {batch_time:.2f}s "
+              f"(x{batch_time / plain_time:.2f}, {stats.batch_hits}/{stats.batch_evals} prefetched evals "
+              f"used in the last search)")
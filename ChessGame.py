@@ -5,18 +5,62 @@
 #chessgame module for chess
 #added legal move check
 
+import datetime
+import os
 import chess
+import chess.pgn
+from HumanPlayer import HumanPlayer
 
 class ChessGame:
-    def __init__(self, player1, player2):
+    # pgn: path the game is appended to, rewritten in place after every move
+    # (result "*" until it is over) so a crash mid-game keeps the moves so far
+    # positions: .pos path or PositionFile.PositionWriter that gets every position
+    # with the mover's last search score and the final result
+    def __init__(self, player1, player2, pgn=None, positions=None, event: str = "ChessGame"):
         self.board = chess.Board()
         self.players = [player1, player2]
+        self.pgn_path = pgn
+        # byte offset of this game in the pgn file, set by the first write
+        self._pgn_offset = None
+        self.event = event
+        self.finished = False
+        self._own_writer = isinstance(positions, str)
+        if self._own_writer:
+            from PositionFile import PositionWriter
+            positions = PositionWriter(positions)
+        self.position_writer = positions
+        self.positions = []
+        self._last_score = None
+        # two engines in one process: pondering would run on the opponent's time and
+        # slow its search down (it shares the GIL), so it only stays on against a human
+        if not any(isinstance(player, HumanPlayer) for player in self.players):
+            for player in self.players:
+                if getattr(player, "ponder", False):
+                    player.ponder = False
+        if positions is not None:
+            for player in self.players:
+                if hasattr(player, "on_iteration"):
+                    player.on_iteration.append(self._record_score)
+
+    # IDAI listener, scores are from the mover's side
+    def _record_score(self, info):
+        self._last_score = info.score
 
     def make_move(self):
 
-        player = self.players[1 - int(self.board.turn)]
+        player = self.to_move()
+        self._last_score = None
         move = player.choose_move(self.board)
+        self.play(move)
+
+    # the player whose turn it is
+    def to_move(self):
+        return self.players[1 - int(self.board.turn)]
 
+    # plays a move the player to move chose elsewhere (the gui searches in a
+    # worker thread), make_move is choose_move + play
+    def play(self, move):
+        player = self.to_move()
         if move is None:
             # debug output to identify the broken AI and fallback to a legal move
             print(f"ERROR: {player.__class__.__name__}.choose_move returned None")
@@ -30,7 +74,56 @@ class ChessGame:
             move = legal[0]
             print(f"Falling back to first legal move: {move}")
 
+        if self.position_writer is not None:
+            score = self._last_score
+            if score is not None and self.board.turn == chess.BLACK:
+                score = -score
+            self.positions.append((self.board.copy(stack=False), score))
+        self._last_score = None
         self.board.push(move)  # Make the move
+        if self.pgn_path and not self.board.is_game_over():
+            self._write_pgn("*")
+
+        # tell the other player what was played (pondering engines check their guess)
+        opponent = self.players[1 - int(self.board.turn)]
+        if hasattr(opponent, "opponent_moved"):
+            opponent.opponent_moved(self.board, move)
+        if self.board.is_game_over():
+            self.finish()
+
+    # (re)writes this game at its offset in the pgn file, whatever follows it
+    # there (an older version of it) is cut off
+    def _write_pgn(self, result: str, termination: str = None):
+        game = chess.pgn.Game.from_board(self.board)
+        game.headers["Event"] = self.event
+        game.headers["Date"] = datetime.date.today().strftime("%Y.%m.%d")
+        game.headers["White"] = self.players[0].__class__.__name__
+        game.headers["Black"] = self.players[1].__class__.__name__
+        game.headers["Result"] = result
+        if termination:
+            game.headers["Termination"] = termination
+        with open(self.pgn_path, "r+b" if os.path.exists(self.pgn_path) else "w+b") as pgn:
+            if self._pgn_offset is None:
+                self._pgn_offset = pgn.seek(0, os.SEEK_END)
+            pgn.seek(self._pgn_offset)
+            pgn.truncate()
+            pgn.write((str(game) + "\n\n").encode())
+
+    # writes the game out for good: final pgn in self.pgn_path, positions to the
+    # writer; drivers that adjudicate call it with their own result
+    def finish(self, result: str = None, termination: str = None):
+        if self.finished:
+            return
+        self.finished = True
+        result = result or self.board.result()
+        if self.pgn_path:
+            self._write_pgn(result, termination)
+        if self.position_writer is not None:
+            self.position_writer.write_game(self.positions + [(self.board.copy(stack=False), None)], result)
+            self.position_writer.flush()
+            self.positions = []
+            if self._own_writer:
+                self.position_writer.close()
 
     def is_game_over(self):
         return self.board.is_game_over()
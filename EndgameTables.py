@@ -0,0 +1,368 @@
+#Code Modified/writter by Larbalestier, Noah; F006B9P
+#26 October 2025
+#PA3 COSC 076, 25F
+#Scaffold and Driver given by Professor Soroush Vosoughi
+#KPK / KRK / KQK distance to mate bitbases by retrograde analysis, cached to disk and mmap'ed
+
+import mmap
+import os
+import struct
+
+import chess
+
+# strong side's piece of each table, kpk needs krk and kqk for its promotions
+TABLES = (chess.QUEEN, chess.ROOK, chess.PAWN)
+TABLE_NAMES = {chess.PAWN: "KPK", chess.ROOK: "KRK", chess.QUEEN: "KQK"}
+
+# one byte per (side to move, strong king, weak king, piece): 0 is draw (or an
+# illegal placement), n > 0 means the strong side mates n - 1 plies from here
+SIDE_SIZE = 64 * 64 * 64
+TABLE_SIZE = 2 * SIDE_SIZE
+MAGIC = b"EGTB"
+VERSION = 1
+HEADER = struct.Struct("<4sI")
+
+DEFAULT_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "endgame.bin")
+
+# integer score of a mate on the board, a mate n plies from the root scores
+# MATE - n. the tables give exact distances, so a table win is scored as the
+# mate it leads to (AlphaBetaAI uses the same scale)
+MATE = 32000
+
+KING_ADJ = [[t for t in chess.SQUARES if chess.square_distance(s, t) == 1] for s in chess.SQUARES]
+ROOK_DIRS = ((1, 0), (-1, 0), (0, 1), (0, -1))
+QUEEN_DIRS = ROOK_DIRS + ((1, 1), (1, -1), (-1, 1), (-1, -1))
+
+
+def _rays(dirs):
+    rays = []
+    for sq in chess.SQUARES:
+        per_square = []
+        for df, dr in dirs:
+            ray = []
+            f, r = chess.square_file(sq) + df, chess.square_rank(sq) + dr
+            while 0 <= f < 8 and 0 <= r < 8:
+                ray.append(chess.square(f, r))
+                f, r = f + df, r + dr
+            per_square.append(ray)
+        rays.append(per_square)
+    return rays
+
+
+RAYS = {chess.ROOK: _rays(ROOK_DIRS), chess.QUEEN: _rays(QUEEN_DIRS)}
+
+
+def index(strong_to_move: bool, sk: int, wk: int, p: int) -> int:
+    return (0 if strong_to_move else SIDE_SIZE) + (sk << 12 | wk << 6 | p)
+
+
+def _near(a: int, b: int) -> bool:
+    return chess.square_distance(a, b) <= 1
+
+
+#move generation of the three piece positions, the strong side is always white
+class _Geometry():
+    def __init__(self, piece: int):
+        self.piece = piece
+        self.rays = RAYS.get(piece)
+        if piece == chess.PAWN:
+            self.lines = None
+        else:
+            # squares the slider could hit from p if nothing is in the way
+            self.lines = [0] * 64
+            for sq in chess.SQUARES:
+                for ray in self.rays[sq]:
+                    for t in ray:
+                        self.lines[sq] |= chess.BB_SQUARES[t]
+
+    # does the piece on p attack t with the strong king on sk as the only blocker
+    def attacks(self, p: int, t: int, sk: int) -> bool:
+        if self.piece == chess.PAWN:
+            return bool(chess.BB_PAWN_ATTACKS[chess.WHITE][p] & chess.BB_SQUARES[t])
+        if not self.lines[p] & chess.BB_SQUARES[t]:
+            return False
+        return not chess.between(p, t) & chess.BB_SQUARES[sk]
+
+    def legal(self, strong_to_move: bool, sk: int, wk: int, p: int) -> bool:
+        if sk == wk or sk == p or wk == p or _near(sk, wk):
+            return False
+        if self.piece == chess.PAWN and chess.square_rank(p) in (0, 7):
+            return False
+        # the side that just moved can't have left its king in check
+        return not (strong_to_move and self.attacks(p, wk, sk))
+
+    # weak king moves: successor strong-to-move squares, None for capturing the piece
+    def weak_moves(self, sk: int, wk: int, p: int):
+        for t in KING_ADJ[wk]:
+            if _near(t, sk):
+                continue
+            if t == p:
+                yield None
+            elif not self.attacks(p, t, sk):
+                yield t
+
+    # strong piece placements one move earlier (un-moves), promotions excluded
+    def piece_unmoves(self, sk: int, wk: int, p: int):
+        if self.piece == chess.PAWN:
+            f = p - 8
+            if chess.square_rank(f) >= 1 and f != sk and f != wk:
+                yield f
+                if chess.square_rank(p) == 3 and f - 8 != sk and f - 8 != wk:
+                    yield f - 8
+            return
+        for ray in self.rays[p]:
+            for f in ray:
+                if f == sk or f == wk:
+                    break
+                yield f
+
+
+# retrograde analysis of one table, promotions look their result up in done tables
+def generate_table(piece: int, done=None) -> bytearray:
+    geo = _Geometry(piece)
+    values = bytearray(TABLE_SIZE)
+    counts = bytearray(SIDE_SIZE)
+    levels = {}
+
+    # weak side to move: count its moves, checkmates are lost in 0
+    lost = []
+    for sk in chess.SQUARES:
+        for wk in chess.SQUARES:
+            for p in chess.SQUARES:
+                if not geo.legal(False, sk, wk, p):
+                    continue
+                n = sum(1 for _ in geo.weak_moves(sk, wk, p))
+                if n == 0:
+                    if geo.attacks(p, wk, sk):
+                        lost.append(sk << 12 | wk << 6 | p)
+                else:
+                    counts[sk << 12 | wk << 6 | p] = n
+
+    # promotions: a pawn push to the 8th rank is as good as the queen/rook table says
+    if piece == chess.PAWN:
+        for sk in chess.SQUARES:
+            for wk in chess.SQUARES:
+                for p in chess.SquareSet(chess.BB_RANK_7):
+                    t = p + 8
+                    if t == sk or t == wk or not geo.legal(True, sk, wk, p):
+                        continue
+                    best = None
+                    for promoted in (chess.QUEEN, chess.ROOK):
+                        v = done[promoted][index(False, sk, wk, t)]
+                        if v and (best is None or v < best):
+                            best = v
+                    if best is not None:
+                        levels.setdefault(best, []).append(sk << 12 | wk << 6 | p)
+
+    level = 0
+    while lost or any(lv > level for lv in levels):
+        for pos in lost:
+            values[SIDE_SIZE + pos] = level + 1
+        # strong side wins in level + 1 by moving into any of these
+        won = []
+        for pos in lost:
+            sk, wk, p = pos >> 12, (pos >> 6) & 63, pos & 63
+            for f in KING_ADJ[sk]:
+                if f != p and f != wk and not _near(f, wk) and geo.legal(True, f, wk, p):
+                    won.append(f << 12 | wk << 6 | p)
+            for f in geo.piece_unmoves(sk, wk, p):
+                if geo.legal(True, sk, wk, f):
+                    won.append(sk << 12 | wk << 6 | f)
+        won.extend(levels.pop(level + 1, ()))
+        fresh = []
+        for pos in won:
+            if not values[pos]:
+                values[pos] = level + 2
+                fresh.append(pos)
+        # weak side is lost once every one of its moves walks into a win
+        lost = []
+        for pos in fresh:
+            sk, wk, p = pos >> 12, (pos >> 6) & 63, pos & 63
+            for f in KING_ADJ[wk]:
+                if f == sk or f == p or _near(f, sk):
+                    continue
+                prev = sk << 12 | f << 6 | p
+                if counts[prev]:
+                    counts[prev] -= 1
+                    if not counts[prev]:
+                        lost.append(prev)
+        level += 2
+    return values
+
+
+def generate_all(path: str = DEFAULT_PATH, verbose: bool = False) -> str:
+    done = {}
+    for piece in TABLES:
+        done[piece] = generate_table(piece, done)
+        if verbose:
+            wins = sum(1 for v in done[piece][:SIDE_SIZE] if v)
+            print(f"{TABLE_NAMES[piece]}: {wins} won positions with the strong side to move, "
+                  f"longest mate {max(done[piece]) - 1} plies")
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as out:
+        out.write(HEADER.pack(MAGIC, VERSION))
+        for piece in TABLES:
+            out.write(done[piece])
+    os.replace(tmp, path)
+    return path
+
+
+#probes the cached tables, the file is mmap'ed read only
+class EndgameTables():
+    def __init__(self, path: str = DEFAULT_PATH, generate: bool = True):
+        if not os.path.exists(path):
+            if not generate:
+                raise FileNotFoundError(path)
+            generate_all(path)
+        self.path = path
+        self._file = open(path, "rb")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version = HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC or version != VERSION or len(self._map) != HEADER.size + len(TABLES) * TABLE_SIZE:
+            self.close()
+            raise ValueError(f"{path} is not an endgame table file of version {VERSION}")
+        self._offsets = {piece: HEADER.size + i * TABLE_SIZE for i, piece in enumerate(TABLES)}
+        self.probes = 0
+        self.hits = 0
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+    # (raw table byte, strong side to move) or None if it is not one of our endings
+    def _lookup(self, board: chess.Board):
+        if chess.popcount(board.occupied) != 3 or board.castling_rights:
+            return None
+        p = chess.lsb(board.occupied & ~board.kings)
+        offset = self._offsets.get(board.piece_type_at(p))
+        if offset is None:
+            return None
+        strong = board.color_at(p)
+        sk = board.king(strong)
+        wk = board.king(not strong)
+        if strong == chess.BLACK:
+            sk, wk, p = chess.square_mirror(sk), chess.square_mirror(wk), chess.square_mirror(p)
+        strong_to_move = board.turn == strong
+        return self._map[offset + index(strong_to_move, sk, wk, p)], strong_to_move
+
+    # negamax score for the side to move, ply is the distance from the root
+    def probe_score(self, board: chess.Board, ply: int = 0):
+        self.probes += 1
+        found = self._lookup(board)
+        if found is None:
+            return None
+        self.hits += 1
+        v, strong_to_move = found
+        if not v:
+            return 0
+        score = MATE - ply - (v - 1)
+        return score if strong_to_move else -score
+
+    # plies to mate, negative when the side to move is the one getting mated,
+    # 0 for a draw, None if the position is not in the tables
+    def dtm(self, board: chess.Board):
+        found = self._lookup(board)
+        if found is None:
+            return None
+        v, strong_to_move = found
+        if not v:
+            return 0
+        return v - 1 if strong_to_move else -(v - 1)
+
+
+# ordering of dtm values from the mover's view: short wins, draws, long losses
+def _preference(value: int):
+    if value > 0:
+        return (2, -value)
+    if value == 0:
+        return (1, 0)
+    return (0, -value)
+
+
+# the stored value equals the best successor value, successors from python-chess
+def _consistent(tables: EndgameTables, board: chess.Board) -> bool:
+    own = tables.dtm(board)
+    if board.is_checkmate():
+        return own == 0 and tables._lookup(board)[0] == 1
+    best = None
+    for move in board.legal_moves:
+        board.push(move)
+        if board.is_checkmate():
+            value = 1
+        else:
+            # None: piece captured or promoted to a minor piece, a draw
+            child = tables.dtm(board) or 0
+            value = 1 - child if child < 0 else -(child + 1) if child > 0 else 0
+        board.pop()
+        if best is None or _preference(value) > _preference(best):
+            best = value
+    return (best or 0) == own
+
+
+# plain minimax: can the side to move force mate within plies
+def _mates_within(board: chess.Board, plies: int) -> bool:
+    if plies <= 0:
+        return False
+    for move in board.legal_moves:
+        board.push(move)
+        if board.is_checkmate():
+            board.pop()
+            return True
+        replies = list(board.legal_moves) if plies >= 3 else []
+        forced = bool(replies)
+        for reply in replies:
+            board.push(reply)
+            forced = _mates_within(board, plies - 2)
+            board.pop()
+            if not forced:
+                break
+        board.pop()
+        if forced:
+            return True
+    return False
+
+
+def _random_position(rng, piece: int) -> chess.Board:
+    while True:
+        board = chess.Board(None)
+        squares = rng.sample(chess.SQUARES, 3)
+        strong = rng.choice(chess.COLORS)
+        board.set_piece_at(squares[0], chess.Piece(chess.KING, strong))
+        board.set_piece_at(squares[1], chess.Piece(chess.KING, not strong))
+        board.set_piece_at(squares[2], chess.Piece(piece, strong))
+        board.turn = rng.choice(chess.COLORS)
+        if board.is_valid():
+            return board
+
+
+if __name__ == "__main__":
+    import argparse
+    import random
+    import time
+
+    parser = argparse.ArgumentParser(description="generate and verify the KPK/KRK/KQK tables")
+    parser.add_argument("--path", default=DEFAULT_PATH)
+    parser.add_argument("--samples", type=int, default=2000, help="random positions per table to verify")
+    parser.add_argument("--brute-plies", type=int, default=3, help="brute force mates up to this many plies")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    generate_all(args.path, verbose=True)
+    print(f"generated {args.path} in {time.perf_counter() - start:.1f}s")
+
+    tables = EndgameTables(args.path, generate=False)
+    rng = random.Random(0)
+    for piece in TABLES:
+        bad = brute = 0
+        for _ in range(args.samples):
+            board = _random_position(rng, piece)
+            if not _consistent(tables, board):
+                bad += 1
+                print("inconsistent:", board.fen(), tables.dtm(board))
+            plies = tables.dtm(board)
+            if 0 < plies <= args.brute_plies:
+                brute += 1
+                if not _mates_within(board, plies) or _mates_within(board, plies - 2):
+                    bad += 1
+                    print("brute force disagrees:", board.fen(), plies)
+        print(f"{TABLE_NAMES[piece]}: {args.samples} positions checked, {brute} against brute force, {bad} errors")
@@ -4,12 +4,20 @@
 #Scaffold and Driver given by Professor Soroush Vosoughi
 #Iterative Deepening Search module for chess
 
-import math
+import threading
 import time
 from typing import Dict, Optional
 
 import chess
-from AlphaBetaAI import AlphaBetaAI
+from AlphaBetaAI import AlphaBetaAI, INF, MATE, is_mate_score
+from EndgameTables import EndgameTables
+from SearchStats import IterationInfo, print_iteration
+from TimeManager import TimeManager, DEFAULT_POLL_NODES
+from TranspositionTable import position_key
+
+
+# once the aspiration window is this wide it is opened all the way
+ASPIRATION_LIMIT = 1000
 
 
 class SearchLimitReached(Exception):
@@ -21,44 +29,148 @@ class IDAI(AlphaBetaAI):
     # inits iterative deepning with max depth 3 by default
     def __init__(self, depth: int = 3, eval_fcn=None, *, max_nodes: Optional[int] = None,
                  safety_margin: float = 0.05, branching_threshold: int = 30,
-                 low_branching_threshold: int = 8):
-        super().__init__(depth= depth, eval_fcn=eval_fcn)
+                 low_branching_threshold: int = 8, aspiration_window: int = 50,
+                 threads: int = 1, verbose: bool = True, ponder: bool = False,
+                 fixed_depth: bool = False, **kwargs):
+        # any other AlphaBetaAI option (weights, hash_mb, quiescence, pvs, ...) is passed through
+        super().__init__(depth= depth, eval_fcn=eval_fcn, **kwargs)
         self.best_move = None
+        # listeners called with an IterationInfo after every finished depth,
+        # verbose=True just subscribes the old progress print
+        self.on_iteration = []
+        self.verbose = verbose
+        # threads > 1 adds Lazy SMP helper processes sharing the transposition table
+        self.threads = threads
+        self._smp = None
+        self._helper_config = dict(kwargs, depth=depth, aspiration_window=aspiration_window, verbose=False)
+        self._helper_config.pop("tt", None)
+        self._helper_config.pop("book", None)
+        if isinstance(self.endgame, EndgameTables):
+            # helpers map the same file themselves
+            self._helper_config["endgame"] = self.endgame.path
+        if eval_fcn is not None and not self._is_pieces_eval(eval_fcn):
+            self._helper_config["eval_fcn"] = eval_fcn
+        # half width of the root window around the last iteration's score, 0 turns it off
+        self.aspiration_window = aspiration_window
+        self._aspiration_researches = 0
+        # IterationInfo of every finished iteration of the last search
+        self.iterations = []
         self.max_nodes = max_nodes
+        # fixed_depth searches exactly self.depth (uci go depth/mate, analysis
+        # requests), otherwise the branching heuristic moves it by one ply
+        self.fixed_depth = fixed_depth
         self.safety_margin = safety_margin
         self.branching_threshold = branching_threshold
         self.low_branching_threshold = low_branching_threshold
-        self._avg_time_per_node: Optional[float] = None
         self._nodes_per_depth: Dict[int, float] = {}
         self._start_time: Optional[float] = None
-        self._time_budget: Optional[float] = None
+        # clock limits of the running search, the clock is only read every poll_nodes
+        # nodes (the time manager's poll_nodes when the search has one)
+        self._time_manager: Optional[TimeManager] = None
+        self.poll_nodes = DEFAULT_POLL_NODES
+        self._poll_interval = self.poll_nodes
+        self._poll_countdown = 0
         self._node_count: int = 0
         self._stop_search: bool = False
+        # set by stop(): the running search and every later one return at once
+        # until resume(), choose_move never clears it so a stop can't be lost
+        self._stopped = threading.Event()
+        # deepest finished iteration of the last search
+        self.completed_depth = 0
+        # pondering: after choose_move the expected reply (2nd move of the pv) is
+        # searched in a background thread, a hit is answered from that search and a
+        # miss throws it away, the transposition table stays warm either way
+        self.ponder = ponder
+        self.ponder_move = None
+        self.ponder_hits = 0
+        self.ponder_misses = 0
+        self._ponder_thread = None
+        self._ponder_key = None
+        self._pondering = False
 
-    def choose_move(self, board: chess.Board, time_budget: Optional[float] = None):
+    # time_budget is a plain per move budget in seconds, a TimeManager (e.g. from
+    # the game clock) can be passed instead; root_moves restricts the search to
+    # those moves (uci searchmoves, multipv lines after the first)
+    def choose_move(self, board: chess.Board, time_budget: Optional[float] = None,
+                    time_manager: Optional[TimeManager] = None, root_moves=None):
+        if time_manager is None and time_budget is not None:
+            time_manager = TimeManager.fixed(max(0.0, time_budget - self.safety_margin))
+        if self._ponder_thread is not None and root_moves is not None:
+            self._stop_pondering()
+        if self._ponder_thread is not None:
+            move = self._ponder_result(board, time_manager)
+            if move is not None:
+                self._start_pondering(board, move)
+                return move
         # new best move for this turn
         self.best_move = None
         legal_moves = list(board.legal_moves)
+        if root_moves is not None:
+            legal_moves = [move for move in legal_moves if move in root_moves]
         if not legal_moves:
             return None
+        book_move = self._book_move(board)
+        if book_move is not None and book_move in legal_moves:
+            self.best_move = book_move
+            return book_move
 
         self._start_time = time.perf_counter()
-        self._time_budget = time_budget
-        self._node_count = 0
+        self._time_manager = time_manager
+        if time_manager is not None:
+            time_manager.start()
+        self._poll_interval = time_manager.poll_nodes if time_manager is not None else self.poll_nodes
+        self._poll_countdown = self._poll_interval
+        self._stop_search = self._stopped.is_set()
+        search_board = self._search_position(board)
+        # the shared table replaces self.tt, it has to be in place before the
+        # search takes its table stats base
+        if self.threads > 1 and self._smp is None:
+            from ParallelSearch import LazySMP
+            self._smp = LazySMP(self, self.threads - 1, self._helper_config)
+        # the table is not cleared, entries from earlier moves and iterations keep
+        # giving cutoffs and hash moves, only their replacement priority drops
+        self._begin_search(search_board)
+        root_stack = len(search_board.move_stack)
+
+        max_depth = self._select_search_depth(search_board)
+        self._aspiration_researches = 0
+        self.iterations = []
+        if self._smp is not None:
+            self._smp.start(board, max_depth)
+        self._root_moves = legal_moves if root_moves is not None else None
+        try:
+            self._deepen(search_board, legal_moves, max_depth, root_stack)
+        finally:
+            self._root_moves = None
+            if self._smp is not None:
+                self._smp.stop()
+
+        if self.best_move is None:
+            self.best_move = legal_moves[0]
+
+        self._end_search()
+        self._time_manager = None
+        self._start_time = None
         self._stop_search = False
 
-        max_depth = self._select_search_depth(board, time_budget)
-        c = board.turn  # color
+        move = self.best_move
+        if self.ponder:
+            # from here on best_move, stats and iterations belong to the ponder search
+            self._start_pondering(board, move)
+        return move
+
+    # iterative deepening loop, leaves the best completed move in self.best_move
+    def _deepen(self, board: chess.Board, legal_moves, max_depth: int, root_stack: int):
+        prev_score = None
+        self.completed_depth = 0
 
         # deepen from 1..max_depth
         for depth in range(1, max_depth + 1):
-            bestVal = -math.inf
+            bestVal = -INF
             bestMove = None
-            alpha = -math.inf
-            beta = math.inf
             depth_completed = True
             depth_start_time = time.perf_counter()
-            nodes_before = self._node_count
+            nodes_before = self._node_count + self._qnode_count
 
             # prefer prev found best move for move ordering
             if self.best_move is not None and self.best_move in legal_moves:
@@ -66,20 +178,12 @@ class IDAI(AlphaBetaAI):
             else:
                 ordered_moves = legal_moves
             try:
-                for move in ordered_moves:
-                    self._check_limits()
-                    board.push(move)
-                    try:
-                        v = self.min_value(board, depth - 1, c, alpha, beta)
-                    finally:
-                        board.pop()
-                    if v > bestVal:
-                        bestVal = v
-                        bestMove = move
-                    if bestVal > alpha:
-                        alpha = bestVal
+                bestVal, bestMove = self._aspiration_search(board, ordered_moves, depth, prev_score)
             except SearchLimitReached:
                 depth_completed = False
+                # unwind whatever the aborted search left on the board
+                while len(board.move_stack) > root_stack:
+                    self._pop(board)
 
             if depth_completed:
                 if bestMove is None:
@@ -91,83 +195,205 @@ class IDAI(AlphaBetaAI):
                 # store best move found at depth
                 self.best_move = bestMove
                 self.pv = bestMove
-                depth_nodes = self._node_count - nodes_before
+                self.completed_depth = depth
+                prev_score = bestVal
+                depth_nodes = self._node_count + self._qnode_count - nodes_before
                 depth_elapsed = time.perf_counter() - depth_start_time
-                self._record_depth_statistics(depth, depth_nodes, depth_elapsed)
+                self._record_depth_statistics(depth, depth_nodes)
+                # older history counts less in the next, deeper iteration
+                self._age_history()
+                self._report_iteration(board, depth, bestMove, bestVal, depth_nodes, depth_elapsed)
 
-                # print progress
-                print(f"the best move at depth {depth} is {self.best_move} (value {bestVal})")
-
-                # early exit if result (checkmate found)
-                if abs(bestVal) == math.inf:
+                # early exit once a mate is proven: every line up to the mate's
+                # length was searched, so no deeper iteration finds a shorter one
+                if is_mate_score(bestVal) and MATE - abs(bestVal) <= depth:
+                    break
+                # on the clock: stop if the next depth isn't worth starting
+                tm = self._time_manager
+                if tm is not None and not tm.next_iteration(depth, bestMove, bestVal, depth_nodes, depth_elapsed):
                     break
             else:
                 break
 
-        if self.best_move is None:
-            self.best_move = legal_moves[0]
+    # called by the game loop with the move the opponent just played
+    def opponent_moved(self, board: chess.Board, move: chess.Move):
+        if self._ponder_thread is not None and position_key(board) != self._ponder_key:
+            self.ponder_misses += 1
+            self._stop_pondering()
 
-        self._time_budget = None
-        self._start_time = None
+    def _start_pondering(self, board: chess.Board, move: chess.Move):
+        pv = self.principal_variation(board, 2)
+        if len(pv) < 2 or pv[0] != move:
+            return
+        ponder_board = board.copy()
+        ponder_board.push(move)
+        ponder_board.push(pv[1])
+        if ponder_board.is_game_over():
+            return
+        self.ponder_move = pv[1]
+        self._ponder_key = position_key(ponder_board)
         self._stop_search = False
+        self._pondering = True
+        self._ponder_thread = threading.Thread(target=self._ponder_search, args=(ponder_board,), daemon=True)
+        self._ponder_thread.start()
 
+    # background search of the predicted position, runs until the usual depth or a stop
+    def _ponder_search(self, board: chess.Board):
+        board = self._search_position(board)
+        self.best_move = None
+        self._start_time = time.perf_counter()
+        self._time_manager = None
+        self._poll_interval = self.poll_nodes
+        self._poll_countdown = self._poll_interval
+        self._begin_search(board)
+        self._aspiration_researches = 0
+        self.iterations = []
+        max_depth = self._select_search_depth(board)
+        self._deepen(board, list(board.legal_moves), max_depth, len(board.move_stack))
+        self._end_search(notify=False)
+
+    # on a hit waits for the ponder search (at most what is left of the soft time
+    # limit) and returns its move, None on a miss or if not even depth 1 finished
+    def _ponder_result(self, board: chess.Board, time_manager: Optional[TimeManager]):
+        if position_key(board) != self._ponder_key:
+            self.ponder_misses += 1
+            self._stop_pondering()
+            return None
+        self.ponder_hits += 1
+        if time_manager is None:
+            self._ponder_thread.join()
+        else:
+            # the clock runs from when the time manager was made, not from here
+            self._ponder_thread.join(max(0.0, time_manager.soft - time_manager.elapsed()))
+        self._stop_pondering()
+        if not self.completed_depth or self.best_move not in board.legal_moves:
+            return None
+        # the listeners were muted while pondering, they get the last iteration
+        # and the end of search now that it is the search of this move
+        if self.iterations:
+            for listener in self.on_iteration:
+                listener(self.iterations[-1])
+        self._end_search()
         return self.best_move
 
-    def max_value(self, board: chess.Board, depth: int, c: bool, alpha: float, beta: float):
-        self._check_limits()
-        self._node_count += 1
-        if self.cutoff_test(board, depth):
-            return self.evaluate(board, c)
-        v = -math.inf
-        moves = list(board.legal_moves)
+    def _stop_pondering(self):
+        if self._ponder_thread is None:
+            return
+        self._stop_search = True
+        self._ponder_thread.join()
+        self._ponder_thread = None
+        self._ponder_key = None
+        self._pondering = False
+        self._stop_search = False
+        self._start_time = None
 
-        for move in self.order_moves(board, moves, pv=self.pv):
-            self._check_limits()
+    # stops the running search from another thread, it still returns its best
+    # move so far; searches stay stopped until resume()
+    def stop(self):
+        self._stopped.set()
+        self._stop_search = True
+
+    def resume(self):
+        self._stopped.clear()
+
+    # shuts down pondering and parallel helpers (if any) and frees the shared table
+    def close(self):
+        self._stop_pondering()
+        if self._smp is not None:
+            self._smp.close()
+            self._smp = None
+
+    @property
+    def verbose(self) -> bool:
+        return print_iteration in self.on_iteration
+
+    @verbose.setter
+    def verbose(self, on: bool):
+        if on and not self.verbose:
+            self.on_iteration.append(print_iteration)
+        elif not on and self.verbose:
+            self.on_iteration.remove(print_iteration)
+
+    def _report_iteration(self, board: chess.Board, depth: int, move, score: int, nodes: int, seconds: float):
+        if self.stats is None and not self.on_iteration:
+            return
+        if self._root_moves is None:
+            pv = self.principal_variation(board, depth)
+        else:
+            # the table holds the unrestricted root move, follow it from our move on
             board.push(move)
-            try:
-                v = max(v, self.min_value(board, depth - 1, c, alpha, beta))
-            finally:
-                board.pop()
-            if v >= beta:
-                return v
-            if v > alpha:
-                alpha = v
-        return v
-
-    def min_value(self, board: chess.Board, depth: int, c: bool, alpha: float, beta: float):
+            pv = [move] + self.principal_variation(board, depth - 1)
+            board.pop()
+        info = IterationInfo(depth, move, score, nodes, seconds, time.perf_counter() - self._start_time, pv=pv)
+        if self.stats is not None:
+            info.stats = self._sync_stats().snapshot()
+            self.stats.iterations.append(info)
+        self.iterations.append(info)
+        if self._pondering:
+            return
+        for listener in self.on_iteration:
+            listener(info)
+
+    def _sync_stats(self):
+        stats = super()._sync_stats()
+        stats.aspiration_researches = self._aspiration_researches
+        return stats
+
+    # root search in a window around the previous iteration's score
+    # a fail low/high widens that side (x4 each time, then fully open) and re-searches
+    def _aspiration_search(self, board: chess.Board, moves, depth: int, guess: Optional[int]):
+        if (guess is None or depth < 2 or not self.aspiration_window
+                or is_mate_score(guess)):
+            return self.search_root(board, moves, depth, -INF, INF)
+
+        delta = self.aspiration_window
+        alpha = guess - delta
+        beta = guess + delta
+        while True:
+            value, move = self.search_root(board, moves, depth, alpha, beta)
+            fail_low = value <= alpha and alpha > -INF
+            fail_high = value >= beta and beta < INF
+            if not fail_low and not fail_high:
+                return value, move
+            self._aspiration_researches += 1
+            delta *= 4
+            if fail_low:
+                alpha = -INF if delta >= ASPIRATION_LIMIT else guess - delta
+            else:
+                beta = INF if delta >= ASPIRATION_LIMIT else guess + delta
+                # the move that failed high goes first in the re-search
+                moves = [move] + [m for m in moves if m != move]
+
+    # every node checks the time/node budget before it is searched
+    def _enter_node(self):
         self._check_limits()
         self._node_count += 1
-        if self.cutoff_test(board, depth):
-            return self.evaluate(board, c)
-        v = math.inf
-        moves = list(board.legal_moves)
 
-        for move in self.order_moves(board, moves, pv=self.pv):
-            self._check_limits()
-            board.push(move)
-            try:
-                v = min(v, self.max_value(board, depth - 1, c, alpha, beta))
-            finally:
-                board.pop()
-            if v <= alpha:
-                return v
-            if v < beta:
-                beta = v
-        return v
+    def _enter_qnode(self):
+        self._check_limits()
+        self._qnode_count += 1
 
     def _check_limits(self):
         if self._stop_search:
             raise SearchLimitReached
-        if self._time_budget is not None and self._start_time is not None:
-            elapsed = time.perf_counter() - self._start_time
-            if elapsed >= max(0.0, self._time_budget - self.safety_margin):
-                self._stop_search = True
-                raise SearchLimitReached
-        if self.max_nodes is not None and self._node_count >= self.max_nodes:
+        if self.max_nodes is not None and self._node_count + self._qnode_count >= self.max_nodes:
             self._stop_search = True
             raise SearchLimitReached
+        self._poll_countdown -= 1
+        if self._poll_countdown <= 0:
+            self._poll_countdown = self._poll_interval
+            if self._poll():
+                self._stop_search = True
+                raise SearchLimitReached
+
+    # the expensive checks (clock, stop flags of subclasses), every poll_nodes nodes
+    def _poll(self) -> bool:
+        if self._stopped.is_set():
+            return True
+        tm = self._time_manager
+        return tm is not None and tm.hard_limit_reached()
 
-    def _record_depth_statistics(self, depth: int, nodes: int, elapsed: float):
+    def _record_depth_statistics(self, depth: int, nodes: int):
         if nodes <= 0:
             return
         prev_nodes = self._nodes_per_depth.get(depth)
@@ -175,13 +401,11 @@ class IDAI(AlphaBetaAI):
             self._nodes_per_depth[depth] = float(nodes)
         else:
             self._nodes_per_depth[depth] = 0.5 * prev_nodes + 0.5 * float(nodes)
-        rate = elapsed / nodes
-        if self._avg_time_per_node is None:
-            self._avg_time_per_node = rate
-        else:
-            self._avg_time_per_node = 0.7 * self._avg_time_per_node + 0.3 * rate
 
-    def _select_search_depth(self, board: chess.Board, time_budget: Optional[float]) -> int:
+    # deepest iteration to run, the clock is left to the TimeManager
+    def _select_search_depth(self, board: chess.Board) -> int:
+        if self.fixed_depth:
+            return max(1, self.depth)
         legal_count = sum(1 for _ in board.legal_moves)
         target_depth = self.depth
 
@@ -201,10 +425,4 @@ class IDAI(AlphaBetaAI):
                 expected_nodes -= self._nodes_per_depth.get(target_depth, 0.0)
                 target_depth -= 1
 
-        if time_budget is not None and self._avg_time_per_node is not None:
-            available_time = max(0.0, time_budget - self.safety_margin)
-            while target_depth > 1 and expected_nodes * self._avg_time_per_node > available_time:
-                expected_nodes -= self._nodes_per_depth.get(target_depth, 0.0)
-                target_depth -= 1
-
         return max(1, target_depth)
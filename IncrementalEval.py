@@ -0,0 +1,124 @@
+#Code Modified/writter by Larbalestier, Noah; F006B9P
+#26 October 2025
+#PA3 COSC 076, 25F
+#Scaffold and Driver given by Professor Soroush Vosoughi
+#Incremental material / piece-square evaluation for the search
+
+import chess
+
+
+#keeps a stack of (material, piece_square) sums, white's point of view, that is
+#updated with the delta of each move on push and simply dropped on pop
+#the sums are the same integers _material_score / _piece_square_score add up,
+#so the search gets bit-identical evals for O(1) per leaf
+class IncrementalEval():
+    def __init__(self, material_values, piece_square_tables):
+        # signed per color tables: _values[color][piece_type], _pst[color][piece_type][square]
+        self._values = {}
+        self._pst = {}
+        for color, sign in ((chess.WHITE, 1), (chess.BLACK, -1)):
+            self._values[color] = {pt: sign * val for pt, val in material_values.items()}
+            self._pst[color] = {}
+            for pt in chess.PIECE_TYPES:
+                table = piece_square_tables.get(pt)
+                if table is None:
+                    self._pst[color][pt] = [0] * 64
+                elif color == chess.WHITE:
+                    self._pst[color][pt] = [sign * table[sq] for sq in chess.SQUARES]
+                else:
+                    self._pst[color][pt] = [sign * table[chess.square_mirror(sq)] for sq in chess.SQUARES]
+        self._stack = []
+
+    # full recompute, done once at the root of a search
+    def reset(self, board: chess.Board):
+        material = 0
+        piece_square = 0
+        for square, piece in board.piece_map().items():
+            material += self._values[piece.color].get(piece.piece_type, 0)
+            piece_square += self._pst[piece.color][piece.piece_type][square]
+        self._stack = [(material, piece_square)]
+
+    @property
+    def material(self) -> int:
+        return self._stack[-1][0]
+
+    @property
+    def piece_square(self) -> int:
+        return self._stack[-1][1]
+
+    def push(self, board: chess.Board, move: chess.Move):
+        material, piece_square = self._stack[-1]
+        if move:
+            d_material, d_piece_square = self._delta(board, move)
+            material += d_material
+            piece_square += d_piece_square
+        board.push(move)
+        self._stack.append((material, piece_square))
+
+    def pop(self, board: chess.Board):
+        self._stack.pop()
+        return board.pop()
+
+    def _delta(self, board: chess.Board, move: chess.Move):
+        color = board.turn
+        piece_type = board.piece_type_at(move.from_square)
+        pst = self._pst[color]
+        frm = move.from_square
+        to = move.to_square
+
+        if move.promotion:
+            d_material = self._values[color][move.promotion] - self._values[color][chess.PAWN]
+            d_piece_square = pst[move.promotion][to] - pst[chess.PAWN][frm]
+        else:
+            d_material = 0
+            d_piece_square = pst[piece_type][to] - pst[piece_type][frm]
+
+        if piece_type == chess.KING and board.is_castling(move):
+            rank = chess.square_rank(frm)
+            if board.is_kingside_castling(move):
+                rook_from, rook_to = chess.square(7, rank), chess.square(5, rank)
+            else:
+                rook_from, rook_to = chess.square(0, rank), chess.square(3, rank)
+            d_piece_square += pst[chess.ROOK][rook_to] - pst[chess.ROOK][rook_from]
+        elif board.is_en_passant(move):
+            captured_square = to - 8 if color == chess.WHITE else to + 8
+            d_material -= self._values[not color][chess.PAWN]
+            d_piece_square -= self._pst[not color][chess.PAWN][captured_square]
+        else:
+            captured = board.piece_type_at(to)
+            if captured:
+                d_material -= self._values[not color].get(captured, 0)
+                d_piece_square -= self._pst[not color][captured][to]
+        return d_material, d_piece_square
+
+
+# randomized differential check against the from-scratch scores
+if __name__ == "__main__":
+    import random
+    import sys
+    from AlphaBetaAI import AlphaBetaAI
+
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    rng = random.Random(7)
+    ai = AlphaBetaAI(hash_mb=0)
+    inc = IncrementalEval(ai.material_values, ai.piece_square_tables)
+    checked = 0
+    for _ in range(games):
+        board = chess.Board()
+        inc.reset(board)
+        while not board.is_game_over() and len(board.move_stack) < 200:
+            moves = list(board.legal_moves)
+            # bias towards captures/promotions so those deltas get exercised
+            captures = [m for m in moves if board.is_capture(m) or m.promotion]
+            move = rng.choice(captures if captures and rng.random() < 0.5 else moves)
+            inc.push(board, move)
+            if rng.random() < 0.1:
+                # take a move back now and then to exercise pop
+                inc.pop(board)
+                continue
+            for c in chess.COLORS:
+                expected = ai.pieces_eval(board, c)
+                actual = ai.incremental_eval(board, c, inc)
+                assert expected == actual, (board.fen(), expected, actual)
+            checked += 1
+    print(f"incremental eval matches pieces_eval on {checked} positions")
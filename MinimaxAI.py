@@ -5,13 +5,17 @@
 #Minimax Search module for chess
 
 import chess
-from math import inf
 import ChessGame
+from EndgameTables import MATE
+
+# integer scores like AlphaBetaAI: a mate ply plies from the root is MATE - ply
+INF = MATE + 1
 
 class MinimaxAI():
     def __init__(self, depth = 3, eval_fcn = None):
         self.depth = depth
         self.eval_fcn = eval_fcn or self.pieces_eval #default based on piece value
+        self._node_count = 0
 
     def choose_move(self, board: None):
         moves = list(board.legal_moves)
@@ -19,12 +23,13 @@ class MinimaxAI():
             return None  #  no-move possible
         #get root color 
         c = board.turn
-        bestVal = -inf
+        self._node_count = 0
+        bestVal = -INF
         bestMove = None
 
         for move in moves:
             board.push(move)
-            v = self.min_value(board, self.depth - 1, c)
+            v = self.min_value(board, self.depth - 1, c, 1)
             board.pop()
             if v > bestVal:
                 bestVal = v
@@ -43,46 +48,49 @@ class MinimaxAI():
         return depth ==0 or board.is_game_over()
     
     #max value fcn
-    def max_value(self, board: None, depth: int, c: bool):
+    #ply is the distance from the root, shorter mates score higher
+    def max_value(self, board: None, depth: int, c: bool, ply: int = 0):
+        self._node_count += 1
         if self.cutoff_test(board, depth):
-            return self.evaluate(board, c)
-        v = -inf
+            return self.evaluate(board, c, ply)
+        v = -INF
 
         #iterate through all legal moves
         for move in board.legal_moves:
             board.push(move)
-            v = max(v, self.min_value(board, depth - 1, c))
+            v = max(v, self.min_value(board, depth - 1, c, ply + 1))
             board.pop()
         return v
 
     #min value fcn
-    def min_value(self, board: None, depth: int, c: bool):
+    def min_value(self, board: None, depth: int, c: bool, ply: int = 0):
+        self._node_count += 1
         if self.cutoff_test(board, depth):
-            return self.evaluate(board, c)
-        v = inf
+            return self.evaluate(board, c, ply)
+        v = INF
         
         #iterate through all legal moves
         for move in board.legal_moves:
             board.push(move)
-            v = min(v, self.max_value(board, depth - 1, c))
+            v = min(v, self.max_value(board, depth - 1, c, ply + 1))
             board.pop()
         return v
 
     #evaluate fcn
-    def evaluate(self, board: None, c: bool):
-        util = self.terminal(board, c)
+    def evaluate(self, board: None, c: bool, ply: int = 0):
+        util = self.terminal(board, c, ply)
         if util is not None:
             return util
         return self.eval_fcn(board, c)
 
     #terminal fcn checks for checkmate, stalemate, or messed up state
-    def terminal(self, board: None, c: bool):
+    def terminal(self, board: None, c: bool, ply: int = 0):
         if board.is_checkmate():
             winner = not board.turn  # winner is the side that just moved
-            return inf if winner == c else -inf
+            return MATE - ply if winner == c else -MATE + ply
        #draw
         if board.is_stalemate() or board.is_insufficient_material():
-            return 0.0
+            return 0
         return None
 
     def pieces_eval(self, board: None, c: bool):
@@ -98,6 +106,6 @@ class MinimaxAI():
         for piece_type, val in values.items():
             score += len(board.pieces(piece_type, chess.WHITE)) * val
             score -= len(board.pieces(piece_type, chess.BLACK)) * val
-        return float(score) if c == chess.WHITE else float(-score)
+        return score if c == chess.WHITE else -score
 
 
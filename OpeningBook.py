@@ -0,0 +1,239 @@
+#Code Modified/writter by Larbalestier, Noah; F006B9P
+#26 October 2025
+#PA3 COSC 076, 25F
+#Scaffold and Driver given by Professor Soroush Vosoughi
+#Polyglot opening book module for chess (mmap lookup + builder from pgn)
+
+import mmap
+import os
+import random
+import struct
+from collections import defaultdict
+
+import chess
+import chess.pgn
+from TranspositionTable import position_key
+
+# polyglot entry: key (8) + move (2) + weight (2) + learn (4), big endian, sorted by key
+ENTRY = struct.Struct(">QHHI")
+ENTRY_SIZE = ENTRY.size
+
+SELECTIONS = ("weighted", "best")
+
+
+# polyglot moves: to | from << 6 | promotion << 12, castling is written king-takes-rook
+def encode_move(board: chess.Board, move: chess.Move) -> int:
+    to_square = move.to_square
+    if board.is_castling(move):
+        rook_file = 7 if chess.square_file(move.to_square) > chess.square_file(move.from_square) else 0
+        to_square = chess.square(rook_file, chess.square_rank(move.from_square))
+    promotion = move.promotion - 1 if move.promotion else 0
+    return to_square | (move.from_square << 6) | (promotion << 12)
+
+
+def decode_move(board: chess.Board, raw: int):
+    to_square = raw & 63
+    from_square = (raw >> 6) & 63
+    promotion = (raw >> 12) & 7
+    move = chess.Move(from_square, to_square, promotion + 1 if promotion else None)
+    if board.piece_type_at(from_square) == chess.KING and board.color_at(to_square) == board.turn:
+        # king-takes-rook back to the e1g1 style python-chess uses
+        king_file = 6 if chess.square_file(to_square) > chess.square_file(from_square) else 2
+        move = chess.Move(from_square, chess.square(king_file, chess.square_rank(from_square)))
+    return move
+
+
+#read only polyglot .bin reader, the file is mapped and binary searched on the
+#zobrist key so only the pages actually touched are ever read
+class OpeningBook():
+    def __init__(self, path: str, selection: str = "weighted", seed=None):
+        if selection not in SELECTIONS:
+            raise ValueError(f"unknown selection {selection!r}")
+        self.path = path
+        self.selection = selection
+        self._random = random.Random(seed)
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self.num_entries = size // ENTRY_SIZE
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.num_entries
+
+    def _key_at(self, index: int) -> int:
+        return struct.unpack_from(">Q", self._map, index * ENTRY_SIZE)[0]
+
+    # first entry with this key (lower bound)
+    def _first(self, key: int) -> int:
+        low, high = 0, self.num_entries
+        while low < high:
+            mid = (low + high) // 2
+            if self._key_at(mid) < key:
+                low = mid + 1
+            else:
+                high = mid
+        return low
+
+    # [(move, weight)] of every legal book move of the position
+    def entries(self, board: chess.Board):
+        if self._map is None:
+            return []
+        key = position_key(board)
+        found = []
+        index = self._first(key)
+        while index < self.num_entries:
+            entry_key, raw, weight, _ = ENTRY.unpack_from(self._map, index * ENTRY_SIZE)
+            if entry_key != key:
+                break
+            move = decode_move(board, raw)
+            if weight and board.is_legal(move):
+                found.append((move, weight))
+            index += 1
+        return found
+
+    # book move of the position or None when out of book
+    def choose(self, board: chess.Board):
+        found = self.entries(board)
+        if not found:
+            return None
+        if self.selection == "best":
+            return max(found, key=lambda entry: entry[1])[0]
+        pick = self._random.randrange(sum(weight for _, weight in found))
+        for move, weight in found:
+            pick -= weight
+            if pick < 0:
+                return move
+        return found[-1][0]
+
+
+# builds a polyglot book from pgn files: every move of the first max_plies plies
+# scores 2 for a win and 1 for a draw of the side that played it, moves seen
+# fewer than min_games times are dropped, weights are scaled into 16 bits
+def build_book(pgn_paths, out_path: str, max_plies: int = 16, min_games: int = 1,
+               include_losses: bool = False) -> int:
+    if isinstance(pgn_paths, str):
+        pgn_paths = [pgn_paths]
+    scores = defaultdict(int)
+    counts = defaultdict(int)
+    for pgn_path in pgn_paths:
+        with open(pgn_path) as pgn:
+            while True:
+                game = chess.pgn.read_game(pgn)
+                if game is None:
+                    break
+                result = game.headers.get("Result", "*")
+                if result not in ("1-0", "0-1", "1/2-1/2"):
+                    continue
+                board = game.board()
+                for ply, move in enumerate(game.mainline_moves()):
+                    if ply >= max_plies:
+                        break
+                    if result == "1/2-1/2":
+                        score = 1
+                    elif (result == "1-0") == (board.turn == chess.WHITE):
+                        score = 2
+                    else:
+                        score = 1 if include_losses else 0
+                    entry = (position_key(board), encode_move(board, move))
+                    counts[entry] += 1
+                    scores[entry] += score
+                    board.push(move)
+
+    kept = [(entry, score) for entry, score in scores.items() if counts[entry] >= min_games and score]
+    top = max((score for _, score in kept), default=1)
+    scale = min(1.0, 0xFFFF / top)
+    with open(out_path, "wb") as out:
+        for (key, raw), score in sorted(kept):
+            out.write(ENTRY.pack(key, raw, max(1, int(score * scale)), 0))
+    return len(kept)
+
+
+# keys, move encoding and a built book against chess.polyglot on random game
+# positions, returns the number of positions checked
+def check_polyglot(positions: int = 9000, seed: int = 3) -> int:
+    import io
+    import tempfile
+    import chess.polyglot
+    rng = random.Random(seed)
+    checked = 0
+    games = []
+    while checked < positions:
+        board = chess.Board()
+        game = chess.pgn.Game()
+        node = game
+        while not board.is_game_over() and len(board.move_stack) < 120 and checked < positions:
+            assert position_key(board) == chess.polyglot.zobrist_hash(board), board.fen()
+            for move in board.legal_moves:
+                assert decode_move(board, encode_move(board, move)) == move, (board.fen(), move.uci())
+            checked += 1
+            move = rng.choice(list(board.legal_moves))
+            node = node.add_variation(move)
+            board.push(move)
+        game.headers["Result"] = rng.choice(("1-0", "0-1", "1/2-1/2"))
+        games.append(str(game))
+
+    # the same book read by both readers: same moves with the same weights
+    with tempfile.TemporaryDirectory() as tmp:
+        pgn_path = os.path.join(tmp, "games.pgn")
+        book_path = os.path.join(tmp, "book.bin")
+        with open(pgn_path, "w") as out:
+            out.write("\n\n".join(games))
+        build_book(pgn_path, book_path, max_plies=12, include_losses=True)
+        with OpeningBook(book_path) as book, chess.polyglot.open_reader(book_path) as reference, \
+                open(pgn_path) as pgn:
+            while True:
+                game = chess.pgn.read_game(pgn)
+                if game is None:
+                    break
+                board = game.board()
+                for move in list(game.mainline_moves())[:12]:
+                    expected = sorted((entry.move.uci(), entry.weight) for entry in reference.find_all(board))
+                    actual = sorted((found.uci(), weight) for found, weight in book.entries(board))
+                    assert expected == actual, (board.fen(), expected, actual)
+                    board.push(move)
+    return checked
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="build or query a polyglot opening book")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="build a .bin book from pgn files")
+    build.add_argument("out")
+    build.add_argument("pgn", nargs="+")
+    build.add_argument("--max-plies", type=int, default=16)
+    build.add_argument("--min-games", type=int, default=1)
+    build.add_argument("--include-losses", action="store_true", help="give lost moves weight 1 instead of dropping them")
+    query = sub.add_parser("query", help="list the book moves of a position")
+    query.add_argument("book")
+    query.add_argument("--fen", default=chess.STARTING_FEN)
+    selftest = sub.add_parser("selftest", help="check keys, move encoding and books against chess.polyglot")
+    selftest.add_argument("--positions", type=int, default=9000)
+    args = parser.parse_args()
+
+    if args.command == "selftest":
+        count = check_polyglot(args.positions)
+        print(f"keys, moves and book entries match chess.polyglot on {count} positions")
+    elif args.command == "build":
+        count = build_book(args.pgn, args.out, args.max_plies, args.min_games, args.include_losses)
+        print(f"wrote {count} entries to {args.out}")
+    else:
+        board = chess.Board(args.fen)
+        with OpeningBook(args.book) as book:
+            found = book.entries(board)
+            total = sum(weight for _, weight in found) or 1
+            for move, weight in sorted(found, key=lambda entry: -entry[1]):
+                print(f"{board.san(move):8s} {weight:6d}  {weight / total:.1%}")
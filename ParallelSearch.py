@@ -0,0 +1,191 @@
+#Code Modified/writter by Larbalestier, Noah; F006B9P
+#26 October 2025
+#PA3 COSC 076, 25F
+#Scaffold and Driver given by Professor Soroush Vosoughi
+#Lazy SMP parallel search module for chess
+
+import multiprocessing as mp
+import queue
+import time
+from multiprocessing import shared_memory
+
+import chess
+from AlphaBetaAI import INF
+from IDAI import IDAI, SearchLimitReached
+from TranspositionTable import TranspositionTable, ENTRY_SIZE
+
+# helpers look at the stop flag only every this many nodes
+STOP_POLL_NODES = 256
+# seconds to wait for a helper to go idle after the stop flag
+STOP_TIMEOUT = 10
+
+
+#IDAI run inside a helper process, it stops when the main search raises the flag
+class _HelperAI(IDAI):
+    def __init__(self, stop_event, **kwargs):
+        super().__init__(**kwargs)
+        self._stop_event = stop_event
+        self.poll_nodes = STOP_POLL_NODES
+
+    def _poll(self) -> bool:
+        return self._stop_event.is_set()
+
+
+# helper process loop: wait for a position, deepen on it until told to stop
+def _helper_main(helper_id, shm_name, tt_bytes, config, jobs, done, stop_event):
+    shm = shared_memory.SharedMemory(name=shm_name)
+    view = shm.buf[:tt_bytes]
+    tt = TranspositionTable(buffer=view)
+    try:
+        ai = _HelperAI(stop_event, tt=tt, **config)
+        while True:
+            job = jobs.get()
+            if job is None:
+                break
+            fen, moves, max_depth, generation = job
+            board = chess.Board(fen)
+            for uci in moves:
+                board.push_uci(uci)
+            nodes = _helper_search(ai, board, helper_id, max_depth, generation)
+            done.put((helper_id, nodes))
+    finally:
+        tt.release()
+        view.release()
+        shm.close()
+
+
+# staggered iterative deepening: odd helpers start one ply deeper and every helper
+# rotates the root moves, so they fill different parts of the shared table
+def _helper_search(ai, board, helper_id, max_depth, generation):
+    board = ai._search_position(board)
+    ai._stop_search = False
+    ai._begin_search(board)
+    ai.tt.generation = generation  # the main search owns the table's age
+    legal = list(board.legal_moves)
+    if legal:
+        shift = helper_id % len(legal)
+        legal = legal[shift:] + legal[:shift]
+    root_stack = len(board.move_stack)
+    try:
+        for depth in range(1 + helper_id % 2, max_depth + 2):
+            _, best = ai.search_root(board, legal, depth, -INF, INF)
+            if best is not None:
+                legal = [best] + [m for m in legal if m != best]
+            ai._age_history()
+    except SearchLimitReached:
+        while len(board.move_stack) > root_stack:
+            ai._pop(board)
+    ai._end_search()
+    return ai._node_count + ai._qnode_count
+
+
+#pool of helper processes sharing one transposition table in shared memory
+#the owning IDAI searches in the main process, helpers only feed the table
+class LazySMP():
+    def __init__(self, owner: IDAI, helpers: int, config: dict):
+        size_mb = owner.tt.size_mb if owner.tt is not None else 16
+        tt_bytes = max(2, int(size_mb * 1024 * 1024) // ENTRY_SIZE) * ENTRY_SIZE
+        self._shm = shared_memory.SharedMemory(create=True, size=tt_bytes)
+        self._shm.buf[:tt_bytes] = bytes(tt_bytes)
+        self._view = self._shm.buf[:tt_bytes]
+        owner.tt = TranspositionTable(buffer=self._view)
+        self.owner = owner
+        self.helper_nodes = 0
+        # helpers that did not go idle within STOP_TIMEOUT and were terminated
+        self.lost_helpers = 0
+
+        ctx = mp.get_context()
+        self._stop = ctx.Event()
+        self._done = ctx.Queue()
+        self._jobs = []
+        self._procs = []
+        for helper_id in range(1, helpers + 1):
+            jobs = ctx.Queue()
+            proc = ctx.Process(target=_helper_main, daemon=True,
+                               args=(helper_id, self._shm.name, tt_bytes, config, jobs, self._done, self._stop))
+            proc.start()
+            self._jobs.append(jobs)
+            self._procs.append(proc)
+
+    # helpers start on the root position, the main search runs in this process
+    def start(self, board: chess.Board, max_depth: int):
+        self._stop.clear()
+        root = board.root()
+        moves = [move.uci() for move in board.move_stack]
+        for jobs in self._jobs:
+            jobs.put((root.fen(), moves, max_depth, self.owner.tt.generation))
+
+    # stop the helpers and wait until they are idle again, a hung helper is
+    # terminated so the search goes on without it
+    def stop(self):
+        self._stop.set()
+        self.helper_nodes = 0
+        waiting = {helper_id for helper_id, proc in enumerate(self._procs, 1) if proc.is_alive()}
+        deadline = time.perf_counter() + STOP_TIMEOUT
+        while waiting:
+            try:
+                helper_id, nodes = self._done.get(timeout=max(0.0, deadline - time.perf_counter()))
+            except queue.Empty:
+                break
+            waiting.discard(helper_id)
+            self.helper_nodes += nodes
+        for helper_id in waiting:
+            proc = self._procs[helper_id - 1]
+            proc.terminate()
+            proc.join(timeout=1)
+            # a stopped process ignores terminate until it runs again
+            if proc.is_alive():
+                proc.kill()
+                proc.join(timeout=1)
+            self.lost_helpers += 1
+
+    def close(self):
+        for jobs in self._jobs:
+            jobs.put(None)
+        for proc in self._procs:
+            proc.join(timeout=1)
+            if proc.is_alive():
+                proc.kill()
+                proc.join(timeout=1)
+        self._procs = []
+        self.owner.tt.release()
+        self.owner.tt = None
+        self._view.release()
+        self._shm.close()
+        self._shm.unlink()
+
+
+# time to finish a fixed depth with 1..max_threads cores and the speedup over one
+def measure_scaling(fens, depth: int, max_threads: int):
+    results = []
+    base = None
+    for threads in range(1, max_threads + 1):
+        elapsed = 0.0
+        nodes = 0
+        for fen in fens:
+            ai = IDAI(depth, threads=threads, verbose=False)
+            board = chess.Board(fen)
+            start = time.perf_counter()
+            ai.choose_move(board)
+            elapsed += time.perf_counter() - start
+            nodes += ai._node_count + ai._qnode_count
+            ai.close()
+        base = base or elapsed
+        results.append({"threads": threads, "seconds": elapsed, "main_nodes": nodes, "speedup": base / elapsed})
+    return results
+
+
+if __name__ == "__main__":
+    import sys
+
+    depth = int(sys.argv[1]) if len(sys.argv) > 1 else 4
+    max_threads = int(sys.argv[2]) if len(sys.argv) > 2 else mp.cpu_count()
+    fens = [
+        chess.STARTING_FEN,
+        "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+        "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+    ]
+    print(f"{mp.cpu_count()} cores available")
+    for row in measure_scaling(fens, depth, max_threads):
+        print(f"threads {row['threads']:2d}  {row['seconds']:7.2f}s  main nodes {row['main_nodes']:8d}  "
+              f"speedup {row['speedup']:.2f}x")
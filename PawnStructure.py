@@ -0,0 +1,191 @@
+#Code Modified/writter by Larbalestier, Noah; F006B9P
+#26 October 2025
+#PA3 COSC 076, 25F
+#Scaffold and Driver given by Professor Soroush Vosoughi
+#Bitboard pawn structure / king shelter evaluation with a pawn hash table
+
+import chess
+
+# "compat" gives exactly the old king safety numbers (shield, king file, rook/queen
+# on the king file), "full" adds the pawn structure terms and a wider shelter
+PAWN_EVAL_MODES = ("full", "compat")
+
+# centipawns, white's point of view is white minus black
+PASSED_BONUS = (0, 5, 10, 20, 35, 60, 100, 0)   # by rank counted from the own side
+ISOLATED_PENALTY = -15
+DOUBLED_PENALTY = -10                            # per extra pawn on a file
+BACKWARD_PENALTY = -8
+SHIELD_BONUS = 15                                # own pawn right in front of the king
+SHIELD_FAR_BONUS = 8                             # ... two ranks in front (full only)
+KING_FILE_PENALTY = -20                          # no own pawn on the king's file
+HALF_OPEN_PENALTY = -10                          # no own pawn next to the king (full only)
+OPEN_FILE_PENALTY = -10                          # no pawn at all next to the king (full only)
+FILE_THREAT_PENALTY = -30                        # enemy rook/queen first in front of the king
+
+FILES = [chess.BB_FILES[f] for f in range(8)]
+ADJACENT_FILES = [(FILES[f - 1] if f > 0 else 0) | (FILES[f + 1] if f < 7 else 0) for f in range(8)]
+NEAR_FILES = [ADJACENT_FILES[f] | FILES[f] for f in range(8)]
+
+
+def _ranks_ahead(color: bool, rank: int) -> int:
+    mask = 0
+    for r in (range(rank + 1, 8) if color == chess.WHITE else range(0, rank)):
+        mask |= chess.BB_RANKS[r]
+    return mask
+
+
+def _ranks_not_ahead(color: bool, rank: int) -> int:
+    return chess.BB_ALL & ~_ranks_ahead(color, rank)
+
+
+def _rank_mask(rank: int) -> int:
+    return chess.BB_RANKS[rank] if 0 <= rank <= 7 else 0
+
+
+# [color][square] masks
+FORWARD = [[0] * 64, [0] * 64]        # own file, in front
+PASSED = [[0] * 64, [0] * 64]         # own + adjacent files, in front
+SUPPORT = [[0] * 64, [0] * 64]        # adjacent files, same rank or behind
+SHIELD = [[0] * 64, [0] * 64]         # 3 files, one rank in front of a king
+SHIELD_FAR = [[0] * 64, [0] * 64]     # 3 files, two ranks in front of a king
+for _color in chess.COLORS:
+    _step = 1 if _color == chess.WHITE else -1
+    for _sq in chess.SQUARES:
+        _file, _rank = chess.square_file(_sq), chess.square_rank(_sq)
+        _ahead = _ranks_ahead(_color, _rank)
+        FORWARD[_color][_sq] = FILES[_file] & _ahead
+        PASSED[_color][_sq] = NEAR_FILES[_file] & _ahead
+        SUPPORT[_color][_sq] = ADJACENT_FILES[_file] & _ranks_not_ahead(_color, _rank)
+        SHIELD[_color][_sq] = NEAR_FILES[_file] & _rank_mask(_rank + _step)
+        SHIELD_FAR[_color][_sq] = NEAR_FILES[_file] & _rank_mask(_rank + 2 * _step)
+
+
+# passed / isolated / doubled / backward for one side
+def _pawn_terms(color: bool, own: int, enemy: int) -> int:
+    score = 0
+    for f in range(8):
+        count = chess.popcount(own & FILES[f])
+        if count > 1:
+            score += DOUBLED_PENALTY * (count - 1)
+    for sq in chess.scan_forward(own):
+        f = chess.square_file(sq)
+        if not own & ADJACENT_FILES[f]:
+            score += ISOLATED_PENALTY
+        elif not own & SUPPORT[color][sq]:
+            # nobody can defend its advance and the stop square is covered by a pawn
+            stop = sq + 8 if color == chess.WHITE else sq - 8
+            if 0 <= stop < 64 and chess.BB_PAWN_ATTACKS[color][stop] & enemy:
+                score += BACKWARD_PENALTY
+        if not PASSED[color][sq] & enemy and not FORWARD[color][sq] & own:
+            rank = chess.square_rank(sq) if color == chess.WHITE else 7 - chess.square_rank(sq)
+            score += PASSED_BONUS[rank]
+    return score
+
+
+# pawn-only part of one king's safety
+def _shelter(color: bool, king: int, own: int, enemy: int, full: bool) -> int:
+    f = chess.square_file(king)
+    score = SHIELD_BONUS * chess.popcount(own & SHIELD[color][king])
+    if not own & FILES[f]:
+        score += KING_FILE_PENALTY
+    if full:
+        score += SHIELD_FAR_BONUS * chess.popcount(own & SHIELD_FAR[color][king])
+        for near in (f - 1, f + 1):
+            if 0 <= near <= 7 and not own & FILES[near]:
+                score += HALF_OPEN_PENALTY
+                if not enemy & FILES[near]:
+                    score += OPEN_FILE_PENALTY
+    return score
+
+
+# (pawn structure, shelter) white minus black, everything that only depends on
+# pawns and king squares, what the pawn hash table stores
+def pawn_entry(white: int, black: int, white_king, black_king, full: bool = True):
+    pawns = _pawn_terms(chess.WHITE, white, black) - _pawn_terms(chess.BLACK, black, white) if full else 0
+    shelter = 0
+    if white_king is not None:
+        shelter += _shelter(chess.WHITE, white_king, white, black, full)
+    if black_king is not None:
+        shelter -= _shelter(chess.BLACK, black_king, black, white, full)
+    return pawns, shelter
+
+
+# enemy rook or queen is the first piece in front of the king on its file
+def file_threat(board: chess.Board, color: bool, king) -> int:
+    if king is None:
+        return 0
+    blockers = FORWARD[color][king] & board.occupied
+    if not blockers:
+        return 0
+    first = chess.lsb(blockers) if color == chess.WHITE else chess.msb(blockers)
+    if board.occupied_co[not color] & (board.rooks | board.queens) & chess.BB_SQUARES[first]:
+        return FILE_THREAT_PENALTY
+    return 0
+
+
+#fixed size, always-replace cache of pawn_entry keyed on both pawn sets and king squares
+class PawnHashTable():
+    def __init__(self, entries: int = 16384):
+        self.size = max(1, entries)
+        self._keys = [None] * self.size
+        self._values = [None] * self.size
+        self.probes = 0
+        self.hits = 0
+
+    def clear(self):
+        self._keys = [None] * self.size
+        self._values = [None] * self.size
+        self.probes = 0
+        self.hits = 0
+
+    def lookup(self, white: int, black: int, white_king, black_king, full: bool):
+        self.probes += 1
+        key = (white, black, white_king, black_king, full)
+        slot = hash(key) % self.size
+        if self._keys[slot] == key:
+            self.hits += 1
+            return self._values[slot]
+        value = pawn_entry(white, black, white_king, black_king, full)
+        self._keys[slot] = key
+        self._values[slot] = value
+        return value
+
+    def hit_rate(self) -> float:
+        return self.hits / self.probes if self.probes else 0.0
+
+
+if __name__ == "__main__":
+    import random
+    import sys
+    import time
+    from AlphaBetaAI import AlphaBetaAI
+
+    # compat mode against the old square by square king safety
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 100
+    rng = random.Random(11)
+    ai = AlphaBetaAI(hash_mb=0, pawn_eval="compat")
+    boards = []
+    for _ in range(games):
+        board = chess.Board()
+        while not board.is_game_over() and len(board.move_stack) < 160:
+            board.push(rng.choice(list(board.legal_moves)))
+            expected = (ai._king_safety_for_color(board, chess.WHITE)
+                        - ai._king_safety_for_color(board, chess.BLACK))
+            actual = ai._king_safety_score(board)
+            assert expected == actual, (board.fen(), expected, actual)
+            boards.append(board.copy(stack=False))
+    print(f"compat king safety matches the old code on {len(boards)} positions")
+
+    start = time.perf_counter()
+    for board in boards:
+        ai._king_safety_for_color(board, chess.WHITE) - ai._king_safety_for_color(board, chess.BLACK)
+    old = time.perf_counter() - start
+    full = AlphaBetaAI(hash_mb=0, pawn_eval="full")
+    for name, engine in (("compat", ai), ("full", full)):
+        engine.pawn_table.clear()
+        start = time.perf_counter()
+        for board in boards:
+            engine._king_safety_score(board)
+            engine._pawn_structure_score(board)
+        print(f"{name:6s} {time.perf_counter() - start:.3f}s (old king safety {old:.3f}s), "
+              f"pawn hash hit rate {engine.pawn_table.hit_rate():.1%} on a game walk")
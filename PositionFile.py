@@ -0,0 +1,398 @@
+#Code Modified/writter by Larbalestier, Noah; F006B9P
+#26 October 2025
+#PA3 COSC 076, 25F
+#Scaffold and Driver given by Professor Soroush Vosoughi
+#Packed 32 byte training position records (.pos): bulk writer, mmap reader, pgn/epd converters
+
+import mmap
+import os
+import re
+import struct
+
+import chess
+import chess.pgn
+
+# occupancy (8) + one nibble per occupied square in square order (16) + flags (1) + ep square (1)
+# + score (2) + result (1) + halfmove clock (1) + fullmove number (2), little endian
+RECORD = struct.Struct("<Q16sBBhBBH")
+RECORD_SIZE = RECORD.size
+
+# flags: side to move, then the standard castling rights
+FLAG_WHITE = 1
+CASTLING_FLAGS = ((chess.BB_H1, 2), (chess.BB_A1, 4), (chess.BB_H8, 8), (chess.BB_A8, 16))
+
+NO_EP = 255
+# score is white's point of view in centipawns, search mates (MATE - plies, see
+# AlphaBetaAI) fit as they are, anything beyond is clamped to +-SCORE_MATE
+SCORE_NONE = -32768
+SCORE_MATE = 32000
+# result is stored as white's points * 2 (2 win, 1 draw, 0 loss)
+RESULT_NONE = 255
+
+RESULT_POINTS = {"1-0": 1.0, "0-1": 0.0, "1/2-1/2": 0.5}
+POINTS_RESULT = {1.0: "1-0", 0.0: "0-1", 0.5: "1/2-1/2"}
+
+# nibble of a piece: piece type, +8 for black
+PIECE_CODES = {(pt, color): pt | (0 if color else 8) for pt in chess.PIECE_TYPES for color in chess.COLORS}
+CODE_PIECES = {code: chess.Piece(pt, color) for (pt, color), code in PIECE_CODES.items()}
+
+LABEL_RE = re.compile(r'\[\s*([01](?:\.\d*)?)\s*\]')
+RESULT_RE = re.compile(r'(1-0|0-1|1/2-1/2)')
+CE_RE = re.compile(r'\bce\s+(-?\d+)')
+CLOCK_RE = re.compile(r'\b(hmvc|fmvn)\s+(\d+)')
+
+
+def _record_dtype():
+    import numpy as np
+    return np.dtype([("occupied", "<u8"), ("pieces", "u1", 16), ("flags", "u1"), ("ep", "u1"),
+                     ("score", "<i2"), ("result", "u1"), ("halfmove", "u1"), ("fullmove", "<u2")])
+
+
+def encode(board: chess.Board, score=None, result=None) -> bytes:
+    occupied = board.occupied
+    if chess.popcount(occupied) > 32:
+        raise ValueError("more than 32 pieces do not fit a record")
+    pieces = bytearray(16)
+    i = 0
+    for square in chess.scan_forward(occupied):
+        pieces[i >> 1] |= PIECE_CODES[board.piece_type_at(square), board.color_at(square)] << ((i & 1) * 4)
+        i += 1
+    flags = FLAG_WHITE if board.turn else 0
+    for corner, flag in CASTLING_FLAGS:
+        if board.castling_rights & corner:
+            flags |= flag
+    if score is None:
+        score = SCORE_NONE
+    elif score >= SCORE_MATE or score <= -SCORE_MATE:
+        score = SCORE_MATE if score > 0 else -SCORE_MATE
+    else:
+        score = int(round(score))
+    result = RESULT_NONE if result is None else int(round(result * 2))
+    # only a capturable ep square, so the same position always gives the same bytes
+    ep = board.ep_square if board.ep_square is not None and board.has_legal_en_passant() else NO_EP
+    return RECORD.pack(occupied, bytes(pieces), flags, ep,
+                       score, result, min(board.halfmove_clock, 255), min(board.fullmove_number, 0xFFFF))
+
+
+# (board, score or None, result points for white or None)
+def decode(record) -> tuple:
+    occupied, pieces, flags, ep, score, result, halfmove, fullmove = RECORD.unpack(record)
+    board = chess.Board.empty()
+    piece_map = {}
+    i = 0
+    for square in chess.scan_forward(occupied):
+        piece_map[square] = CODE_PIECES[(pieces[i >> 1] >> ((i & 1) * 4)) & 15]
+        i += 1
+    board.set_piece_map(piece_map)
+    board.turn = bool(flags & FLAG_WHITE)
+    rights = 0
+    for corner, flag in CASTLING_FLAGS:
+        if flags & flag:
+            rights |= corner
+    board.castling_rights = rights
+    board.ep_square = None if ep == NO_EP else ep
+    board.halfmove_clock = halfmove
+    board.fullmove_number = fullmove
+    return (board, None if score == SCORE_NONE else score, None if result == RESULT_NONE else result / 2)
+
+
+# one labeled epd/fen line: "<fen> c9 "1-0"; ce 35;", "<fen> [0.5]" or "<fen> 1/2-1/2"
+# -> (board, score for white or None, result points for white or None) like decode, Nones if unreadable
+def parse_epd(line: str):
+    label = LABEL_RE.search(line)
+    if label:
+        line = line[:label.start()]
+    fields = line.replace(";", " ").split()
+    length = 4
+    if len(fields) >= 6 and fields[4].isdigit() and fields[5].isdigit():
+        length = 6
+    try:
+        board = chess.Board(" ".join(fields[:length]))
+    except ValueError:
+        return None, None, None
+    rest = " ".join(fields[length:])
+    result = None
+    if label:
+        result = float(label.group(1))
+    else:
+        match = RESULT_RE.search(rest)
+        if match:
+            result = RESULT_POINTS[match.group(1)]
+    for op, value in CLOCK_RE.findall(rest):
+        if op == "hmvc":
+            board.halfmove_clock = int(value)
+        else:
+            board.fullmove_number = int(value)
+    score = None
+    match = CE_RE.search(rest)
+    if match:
+        # epd centipawn evaluations are from the side to move
+        score = int(match.group(1)) if board.turn else -int(match.group(1))
+    return board, score, result
+
+
+#appends records to a .pos file, buffered and written buffer_records at a time
+class PositionWriter():
+    def __init__(self, path: str, buffer_records: int = 4096, append: bool = True):
+        self.path = path
+        self.buffer_records = buffer_records
+        self._file = open(path, "ab" if append else "wb")
+        self._buffer = bytearray()
+        self._pending = 0
+        self.count = 0
+
+    def write(self, board: chess.Board, score=None, result=None):
+        self._buffer += encode(board, score, result)
+        self._pending += 1
+        self.count += 1
+        if self._pending >= self.buffer_records:
+            self.flush()
+
+    # every (board, score) of a finished game with its result ("1-0" or points)
+    def write_game(self, positions, result):
+        if isinstance(result, str):
+            result = RESULT_POINTS.get(result)
+        for board, score in positions:
+            self.write(board, score, result)
+
+    def flush(self):
+        if self._buffer:
+            self._file.write(self._buffer)
+            self._file.flush()
+            self._buffer = bytearray()
+            self._pending = 0
+
+    def close(self):
+        self.flush()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+#read only .pos reader, the file is mapped so records are only read when touched;
+#batches() hands out numpy record arrays that are views of the mapping (no copy)
+class PositionReader():
+    def __init__(self, path: str):
+        self.path = path
+        self._file = open(path, "rb")
+        size = os.fstat(self._file.fileno()).st_size
+        if size % RECORD_SIZE:
+            self._file.close()
+            raise ValueError(f"{path}: size {size} is not a multiple of {RECORD_SIZE} byte records")
+        self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ) if size else None
+        self.num_records = size // RECORD_SIZE
+
+    # numpy views must be dropped before closing
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __len__(self):
+        return self.num_records
+
+    def record(self, index: int) -> bytes:
+        if not 0 <= index < self.num_records:
+            raise IndexError(index)
+        return self._map[index * RECORD_SIZE:(index + 1) * RECORD_SIZE]
+
+    def __getitem__(self, index: int):
+        return decode(self.record(index if index >= 0 else index + self.num_records))
+
+    def __iter__(self):
+        for index in range(self.num_records):
+            yield decode(self._map[index * RECORD_SIZE:(index + 1) * RECORD_SIZE])
+
+    # structured numpy arrays of up to size records (fields as in _record_dtype)
+    def batches(self, size: int = 65536, start: int = 0, stop=None):
+        import numpy as np
+        dtype = _record_dtype()
+        stop = self.num_records if stop is None else min(stop, self.num_records)
+        for first in range(start, stop, size):
+            count = min(size, stop - first)
+            yield np.frombuffer(self._map, dtype=dtype, count=count, offset=first * RECORD_SIZE)
+
+
+# ---- converters
+
+def _pgn_games(path: str):
+    with open(path, errors="replace") as pgn:
+        while True:
+            game = chess.pgn.read_game(pgn)
+            if game is None:
+                return
+            yield game
+
+
+# every position of every game (before each move and the final one), scored from
+# [%eval] comments when the pgn has them
+def pgn_to_positions(pgn_path: str, out_path: str, min_ply: int = 0) -> int:
+    with PositionWriter(out_path) as writer:
+        for game in _pgn_games(pgn_path):
+            result = RESULT_POINTS.get(game.headers.get("Result"))
+            board = game.board()
+            node = game
+            ply = 0
+            while True:
+                following = node.next()
+                score = None
+                # the comment after a move scores the position it leads to
+                if node is not game and node.eval() is not None:
+                    score = node.eval().white().score(mate_score=SCORE_MATE)
+                if ply >= min_ply:
+                    writer.write(board, score, result)
+                if following is None:
+                    break
+                board.push(following.move)
+                node = following
+                ply += 1
+        return writer.count
+
+
+def epd_to_positions(epd_path: str, out_path: str) -> int:
+    with PositionWriter(out_path) as writer, open(epd_path) as epd:
+        for line in epd:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            board, score, result = parse_epd(line)
+            if board is not None:
+                writer.write(board, score, result)
+        return writer.count
+
+
+def positions_to_epd(pos_path: str, out_path: str) -> int:
+    count = 0
+    with PositionReader(pos_path) as reader, open(out_path, "w") as out:
+        for board, score, result in reader:
+            ops = {"hmvc": board.halfmove_clock, "fmvn": board.fullmove_number}
+            if result is not None:
+                ops["c9"] = POINTS_RESULT.get(result, f"{result:g}")
+            if score is not None:
+                ops["ce"] = score if board.turn else -score
+            out.write(board.epd(**ops) + "\n")
+            count += 1
+    return count
+
+
+# one single-position game per record (FEN header, result, score comment)
+def positions_to_pgn(pos_path: str, out_path: str) -> int:
+    count = 0
+    with PositionReader(pos_path) as reader, open(out_path, "w") as out:
+        for board, score, result in reader:
+            game = chess.pgn.Game()
+            game.setup(board)
+            game.headers["Result"] = POINTS_RESULT.get(result, "*")
+            if score is not None:
+                game.comment = f"[%eval {score / 100:.2f}]"
+            out.write(str(game) + "\n\n")
+            count += 1
+    return count
+
+
+# records/s of the binary format against fen text lines on the same positions
+def benchmark(boards, path: str, batch: int = 65536):
+    import time
+    rows = []
+    text_path = path + ".fen"
+    start = time.perf_counter()
+    with PositionWriter(path, append=False) as writer:
+        for board in boards:
+            writer.write(board, 0, 0.5)
+    rows.append(("write", "binary", len(boards) / (time.perf_counter() - start)))
+    start = time.perf_counter()
+    with open(text_path, "w") as out:
+        out.write("".join(f"{board.fen()} [0.5]\n" for board in boards))
+    rows.append(("write", "fen", len(boards) / (time.perf_counter() - start)))
+
+    start = time.perf_counter()
+    with PositionReader(path) as reader:
+        count = sum(1 for _ in reader)
+    rows.append(("read boards", "binary", count / (time.perf_counter() - start)))
+    start = time.perf_counter()
+    with open(text_path) as text:
+        count = sum(1 for line in text if parse_epd(line)[0] is not None)
+    rows.append(("read boards", "fen", count / (time.perf_counter() - start)))
+
+    start = time.perf_counter()
+    with PositionReader(path) as reader:
+        count = 0
+        total = 0
+        for records in reader.batches(batch):
+            total += int(records["score"].sum())
+            count += len(records)
+            del records
+    rows.append(("numpy batches", "binary", count / (time.perf_counter() - start)))
+    sizes = (os.path.getsize(path) / len(boards), os.path.getsize(text_path) / len(boards))
+    os.remove(text_path)
+    return rows, sizes
+
+
+if __name__ == "__main__":
+    import argparse
+    import random
+
+    parser = argparse.ArgumentParser(description="convert, inspect or benchmark .pos position files")
+    sub = parser.add_subparsers(dest="command", required=True)
+    for name, help_text in (("pgn2pos", "every position of pgn games"), ("epd2pos", "labeled epd/fen lines"),
+                            ("pos2epd", "epd lines with c9 result / ce score"), ("pos2pgn", "one game per position")):
+        convert = sub.add_parser(name, help=help_text)
+        convert.add_argument("source")
+        convert.add_argument("out")
+        if name == "pgn2pos":
+            convert.add_argument("--min-ply", type=int, default=0)
+    info = sub.add_parser("info", help="record count and result split of a .pos file")
+    info.add_argument("source")
+    bench = sub.add_parser("bench", help="binary vs fen text throughput on random game positions")
+    bench.add_argument("--positions", type=int, default=100000)
+    bench.add_argument("--out", default="bench.pos")
+    args = parser.parse_args()
+
+    if args.command == "pgn2pos":
+        print(f"wrote {pgn_to_positions(args.source, args.out, args.min_ply)} positions to {args.out}")
+    elif args.command == "epd2pos":
+        print(f"wrote {epd_to_positions(args.source, args.out)} positions to {args.out}")
+    elif args.command == "pos2epd":
+        print(f"wrote {positions_to_epd(args.source, args.out)} lines to {args.out}")
+    elif args.command == "pos2pgn":
+        print(f"wrote {positions_to_pgn(args.source, args.out)} games to {args.out}")
+    elif args.command == "info":
+        import numpy as np
+        with PositionReader(args.source) as reader:
+            results = np.zeros(256, dtype=np.int64)
+            scored = 0
+            for records in reader.batches():
+                results += np.bincount(records["result"], minlength=256)
+                scored += int(np.count_nonzero(records["score"] != SCORE_NONE))
+                del records
+            print(f"{len(reader)} positions ({len(reader) * RECORD_SIZE} bytes), {scored} scored, "
+                  f"white wins {results[2]}, draws {results[1]}, black wins {results[0]}, "
+                  f"no result {results[RESULT_NONE]}")
+    else:
+        rng = random.Random(1)
+        boards = []
+        while len(boards) < args.positions:
+            board = chess.Board()
+            while not board.is_game_over() and board.ply() < 200 and len(boards) < args.positions:
+                board.push(rng.choice(list(board.legal_moves)))
+                boards.append(board.copy(stack=False))
+        # round trip check before timing anything
+        for board in boards[:2000]:
+            decoded = decode(encode(board, 12, 1.0))
+            assert decoded[0].fen() == board.fen() and decoded[1:] == (12, 1.0), board.fen()
+        rows, (binary_size, text_size) = benchmark(boards, args.out)
+        for what, fmt, rate in rows:
+            print(f"{what:14s} {fmt:7s} {rate:12.0f} positions/s")
+        print(f"{binary_size:.0f} bytes per position binary, {text_size:.1f} as fen text")
+        os.remove(args.out)
@@ -0,0 +1,766 @@
+#Code Modified/writter by Larbalestier, Noah; F006B9P
+#26 October 2025
+#PA3 COSC 076, 25F
+#Scaffold and Driver given by Professor Soroush Vosoughi
+#Compact make/unmake board used inside the search
+
+import chess
+from chess import (BB_ALL, BB_SQUARES, BB_RANK_1, BB_RANK_8, BB_KNIGHT_ATTACKS, BB_KING_ATTACKS,
+                   BB_PAWN_ATTACKS, BB_RANK_ATTACKS, BB_FILE_ATTACKS, BB_DIAG_ATTACKS,
+                   BB_RANK_MASKS, BB_FILE_MASKS, BB_DIAG_MASKS, BB_RAYS, between)
+from chess.polyglot import POLYGLOT_RANDOM_ARRAY
+
+PAWN, KNIGHT, BISHOP, ROOK, QUEEN, KING = chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN, chess.KING
+
+# undo entries are allocated this many at a time
+UNDO_BLOCK = 1024
+
+BB_BACKRANKS = BB_RANK_1 | BB_RANK_8
+BB_RANK_3_4 = chess.BB_RANK_3 | chess.BB_RANK_4
+BB_RANK_5_6 = chess.BB_RANK_5 | chess.BB_RANK_6
+
+
+# moves are packed into 16 bits: from | to << 6 | promotion << 12, 0 is the null move
+def pack_move(move: chess.Move) -> int:
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+# one shared chess.Move per code, so unpacking never allocates
+MOVES = [None] * (7 << 12)
+for _promotion in (0, KNIGHT, BISHOP, ROOK, QUEEN):
+    for _from in chess.SQUARES:
+        for _to in chess.SQUARES:
+            MOVES[_from | (_to << 6) | (_promotion << 12)] = chess.Move(_from, _to, _promotion or None)
+MOVES[0] = chess.Move.null()
+
+PIECES = {(pt, color): chess.Piece(pt, color) for pt in chess.PIECE_TYPES for color in chess.COLORS}
+
+# polyglot zobrist keys, so board.key == chess.polyglot.zobrist_hash(board)
+PIECE_KEYS = [[[POLYGLOT_RANDOM_ARRAY[64 * ((pt - 1) * 2 + color) + sq] if pt else 0 for sq in chess.SQUARES]
+               for pt in range(7)] for color in (0, 1)]
+EP_KEYS = POLYGLOT_RANDOM_ARRAY[772:780]
+TURN_KEY = POLYGLOT_RANDOM_ARRAY[780]
+_CASTLING_FLAGS = ((chess.BB_H1, 768), (chess.BB_A1, 769), (chess.BB_H8, 770), (chess.BB_A8, 771))
+CASTLING_KEYS = {}
+for _rights in range(16):
+    _mask = 0
+    _key = 0
+    for _bit, (_square, _index) in enumerate(_CASTLING_FLAGS):
+        if _rights >> _bit & 1:
+            _mask |= _square
+            _key ^= POLYGLOT_RANDOM_ARRAY[_index]
+    CASTLING_KEYS[_mask] = _key
+
+
+#chess.Board replacement for the inside of a search: integer bitboards plus a
+#mailbox, an undo stack instead of copied board states, an incremental polyglot
+#key and its own legal move generator over packed moves. the subset of the
+#chess.Board interface the search and eval use is kept (same names, same move
+#order), so they run on either; convert at the choose_move boundary with
+#from_board, only standard chess is supported
+class SearchBoard():
+    __slots__ = ("pawns", "knights", "bishops", "rooks", "queens", "kings", "occupied_co", "occupied",
+                 "turn", "castling_rights", "ep_square", "halfmove_clock", "fullmove_number", "key",
+                 "move_stack", "_types", "_undo", "_ply", "_ep_key", "_legal_key", "_legal_turn", "_legal")
+
+    def __init__(self, fen: str = chess.STARTING_FEN):
+        self._set(chess.Board(fen))
+
+    def _set(self, board: chess.Board):
+        self.pawns = board.pawns
+        self.knights = board.knights
+        self.bishops = board.bishops
+        self.rooks = board.rooks
+        self.queens = board.queens
+        self.kings = board.kings
+        self.occupied_co = [board.occupied_co[chess.BLACK], board.occupied_co[chess.WHITE]]
+        self.occupied = board.occupied
+        self.turn = board.turn
+        self.castling_rights = board.clean_castling_rights()
+        self.ep_square = board.ep_square
+        self.halfmove_clock = board.halfmove_clock
+        self.fullmove_number = board.fullmove_number
+        self.move_stack = []
+        self._types = [board.piece_type_at(sq) or 0 for sq in chess.SQUARES]
+        self._undo = [None] * UNDO_BLOCK
+        self._ply = 0
+        self._ep_key = self._ep_hash()
+        self.key = self._full_key()
+        self._legal_key = None
+        self._legal_turn = None
+        self._legal = None
+
+    # the root position of board plus its moves, so repetitions see the whole game
+    @classmethod
+    def from_board(cls, board: chess.Board) -> "SearchBoard":
+        sb = cls.__new__(cls)
+        sb._set(board.root() if board.move_stack else board)
+        for move in board.move_stack:
+            sb.push(move)
+        return sb
+
+    def to_board(self) -> chess.Board:
+        board = chess.Board(None)
+        board.pawns, board.knights, board.bishops = self.pawns, self.knights, self.bishops
+        board.rooks, board.queens, board.kings = self.rooks, self.queens, self.kings
+        board.occupied_co[chess.WHITE] = self.occupied_co[1]
+        board.occupied_co[chess.BLACK] = self.occupied_co[0]
+        board.occupied = self.occupied
+        board.turn = self.turn
+        board.castling_rights = self.castling_rights
+        board.ep_square = self.ep_square
+        board.halfmove_clock = self.halfmove_clock
+        board.fullmove_number = self.fullmove_number
+        return board
+
+    def fen(self) -> str:
+        return self.to_board().fen()
+
+    def __repr__(self) -> str:
+        return f"SearchBoard({self.fen()!r})"
+
+    def _full_key(self) -> int:
+        key = self._ep_key ^ CASTLING_KEYS[self.castling_rights]
+        if self.turn == chess.WHITE:
+            key ^= TURN_KEY
+        for sq, pt in enumerate(self._types):
+            if pt:
+                key ^= PIECE_KEYS[1 if self.occupied_co[1] & BB_SQUARES[sq] else 0][pt][sq]
+        return key
+
+    # polyglot only hashes the en passant file when a pawn stands next to the target
+    def _ep_hash(self) -> int:
+        ep = self.ep_square
+        if ep is not None and BB_PAWN_ATTACKS[not self.turn][ep] & self.pawns & self.occupied_co[self.turn]:
+            return EP_KEYS[ep & 7]
+        return 0
+
+    def _toggle(self, pt: int, mask: int):
+        if pt == PAWN:
+            self.pawns ^= mask
+        elif pt == KNIGHT:
+            self.knights ^= mask
+        elif pt == BISHOP:
+            self.bishops ^= mask
+        elif pt == ROOK:
+            self.rooks ^= mask
+        elif pt == QUEEN:
+            self.queens ^= mask
+        else:
+            self.kings ^= mask
+
+    # make a packed move (legal, or the null move 0)
+    def make(self, code: int):
+        us = self.turn
+        ply = self._ply
+        undo = self._undo
+        if ply == len(undo):
+            undo.extend([None] * UNDO_BLOCK)
+        ep = self.ep_square
+        key = self.key ^ TURN_KEY ^ self._ep_key
+        halfmove = self.halfmove_clock + 1
+        if not us:
+            self.fullmove_number += 1
+        self._ply = ply + 1
+        if not code:
+            undo[ply] = (0, 0, 0, self.castling_rights, ep, self._ep_key, self.halfmove_clock, self.key)
+            self.ep_square = None
+            self._ep_key = 0
+            self.key = key
+            self.halfmove_clock = halfmove
+            self.turn = not us
+            return
+
+        frm = code & 63
+        to = (code >> 6) & 63
+        types = self._types
+        pt = types[frm]
+        captured = types[to]
+        undo[ply] = (code, pt, captured, self.castling_rights, ep, self._ep_key, self.halfmove_clock, self.key)
+        from_bb = BB_SQUARES[frm]
+        to_bb = BB_SQUARES[to]
+        occupied_co = self.occupied_co
+        own_keys = PIECE_KEYS[us]
+
+        self._toggle(pt, from_bb)
+        types[frm] = 0
+        key ^= own_keys[pt][frm]
+        new_ep = None
+        if pt == PAWN:
+            halfmove = 0
+            diff = to - frm
+            if diff == 16 or diff == -16:
+                new_ep = frm + (diff >> 1)
+            elif to == ep and not captured:
+                cap_sq = to - 8 if us else to + 8
+                cap_bb = BB_SQUARES[cap_sq]
+                self.pawns ^= cap_bb
+                types[cap_sq] = 0
+                occupied_co[not us] ^= cap_bb
+                key ^= PIECE_KEYS[not us][PAWN][cap_sq]
+        if captured:
+            halfmove = 0
+            self._toggle(captured, to_bb)
+            occupied_co[not us] ^= to_bb
+            key ^= PIECE_KEYS[not us][captured][to]
+        placed = code >> 12 or pt
+        self._toggle(placed, to_bb)
+        types[to] = placed
+        key ^= own_keys[placed][to]
+        occupied_co[us] ^= from_bb | to_bb
+        if pt == KING and (to - frm == 2 or frm - to == 2):
+            rook_from, rook_to = (frm + 3, frm + 1) if to > frm else (frm - 4, frm - 1)
+            rook_bb = BB_SQUARES[rook_from] | BB_SQUARES[rook_to]
+            self.rooks ^= rook_bb
+            occupied_co[us] ^= rook_bb
+            types[rook_from] = 0
+            types[rook_to] = ROOK
+            key ^= own_keys[ROOK][rook_from] ^ own_keys[ROOK][rook_to]
+
+        rights = self.castling_rights
+        if rights:
+            new_rights = rights & ~from_bb & ~to_bb
+            if pt == KING:
+                new_rights &= ~(BB_RANK_1 if us else BB_RANK_8)
+            if new_rights != rights:
+                key ^= CASTLING_KEYS[rights] ^ CASTLING_KEYS[new_rights]
+                self.castling_rights = new_rights
+        self.occupied = occupied_co[0] | occupied_co[1]
+        self.ep_square = new_ep
+        ep_key = 0
+        if new_ep is not None and BB_PAWN_ATTACKS[us][new_ep] & self.pawns & occupied_co[not us]:
+            ep_key = EP_KEYS[new_ep & 7]
+        self._ep_key = ep_key
+        self.key = key ^ ep_key
+        self.halfmove_clock = halfmove
+        self.turn = not us
+
+    def unmake(self) -> int:
+        ply = self._ply - 1
+        self._ply = ply
+        code, pt, captured, rights, ep, ep_key, halfmove, key = self._undo[ply]
+        self.castling_rights = rights
+        self.ep_square = ep
+        self._ep_key = ep_key
+        self.halfmove_clock = halfmove
+        self.key = key
+        us = not self.turn
+        self.turn = us
+        if not us:
+            self.fullmove_number -= 1
+        if not code:
+            return code
+
+        frm = code & 63
+        to = (code >> 6) & 63
+        from_bb = BB_SQUARES[frm]
+        to_bb = BB_SQUARES[to]
+        types = self._types
+        occupied_co = self.occupied_co
+        placed = code >> 12 or pt
+        self._toggle(placed, to_bb)
+        self._toggle(pt, from_bb)
+        types[frm] = pt
+        types[to] = captured
+        occupied_co[us] ^= from_bb | to_bb
+        if captured:
+            self._toggle(captured, to_bb)
+            occupied_co[not us] ^= to_bb
+        elif pt == PAWN and to == ep:
+            cap_sq = to - 8 if us else to + 8
+            cap_bb = BB_SQUARES[cap_sq]
+            self.pawns ^= cap_bb
+            types[cap_sq] = PAWN
+            occupied_co[not us] ^= cap_bb
+        elif pt == KING and (to - frm == 2 or frm - to == 2):
+            rook_from, rook_to = (frm + 3, frm + 1) if to > frm else (frm - 4, frm - 1)
+            rook_bb = BB_SQUARES[rook_from] | BB_SQUARES[rook_to]
+            self.rooks ^= rook_bb
+            occupied_co[us] ^= rook_bb
+            types[rook_from] = ROOK
+            types[rook_to] = 0
+        self.occupied = occupied_co[0] | occupied_co[1]
+        return code
+
+    # chess.Board style make/unmake, the move stack holds chess.Move objects
+    def push(self, move: chess.Move):
+        self.make(move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12) if move else 0)
+        self.move_stack.append(move)
+
+    def pop(self) -> chess.Move:
+        self.unmake()
+        return self.move_stack.pop()
+
+    def peek(self) -> chess.Move:
+        return self.move_stack[-1]
+
+    # ---- piece queries
+    def piece_type_at(self, square: int):
+        return self._types[square] or None
+
+    def color_at(self, square: int):
+        mask = BB_SQUARES[square]
+        if self.occupied_co[1] & mask:
+            return chess.WHITE
+        if self.occupied_co[0] & mask:
+            return chess.BLACK
+        return None
+
+    def piece_at(self, square: int):
+        pt = self._types[square]
+        if not pt:
+            return None
+        return PIECES[(pt, bool(self.occupied_co[1] & BB_SQUARES[square]))]
+
+    def piece_map(self):
+        return {sq: self.piece_at(sq) for sq in chess.scan_reversed(self.occupied)}
+
+    def pieces_mask(self, piece_type: int, color: bool) -> int:
+        if piece_type == PAWN:
+            bb = self.pawns
+        elif piece_type == KNIGHT:
+            bb = self.knights
+        elif piece_type == BISHOP:
+            bb = self.bishops
+        elif piece_type == ROOK:
+            bb = self.rooks
+        elif piece_type == QUEEN:
+            bb = self.queens
+        else:
+            bb = self.kings
+        return bb & self.occupied_co[color]
+
+    def pieces(self, piece_type: int, color: bool) -> chess.SquareSet:
+        return chess.SquareSet(self.pieces_mask(piece_type, color))
+
+    def king(self, color: bool):
+        mask = self.kings & self.occupied_co[color]
+        return mask.bit_length() - 1 if mask else None
+
+    def attacks_mask(self, square: int) -> int:
+        pt = self._types[square]
+        if pt == PAWN:
+            return BB_PAWN_ATTACKS[bool(self.occupied_co[1] & BB_SQUARES[square])][square]
+        if pt == KNIGHT:
+            return BB_KNIGHT_ATTACKS[square]
+        if pt == KING:
+            return BB_KING_ATTACKS[square]
+        occupied = self.occupied
+        attacks = 0
+        if pt == BISHOP or pt == QUEEN:
+            attacks = BB_DIAG_ATTACKS[square][BB_DIAG_MASKS[square] & occupied]
+        if pt == ROOK or pt == QUEEN:
+            attacks |= (BB_RANK_ATTACKS[square][BB_RANK_MASKS[square] & occupied]
+                        | BB_FILE_ATTACKS[square][BB_FILE_MASKS[square] & occupied])
+        return attacks
+
+    def attackers_mask(self, color: bool, square: int, occupied: int = None) -> int:
+        if occupied is None:
+            occupied = self.occupied
+        queens_and_rooks = self.queens | self.rooks
+        queens_and_bishops = self.queens | self.bishops
+        attackers = ((BB_KING_ATTACKS[square] & self.kings)
+                     | (BB_KNIGHT_ATTACKS[square] & self.knights)
+                     | (BB_RANK_ATTACKS[square][BB_RANK_MASKS[square] & occupied] & queens_and_rooks)
+                     | (BB_FILE_ATTACKS[square][BB_FILE_MASKS[square] & occupied] & queens_and_rooks)
+                     | (BB_DIAG_ATTACKS[square][BB_DIAG_MASKS[square] & occupied] & queens_and_bishops)
+                     | (BB_PAWN_ATTACKS[not color][square] & self.pawns))
+        return attackers & self.occupied_co[color]
+
+    def is_attacked_by(self, color: bool, square: int) -> bool:
+        return bool(self.attackers_mask(color, square))
+
+    def checkers_mask(self) -> int:
+        king = self.king(self.turn)
+        return 0 if king is None else self.attackers_mask(not self.turn, king)
+
+    def is_check(self) -> bool:
+        return bool(self.checkers_mask())
+
+    # ---- move properties (moves given as chess.Move)
+    def is_en_passant(self, move: chess.Move) -> bool:
+        return (self.ep_square == move.to_square and self._types[move.from_square] == PAWN
+                and abs(move.to_square - move.from_square) in (7, 9)
+                and not self.occupied & BB_SQUARES[move.to_square])
+
+    def is_capture(self, move: chess.Move) -> bool:
+        return bool(BB_SQUARES[move.to_square] & self.occupied_co[not self.turn]) or self.is_en_passant(move)
+
+    def is_zeroing(self, move: chess.Move) -> bool:
+        return self._types[move.from_square] == PAWN or bool(BB_SQUARES[move.to_square] & self.occupied_co[not self.turn])
+
+    def is_castling(self, move: chess.Move) -> bool:
+        if self._types[move.from_square] == KING:
+            diff = chess.square_file(move.from_square) - chess.square_file(move.to_square)
+            return abs(diff) > 1 or bool(self.rooks & self.occupied_co[self.turn] & BB_SQUARES[move.to_square])
+        return False
+
+    def is_kingside_castling(self, move: chess.Move) -> bool:
+        return self.is_castling(move) and chess.square_file(move.to_square) > chess.square_file(move.from_square)
+
+    def is_queenside_castling(self, move: chess.Move) -> bool:
+        return self.is_castling(move) and chess.square_file(move.to_square) < chess.square_file(move.from_square)
+
+    def gives_check(self, move: chess.Move) -> bool:
+        self.make(pack_move(move))
+        try:
+            return self.is_check()
+        finally:
+            self.unmake()
+
+    def is_legal(self, move: chess.Move) -> bool:
+        return bool(move) and pack_move(move) in self.legal_codes()
+
+    # ---- move generation, same moves in the same order as chess.Board
+    def _pseudo_codes(self, out, from_mask: int, to_mask: int):
+        us = self.turn
+        our = self.occupied_co[us]
+        occupied = self.occupied
+        types = self._types
+        pieces = our & ~self.pawns & from_mask
+        while pieces:
+            frm = pieces.bit_length() - 1
+            pieces ^= BB_SQUARES[frm]
+            pt = types[frm]
+            if pt == KNIGHT:
+                targets = BB_KNIGHT_ATTACKS[frm]
+            elif pt == KING:
+                targets = BB_KING_ATTACKS[frm]
+            else:
+                targets = 0
+                if pt != ROOK:
+                    targets = BB_DIAG_ATTACKS[frm][BB_DIAG_MASKS[frm] & occupied]
+                if pt != BISHOP:
+                    targets |= (BB_RANK_ATTACKS[frm][BB_RANK_MASKS[frm] & occupied]
+                                | BB_FILE_ATTACKS[frm][BB_FILE_MASKS[frm] & occupied])
+            targets &= ~our & to_mask
+            while targets:
+                to = targets.bit_length() - 1
+                targets ^= BB_SQUARES[to]
+                out.append(frm | (to << 6))
+
+        if from_mask & self.kings:
+            self._castling_codes(out, from_mask, to_mask)
+
+        pawns = self.pawns & our & from_mask
+        if not pawns:
+            return
+        enemy = self.occupied_co[not us] & to_mask
+        pawn_attacks = BB_PAWN_ATTACKS[us]
+        capturers = pawns
+        while capturers:
+            frm = capturers.bit_length() - 1
+            capturers ^= BB_SQUARES[frm]
+            targets = pawn_attacks[frm] & enemy
+            while targets:
+                to = targets.bit_length() - 1
+                targets ^= BB_SQUARES[to]
+                code = frm | (to << 6)
+                if BB_SQUARES[to] & BB_BACKRANKS:
+                    out.extend((code | QUEEN << 12, code | ROOK << 12, code | BISHOP << 12, code | KNIGHT << 12))
+                else:
+                    out.append(code)
+
+        if us:
+            single = pawns << 8 & ~occupied
+            double = single << 8 & ~occupied & BB_RANK_3_4
+            back = -8
+        else:
+            single = pawns >> 8 & ~occupied
+            double = single >> 8 & ~occupied & BB_RANK_5_6
+            back = 8
+        single &= to_mask
+        double &= to_mask
+        while single:
+            to = single.bit_length() - 1
+            single ^= BB_SQUARES[to]
+            code = (to + back) | (to << 6)
+            if BB_SQUARES[to] & BB_BACKRANKS:
+                out.extend((code | QUEEN << 12, code | ROOK << 12, code | BISHOP << 12, code | KNIGHT << 12))
+            else:
+                out.append(code)
+        while double:
+            to = double.bit_length() - 1
+            double ^= BB_SQUARES[to]
+            out.append((to + 2 * back) | (to << 6))
+
+        if self.ep_square:
+            self._ep_codes(out, from_mask, to_mask)
+
+    def _ep_codes(self, out, from_mask: int, to_mask: int):
+        ep = self.ep_square
+        if not ep or not BB_SQUARES[ep] & to_mask or BB_SQUARES[ep] & self.occupied:
+            return
+        us = self.turn
+        capturers = (self.pawns & self.occupied_co[us] & from_mask & BB_PAWN_ATTACKS[not us][ep]
+                     & chess.BB_RANKS[4 if us else 3])
+        while capturers:
+            frm = capturers.bit_length() - 1
+            capturers ^= BB_SQUARES[frm]
+            out.append(frm | (ep << 6))
+
+    def _castling_codes(self, out, from_mask: int, to_mask: int):
+        us = self.turn
+        backrank = BB_RANK_1 if us else BB_RANK_8
+        king = self.occupied_co[us] & self.kings & backrank & from_mask
+        king &= -king
+        if not king:
+            return
+        king_square = king.bit_length() - 1
+        occupied = self.occupied
+        candidates = self.castling_rights & backrank & to_mask
+        while candidates:
+            candidate = candidates.bit_length() - 1
+            rook = BB_SQUARES[candidate]
+            candidates ^= rook
+            a_side = rook < king
+            king_to = king_square - 2 if a_side else king_square + 2
+            rook_to = king_square - 1 if a_side else king_square + 1
+            king_path = between(king_square, king_to)
+            rook_path = between(candidate, rook_to)
+            king_to_bb = BB_SQUARES[king_to]
+            rook_to_bb = BB_SQUARES[rook_to]
+            if (occupied ^ king ^ rook) & (king_path | rook_path | king_to_bb | rook_to_bb):
+                continue
+            if self._attacked_for_king(king_path | king, occupied ^ king):
+                continue
+            if self._attacked_for_king(king_to_bb, occupied ^ king ^ rook ^ rook_to_bb):
+                continue
+            out.append(king_square | (king_to << 6))
+
+    def _attacked_for_king(self, path: int, occupied: int) -> bool:
+        them = not self.turn
+        while path:
+            sq = path.bit_length() - 1
+            path ^= BB_SQUARES[sq]
+            if self.attackers_mask(them, sq, occupied):
+                return True
+        return False
+
+    def _slider_blockers(self, king: int) -> int:
+        rooks_and_queens = self.rooks | self.queens
+        bishops_and_queens = self.bishops | self.queens
+        snipers = (((BB_RANK_ATTACKS[king][0] | BB_FILE_ATTACKS[king][0]) & rooks_and_queens)
+                   | (BB_DIAG_ATTACKS[king][0] & bishops_and_queens)) & self.occupied_co[not self.turn]
+        blockers = 0
+        occupied = self.occupied
+        while snipers:
+            sniper = snipers.bit_length() - 1
+            snipers ^= BB_SQUARES[sniper]
+            b = between(king, sniper) & occupied
+            if b and b & (b - 1) == 0:
+                blockers |= b
+        return blockers & self.occupied_co[self.turn]
+
+    def _pin_mask(self, square: int) -> int:
+        us = self.turn
+        king = self.king(us)
+        if king is None:
+            return BB_ALL
+        square_mask = BB_SQUARES[square]
+        for attacks, sliders in ((BB_FILE_ATTACKS, self.rooks | self.queens),
+                                 (BB_RANK_ATTACKS, self.rooks | self.queens),
+                                 (BB_DIAG_ATTACKS, self.bishops | self.queens)):
+            rays = attacks[king][0]
+            if rays & square_mask:
+                snipers = rays & sliders & self.occupied_co[not us]
+                while snipers:
+                    sniper = snipers.bit_length() - 1
+                    snipers ^= BB_SQUARES[sniper]
+                    if between(sniper, king) & (self.occupied | square_mask) == square_mask:
+                        return BB_RAYS[king][sniper]
+                break
+        return BB_ALL
+
+    def _ep_skewered(self, king: int, capturer: int) -> bool:
+        us = self.turn
+        last_double = self.ep_square + (-8 if us else 8)
+        occupancy = self.occupied & ~BB_SQUARES[last_double] & ~BB_SQUARES[capturer] | BB_SQUARES[self.ep_square]
+        enemy = self.occupied_co[not us]
+        if BB_RANK_ATTACKS[king][BB_RANK_MASKS[king] & occupancy] & enemy & (self.rooks | self.queens):
+            return True
+        return bool(BB_DIAG_ATTACKS[king][BB_DIAG_MASKS[king] & occupancy] & enemy & (self.bishops | self.queens))
+
+    def _is_safe(self, king: int, blockers: int, code: int) -> bool:
+        frm = code & 63
+        to = (code >> 6) & 63
+        if frm == king:
+            if to - frm == 2 or frm - to == 2:
+                return True
+            return not self.attackers_mask(not self.turn, to)
+        if (to == self.ep_square and self._types[frm] == PAWN and not self.occupied & BB_SQUARES[to]
+                and (to - frm) in (7, 9, -7, -9)):
+            return bool(self._pin_mask(frm) & BB_SQUARES[to]) and not self._ep_skewered(king, frm)
+        return not blockers & BB_SQUARES[frm] or bool(BB_RAYS[frm][to] & BB_SQUARES[king])
+
+    def _evasion_codes(self, out, king: int, checkers: int, from_mask: int, to_mask: int):
+        sliders = checkers & (self.bishops | self.rooks | self.queens)
+        attacked = 0
+        while sliders:
+            checker = sliders.bit_length() - 1
+            sliders ^= BB_SQUARES[checker]
+            attacked |= BB_RAYS[king][checker] & ~BB_SQUARES[checker]
+        if BB_SQUARES[king] & from_mask:
+            targets = BB_KING_ATTACKS[king] & ~self.occupied_co[self.turn] & ~attacked & to_mask
+            while targets:
+                to = targets.bit_length() - 1
+                targets ^= BB_SQUARES[to]
+                out.append(king | (to << 6))
+        checker = checkers.bit_length() - 1
+        if BB_SQUARES[checker] == checkers:
+            target = between(king, checker) | checkers
+            self._pseudo_codes(out, ~self.kings & from_mask, target & to_mask)
+            ep = self.ep_square
+            if ep and not BB_SQUARES[ep] & target:
+                if ep + (-8 if self.turn else 8) == checker:
+                    self._ep_codes(out, from_mask, to_mask)
+
+    # legal moves as packed codes; the full list is cached per position key (and
+    # turn, the legal mobility eval flips it by hand), callers must not change it
+    def legal_codes(self, from_mask: int = BB_ALL, to_mask: int = BB_ALL):
+        full = from_mask == BB_ALL and to_mask == BB_ALL
+        if full and self._legal_key == self.key and self._legal_turn == self.turn:
+            return self._legal
+        king_mask = self.kings & self.occupied_co[self.turn]
+        candidates = []
+        if king_mask:
+            king = king_mask.bit_length() - 1
+            blockers = self._slider_blockers(king)
+            checkers = self.attackers_mask(not self.turn, king)
+            if checkers:
+                self._evasion_codes(candidates, king, checkers, from_mask, to_mask)
+            else:
+                self._pseudo_codes(candidates, from_mask, to_mask)
+            # only king moves, pinned pieces and en passant captures can be illegal
+            suspects = blockers | king_mask
+            if self.ep_square:
+                suspects |= self.pawns
+            is_safe = self._is_safe
+            codes = [code for code in candidates
+                     if not BB_SQUARES[code & 63] & suspects or is_safe(king, blockers, code)]
+        else:
+            self._pseudo_codes(candidates, from_mask, to_mask)
+            codes = candidates
+        if full:
+            self._legal_key = self.key
+            self._legal_turn = self.turn
+            self._legal = codes
+        return codes
+
+    # any legal move at all; out of check it stops at the first piece that has one,
+    # which is what the game end tests at every node need
+    def has_legal_moves(self) -> bool:
+        if self._legal_key == self.key and self._legal_turn == self.turn:
+            return bool(self._legal)
+        king_mask = self.kings & self.occupied_co[self.turn]
+        if not king_mask:
+            return bool(self.legal_codes())
+        king = king_mask.bit_length() - 1
+        if self.attackers_mask(not self.turn, king):
+            return bool(self.legal_codes())
+        blockers = self._slider_blockers(king)
+        is_safe = self._is_safe
+        pieces = self.occupied_co[self.turn]
+        while pieces:
+            frm = pieces.bit_length() - 1
+            pieces ^= BB_SQUARES[frm]
+            candidates = []
+            self._pseudo_codes(candidates, BB_SQUARES[frm], BB_ALL)
+            for code in candidates:
+                if is_safe(king, blockers, code):
+                    return True
+        return False
+
+    def generate_legal_moves(self, from_mask: int = BB_ALL, to_mask: int = BB_ALL):
+        return [MOVES[code] for code in self.legal_codes(from_mask, to_mask)]
+
+    def generate_legal_ep(self, from_mask: int = BB_ALL, to_mask: int = BB_ALL):
+        ep = self.ep_square
+        if not ep:
+            return []
+        return [move for move in self.generate_legal_moves(from_mask, to_mask & BB_SQUARES[ep])
+                if self.is_en_passant(move)]
+
+    def generate_legal_captures(self, from_mask: int = BB_ALL, to_mask: int = BB_ALL):
+        return (self.generate_legal_moves(from_mask, to_mask & self.occupied_co[not self.turn])
+                + self.generate_legal_ep(from_mask, to_mask))
+
+    def generate_castling_moves(self, from_mask: int = BB_ALL, to_mask: int = BB_ALL):
+        codes = []
+        self._castling_codes(codes, from_mask, to_mask)
+        return [MOVES[code] for code in codes]
+
+    @property
+    def legal_moves(self) -> "LegalMoves":
+        return LegalMoves(self)
+
+    # ---- game end, same rules as chess.Board.is_game_over() without claims
+    def is_checkmate(self) -> bool:
+        return self.is_check() and not self.has_legal_moves()
+
+    def is_stalemate(self) -> bool:
+        return not self.is_check() and not self.has_legal_moves()
+
+    def has_insufficient_material(self, color: bool) -> bool:
+        own = self.occupied_co[color]
+        if own & (self.pawns | self.rooks | self.queens):
+            return False
+        if own & self.knights:
+            return chess.popcount(own) <= 2 and not (self.occupied_co[not color] & ~self.kings & ~self.queens)
+        if own & self.bishops:
+            same_color = (not self.bishops & chess.BB_DARK_SQUARES) or (not self.bishops & chess.BB_LIGHT_SQUARES)
+            return bool(same_color) and not self.pawns and not self.knights
+        return True
+
+    def is_insufficient_material(self) -> bool:
+        return self.has_insufficient_material(chess.WHITE) and self.has_insufficient_material(chess.BLACK)
+
+    def is_seventyfive_moves(self) -> bool:
+        return self.halfmove_clock >= 150 and self.has_legal_moves()
+
+    # same key count-1 more times since the last capture or pawn move
+    def is_repetition(self, count: int = 3) -> bool:
+        key = self.key
+        undo = self._undo
+        stop = max(0, self._ply - self.halfmove_clock)
+        for ply in range(self._ply - 2, stop - 1, -2):
+            if undo[ply][7] == key:
+                count -= 1
+                if count <= 1:
+                    return True
+        return False
+
+    # key of every position from the start of the game, ply indexed, current last
+    def history_keys(self):
+        return [undo[7] for undo in self._undo[:self._ply]] + [self.key]
+
+    def is_fivefold_repetition(self) -> bool:
+        return self.is_repetition(5)
+
+    def is_game_over(self) -> bool:
+        if not self.has_legal_moves() or self.is_insufficient_material():
+            return True
+        return self.halfmove_clock >= 150 or self.is_repetition(5)
+
+
+#board.legal_moves of a SearchBoard, iterable / countable / supports `in`
+class LegalMoves():
+    __slots__ = ("board",)
+
+    def __init__(self, board: SearchBoard):
+        self.board = board
+
+    def __iter__(self):
+        return iter(self.board.generate_legal_moves())
+
+    def __len__(self) -> int:
+        return len(self.board.legal_codes())
+
+    def count(self) -> int:
+        return len(self.board.legal_codes())
+
+    def __bool__(self) -> bool:
+        return self.board.has_legal_moves()
+
+    def __contains__(self, move) -> bool:
+        return self.board.is_legal(move)
@@ -0,0 +1,87 @@
+#Code Modified/writter by Larbalestier, Noah; F006B9P
+#26 October 2025
+#PA3 COSC 076, 25F
+#Scaffold and Driver given by Professor Soroush Vosoughi
+#Search statistics passed to on_iteration / on_search_end listeners
+
+from dataclasses import dataclass, field, replace
+from typing import List, Optional
+
+import chess
+
+
+# counters of one search (one choose_move call)
+@dataclass
+class SearchStats:
+    nodes: int = 0
+    qnodes: int = 0
+    eval_calls: int = 0
+    beta_cutoffs: int = 0
+    first_move_cutoffs: int = 0
+    tt_probes: int = 0
+    tt_hits: int = 0
+    extensions: int = 0
+    seldepth: int = 0
+    null_cutoffs: int = 0
+    lmr_reductions: int = 0
+    lmr_researches: int = 0
+    futility_prunes: int = 0
+    razor_cutoffs: int = 0
+    aspiration_researches: int = 0
+    endgame_hits: int = 0
+    pawn_probes: int = 0
+    pawn_hits: int = 0
+    batch_evals: int = 0
+    batch_hits: int = 0
+    seconds: float = 0.0
+    iterations: List["IterationInfo"] = field(default_factory=list)
+
+    @property
+    def total_nodes(self) -> int:
+        return self.nodes + self.qnodes
+
+    @property
+    def nps(self) -> float:
+        return self.total_nodes / self.seconds if self.seconds > 0 else 0.0
+
+    @property
+    def first_move_cutoff_rate(self) -> float:
+        return self.first_move_cutoffs / self.beta_cutoffs if self.beta_cutoffs else 0.0
+
+    @property
+    def tt_hit_rate(self) -> float:
+        return self.tt_hits / self.tt_probes if self.tt_probes else 0.0
+
+    @property
+    def pawn_hit_rate(self) -> float:
+        return self.pawn_hits / self.pawn_probes if self.pawn_probes else 0.0
+
+    # copy without the iteration list, what an IterationInfo carries
+    def snapshot(self) -> "SearchStats":
+        return replace(self, iterations=[])
+
+
+# one finished iterative deepening iteration
+@dataclass
+class IterationInfo:
+    depth: int
+    move: Optional[chess.Move]
+    score: int
+    nodes: int          # nodes of this iteration only
+    seconds: float      # time of this iteration only
+    elapsed: float      # time since the search started
+    pv: List[chess.Move] = field(default_factory=list)
+    stats: Optional[SearchStats] = None
+
+
+# the old progress line, registered by IDAI(verbose=True)
+def print_iteration(info: IterationInfo):
+    from AlphaBetaAI import score_text
+    print(f"the best move at depth {info.depth} is {info.move} (value {score_text(info.score)})")
+
+
+def print_search_end(stats: SearchStats):
+    print(f"nodes {stats.nodes} qnodes {stats.qnodes} evals {stats.eval_calls} "
+          f"nps {stats.nps:.0f} seldepth {stats.seldepth} "
+          f"first move cutoffs {stats.first_move_cutoff_rate:.1%} tt hits {stats.tt_hit_rate:.1%} "
+          f"pawn hash hits {stats.pawn_hit_rate:.1%}")
@@ -0,0 +1,99 @@
+#Code Modified/writter by Larbalestier, Noah; F006B9P
+#26 October 2025
+#PA3 COSC 076, 25F
+#Scaffold and Driver given by Professor Soroush Vosoughi
+#Time management module for chess (per move soft/hard limits from the clock)
+
+import time
+
+from AlphaBetaAI import is_mate_score
+
+# moves left to plan for when the clock gives no movestogo
+DEFAULT_MOVES_TO_GO = 30
+# seconds kept back from the clock for gui/transport lag
+MOVE_OVERHEAD = 0.05
+# the hard limit is at most this many soft limits and this share of the clock
+HARD_RATIO = 4.0
+MAX_CLOCK_SHARE = 0.3
+# the search looks at the clock once every this many nodes
+DEFAULT_POLL_NODES = 128
+
+# soft limit scaling: best move changed, score dropped (by SCORE_DROP), best move
+# unchanged for STABLE_ITERATIONS iterations; the scale stays in [MIN_SCALE, MAX_SCALE]
+BEST_MOVE_CHANGE = 1.4
+SCORE_DROP = 30
+SCORE_DROP_SCALE = 1.3
+STABLE_ITERATIONS = 3
+STABLE_SCALE = 0.6
+MIN_SCALE = 0.5
+MAX_SCALE = 3.0
+# effective branching factor assumed until two iterations were seen
+DEFAULT_EBF = 4.0
+
+
+#soft limit: no new iteration is started after it (scaled by how unsettled the
+#search is), hard limit: the running iteration is aborted
+class TimeManager():
+    def __init__(self, soft: float, hard: float = None, poll_nodes: int = DEFAULT_POLL_NODES):
+        self.soft = max(0.0, soft)
+        self.hard = max(self.soft, hard if hard is not None else soft)
+        self.poll_nodes = poll_nodes
+        self.scale = 1.0
+        self._start = time.perf_counter()
+        self._last_move = None
+        self._last_score = None
+        self._last_nodes = 0
+        self._stable = 0
+
+    # limits for one move from the clock, all times in seconds
+    @classmethod
+    def from_clock(cls, time_left: float, increment: float = 0.0, movestogo: int = None,
+                   overhead: float = MOVE_OVERHEAD):
+        usable = max(0.0, time_left - overhead)
+        moves = movestogo or DEFAULT_MOVES_TO_GO
+        soft = min(usable, usable / moves + 0.75 * increment)
+        if movestogo == 1:
+            hard = usable
+        else:
+            hard = min(usable, max(soft, min(soft * HARD_RATIO, usable * MAX_CLOCK_SHARE)))
+        return cls(soft, hard)
+
+    # a plain per move budget (movetime, time_budget)
+    @classmethod
+    def fixed(cls, seconds: float):
+        return cls(seconds, seconds)
+
+    def start(self):
+        self._start = time.perf_counter()
+
+    def elapsed(self) -> float:
+        return time.perf_counter() - self._start
+
+    def hard_limit_reached(self) -> bool:
+        return time.perf_counter() - self._start >= self.hard
+
+    # after a finished iteration: True if the next (deeper) one is worth starting
+    def next_iteration(self, depth: int, move, score: int, nodes: int, seconds: float) -> bool:
+        if self._last_move is not None:
+            if move != self._last_move:
+                self._stable = 0
+                self.scale *= BEST_MOVE_CHANGE
+            else:
+                self._stable += 1
+            if (not is_mate_score(score) and self._last_score is not None and not is_mate_score(self._last_score)
+                    and score < self._last_score - SCORE_DROP):
+                self.scale *= SCORE_DROP_SCALE
+            self.scale = max(MIN_SCALE, min(MAX_SCALE, self.scale))
+        ebf = nodes / self._last_nodes if self._last_nodes and nodes > self._last_nodes else DEFAULT_EBF
+        self._last_move = move
+        self._last_score = score
+        self._last_nodes = nodes
+
+        soft = self.soft * self.scale
+        if self._stable >= STABLE_ITERATIONS:
+            soft *= STABLE_SCALE
+        elapsed = self.elapsed()
+        if elapsed >= min(soft, self.hard):
+            return False
+        # an iteration that can't finish before the hard limit would be thrown away
+        return elapsed + seconds * ebf < self.hard
@@ -0,0 +1,301 @@
+#Code Modified/writter by Larbalestier, Noah; F006B9P
+#26 October 2025
+#PA3 COSC 076, 25F
+#Scaffold and Driver given by Professor Soroush Vosoughi
+#Self-play tournament runner (parallel games, Elo, SPRT)
+
+import argparse
+import contextlib
+import io
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import chess
+import chess.pgn
+from RandomAI import RandomAI
+from MinimaxAI import MinimaxAI
+from AlphaBetaAI import AlphaBetaAI
+from IDAI import IDAI
+
+# classes a player spec like "IDAI(4, max_nodes=20000)" may use
+PLAYER_CLASSES = {
+    "RandomAI": RandomAI,
+    "MinimaxAI": MinimaxAI,
+    "AlphaBetaAI": AlphaBetaAI,
+    "IDAI": IDAI,
+}
+
+# short, balanced openings, each one is played twice with colors swapped
+OPENINGS = [
+    "e2e4 e7e5 g1f3 b8c6",              # open game
+    "e2e4 c7c5 g1f3 d7d6",              # sicilian
+    "e2e4 e7e6 d2d4 d7d5",              # french
+    "e2e4 c7c6 d2d4 d7d5",              # caro-kann
+    "e2e4 d7d6 d2d4 g8f6",              # pirc
+    "e2e4 e7e5 f1c4 g8f6",              # bishop's opening
+    "d2d4 d7d5 c2c4 e7e6",              # queen's gambit declined
+    "d2d4 d7d5 c2c4 c7c6",              # slav
+    "d2d4 g8f6 c2c4 g7g6",              # king's indian
+    "d2d4 g8f6 c2c4 e7e6",              # nimzo / queen's indian
+    "d2d4 f7f5 g2g3 g8f6",              # dutch
+    "c2c4 e7e5 b1c3 g8f6",              # english
+    "g1f3 d7d5 g2g3 g8f6",              # reti
+    "e2e4 e7e5 g1f3 g8f6",              # petrov
+    "e2e4 d7d5 e4d5 d8d5",              # scandinavian
+    "d2d4 d7d5 g1f3 g8f6",              # queen's pawn
+]
+
+ADJUDICATE_VALUES = {chess.PAWN: 1, chess.KNIGHT: 3, chess.BISHOP: 3, chess.ROOK: 5, chess.QUEEN: 9}
+
+
+def make_player(spec: str):
+    return eval(spec, {"__builtins__": {}}, dict(PLAYER_CLASSES))
+
+
+def _material_balance(board: chess.Board) -> int:
+    balance = 0
+    for piece_type, value in ADJUDICATE_VALUES.items():
+        balance += value * (len(board.pieces(piece_type, chess.WHITE)) - len(board.pieces(piece_type, chess.BLACK)))
+    return balance
+
+
+# plays one game, returns (result for white "1-0"/"0-1"/"1/2-1/2", reason, pgn text)
+# limits: movetime (seconds, passed as time_budget), nodes (sets max_nodes),
+# max_plies (draw adjudication), resign_margin/resign_plies (material adjudication)
+def play_game(white_spec: str, black_spec: str, opening: str, limits: dict, round_no: int = 1):
+    with contextlib.redirect_stdout(io.StringIO()):
+        players = {chess.WHITE: make_player(white_spec), chess.BLACK: make_player(black_spec)}
+        for player in players.values():
+            if limits.get("nodes") and hasattr(player, "max_nodes"):
+                player.max_nodes = limits["nodes"]
+            if hasattr(player, "verbose"):
+                player.verbose = False
+            # both engines share this process, a pondering thread would eat into
+            # the opponent's own time limited search and bias the match
+            if getattr(player, "ponder", False):
+                player.ponder = False
+
+        board = chess.Board()
+        for uci in opening.split():
+            board.push_uci(uci)
+
+        result, reason = None, None
+        lopsided = 0
+        while result is None:
+            if board.is_game_over(claim_draw=True):
+                result = board.result(claim_draw=True)
+                outcome = board.outcome(claim_draw=True)
+                reason = outcome.termination.name.lower() if outcome else "game over"
+                break
+            if len(board.move_stack) >= limits.get("max_plies", 300):
+                result, reason = "1/2-1/2", "adjudicated: move limit"
+                break
+            balance = _material_balance(board)
+            lopsided = lopsided + 1 if abs(balance) >= limits.get("resign_margin", 10) else 0
+            if lopsided >= limits.get("resign_plies", 8):
+                result = "1-0" if balance > 0 else "0-1"
+                reason = "adjudicated: material"
+                break
+
+            player = players[board.turn]
+            if limits.get("movetime") and isinstance(player, IDAI):
+                move = player.choose_move(board, limits["movetime"])
+            else:
+                move = player.choose_move(board)
+            if move is None or move not in board.legal_moves:
+                result = "0-1" if board.turn == chess.WHITE else "1-0"
+                reason = "illegal move"
+                break
+            board.push(move)
+            opponent = players[board.turn]
+            if hasattr(opponent, "opponent_moved"):
+                opponent.opponent_moved(board, move)
+
+        for player in players.values():
+            if hasattr(player, "close"):
+                player.close()
+
+    game = chess.pgn.Game.from_board(board)
+    game.headers["Event"] = "chessbot tournament"
+    game.headers["Round"] = str(round_no)
+    game.headers["White"] = white_spec
+    game.headers["Black"] = black_spec
+    game.headers["Result"] = result
+    game.headers["Termination"] = reason
+    game.headers["Opening"] = opening
+    return result, reason, str(game)
+
+
+def expected_score(elo: float) -> float:
+    return 1.0 / (1.0 + 10 ** (-elo / 400.0))
+
+
+def elo_from_score(score: float) -> float:
+    score = min(max(score, 1e-6), 1 - 1e-6)
+    return -400.0 * math.log10(1.0 / score - 1.0)
+
+
+# elo difference of player A with a 95% interval and likelihood of superiority
+def elo_stats(wins: int, draws: int, losses: int) -> dict:
+    n = wins + draws + losses
+    if n == 0:
+        return {"games": 0, "elo": 0.0, "error": math.inf, "los": 0.5, "score": 0.5}
+    score = (wins + 0.5 * draws) / n
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / n
+    stderr = math.sqrt(variance / n)
+    low = elo_from_score(score - 1.96 * stderr)
+    high = elo_from_score(score + 1.96 * stderr)
+    decisive = wins + losses
+    los = 0.5 * (1 + math.erf((wins - losses) / math.sqrt(2 * decisive))) if decisive else 0.5
+    return {"games": n, "score": score, "elo": elo_from_score(score),
+            "error": (high - low) / 2, "los": los}
+
+
+# log likelihood ratio of H1 (elo1) vs H0 (elo0), normal approximation of the trinomial
+def sprt_llr(wins: int, draws: int, losses: int, elo0: float, elo1: float) -> float:
+    n = wins + draws + losses
+    if n == 0:
+        return 0.0
+    score = (wins + 0.5 * draws) / n
+    variance = (wins * (1 - score) ** 2 + draws * (0.5 - score) ** 2 + losses * score ** 2) / n
+    # all games the same result (all draws, all wins): no spread to test against
+    if variance == 0:
+        return 0.0
+    s0 = expected_score(elo0)
+    s1 = expected_score(elo1)
+    return n * (s1 - s0) * (2 * score - s0 - s1) / (2 * variance)
+
+
+def sprt_bounds(alpha: float, beta: float):
+    return math.log(beta / (1 - alpha)), math.log((1 - beta) / alpha)
+
+
+#runs player A against player B over the opening set with colors swapped
+#games are spread over a process pool and written to the pgn as they finish
+class Tournament():
+    def __init__(self, spec_a: str, spec_b: str, games: int = 32, workers: int = None,
+                 limits: dict = None, pgn_path: str = None, sprt: tuple = None,
+                 openings=None):
+        self.spec_a = spec_a
+        self.spec_b = spec_b
+        self.games = games
+        self.workers = workers or os.cpu_count() or 1
+        self.limits = limits or {}
+        self.pgn_path = pgn_path
+        # sprt = (elo0, elo1, alpha, beta)
+        self.sprt = sprt
+        self.openings = openings or OPENINGS
+        self.wins = self.draws = self.losses = 0
+        self.decision = None
+
+    # game i: opening i // 2, player A is white on even i
+    def _schedule(self):
+        for i in range(self.games):
+            opening = self.openings[(i // 2) % len(self.openings)]
+            if i % 2 == 0:
+                yield i, self.spec_a, self.spec_b, opening, chess.WHITE
+            else:
+                yield i, self.spec_b, self.spec_a, opening, chess.BLACK
+
+    def _record(self, result: str, a_color: bool):
+        if result == "1/2-1/2":
+            self.draws += 1
+        elif (result == "1-0") == (a_color == chess.WHITE):
+            self.wins += 1
+        else:
+            self.losses += 1
+
+    def _check_sprt(self):
+        if not self.sprt:
+            return None
+        elo0, elo1, alpha, beta = self.sprt
+        llr = sprt_llr(self.wins, self.draws, self.losses, elo0, elo1)
+        lower, upper = sprt_bounds(alpha, beta)
+        if llr >= upper:
+            return "H1 accepted"
+        if llr <= lower:
+            return "H0 accepted"
+        return None
+
+    def run(self, report=print):
+        schedule = self._schedule()
+        pgn = open(self.pgn_path, "a") if self.pgn_path else None
+        try:
+            with ProcessPoolExecutor(max_workers=self.workers) as pool:
+                pending = {}
+                # keep at most 2 games per worker queued so an sprt stop wastes little
+                for _ in range(self.workers * 2):
+                    self._submit(pool, pending, schedule)
+                while pending:
+                    done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        a_color = pending.pop(future)
+                        result, reason, text = future.result()
+                        self._record(result, a_color)
+                        if pgn:
+                            pgn.write(text + "\n\n")
+                            pgn.flush()
+                        if report:
+                            report(self.summary_line() + f"  ({result} {reason})")
+                        self.decision = self.decision or self._check_sprt()
+                    if self.decision:
+                        for future in pending:
+                            future.cancel()
+                        break
+                    for _ in done:
+                        self._submit(pool, pending, schedule)
+        finally:
+            if pgn:
+                pgn.close()
+        return self.results()
+
+    def _submit(self, pool, pending, schedule):
+        job = next(schedule, None)
+        if job is None:
+            return
+        i, white, black, opening, a_color = job
+        future = pool.submit(play_game, white, black, opening, self.limits, i + 1)
+        pending[future] = a_color
+
+    def results(self) -> dict:
+        stats = elo_stats(self.wins, self.draws, self.losses)
+        stats.update(wins=self.wins, draws=self.draws, losses=self.losses)
+        if self.sprt:
+            elo0, elo1, alpha, beta = self.sprt
+            stats["llr"] = sprt_llr(self.wins, self.draws, self.losses, elo0, elo1)
+            stats["llr_bounds"] = sprt_bounds(alpha, beta)
+            stats["decision"] = self.decision
+        return stats
+
+    def summary_line(self) -> str:
+        stats = self.results()
+        line = (f"games {stats['games']:4d}  +{self.wins} ={self.draws} -{self.losses}  "
+                f"elo {stats['elo']:+7.1f} +/- {stats['error']:.1f}  los {stats['los']:.1%}")
+        if self.sprt:
+            lower, upper = stats["llr_bounds"]
+            line += f"  llr {stats['llr']:+.2f} [{lower:.2f}, {upper:.2f}]"
+        return line
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="play two engine configurations against each other")
+    parser.add_argument("player_a", help='e.g. "AlphaBetaAI(3)"')
+    parser.add_argument("player_b", help='e.g. "IDAI(4, max_nodes=20000)"')
+    parser.add_argument("--games", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--movetime", type=float, default=None, help="seconds per move (IDAI players)")
+    parser.add_argument("--nodes", type=int, default=None, help="node limit per move (IDAI players)")
+    parser.add_argument("--max-plies", type=int, default=300)
+    parser.add_argument("--pgn", default=None, help="append finished games to this file")
+    parser.add_argument("--sprt", nargs=4, type=float, metavar=("ELO0", "ELO1", "ALPHA", "BETA"),
+                        help="stop as soon as H0 (elo0) or H1 (elo1) is accepted, e.g. 0 10 0.05 0.05")
+    args = parser.parse_args()
+
+    limits = {"movetime": args.movetime, "nodes": args.nodes, "max_plies": args.max_plies}
+    tournament = Tournament(args.player_a, args.player_b, games=args.games, workers=args.workers,
+                            limits=limits, pgn_path=args.pgn, sprt=tuple(args.sprt) if args.sprt else None)
+    tournament.run()
+    print("final:", tournament.summary_line())
+    if tournament.decision:
+        print("SPRT:", tournament.decision)
@@ -0,0 +1,181 @@
+#Code Modified/writter by Larbalestier, Noah; F006B9P
+#26 October 2025
+#PA3 COSC 076, 25F
+#Scaffold and Driver given by Professor Soroush Vosoughi
+#Transposition table module for chess
+
+import chess
+import chess.polyglot
+from SearchBoard import SearchBoard
+
+# bound types stored with each entry, 0 marks an empty slot
+EMPTY = 0
+EXACT = 1
+LOWER = 2
+UPPER = 3
+
+# key ^ data (8) + score (8, integer centipawns) + move (2) + depth (1) + bound (1) + generation (1)
+ENTRY_SIZE = 21
+
+
+# same polyglot key either way, a SearchBoard keeps it up to date on every move
+def position_key(board: chess.Board) -> int:
+    if type(board) is SearchBoard:
+        return board.key
+    return chess.polyglot.zobrist_hash(board)
+
+
+# moves packed into 16 bits: from | to << 6 | promotion << 12, 0 means no move
+def pack_move(move) -> int:
+    if move is None:
+        return 0
+    return move.from_square | (move.to_square << 6) | ((move.promotion or 0) << 12)
+
+
+def unpack_move(code: int):
+    if not code:
+        return None
+    promotion = code >> 12
+    return chess.Move(code & 63, (code >> 6) & 63, promotion or None)
+
+
+#fixed size table, every field lives in one flat buffer so the whole thing
+#costs exactly the memory budget and can sit on a shared memory buffer
+#each bucket holds two slots: slot 0 is depth-preferred, slot 1 always-replace
+class TranspositionTable():
+    def __init__(self, size_mb: float = 16, buffer=None):
+        if buffer is None:
+            num_entries = max(2, int(size_mb * 1024 * 1024) // ENTRY_SIZE)
+            buffer = bytearray(num_entries * ENTRY_SIZE)
+        else:
+            num_entries = len(buffer) // ENTRY_SIZE
+        self.num_buckets = num_entries // 2
+        self.num_entries = self.num_buckets * 2
+        self.size_mb = len(buffer) / (1024 * 1024)
+        self._buffer = buffer
+        self._view = memoryview(buffer)
+        self._map_fields(self._view)
+        self.generation = 0
+        self.reset_stats()
+
+    def _map_fields(self, view):
+        n = self.num_entries
+        offset = 0
+        fields = []
+        for fmt, width in (("Q", 8), ("q", 8), ("H", 2), ("b", 1), ("B", 1), ("B", 1)):
+            fields.append(view[offset:offset + n * width].cast(fmt))
+            offset += n * width
+        self._keys, self._scores, self._moves, self._depths, self._flags, self._gens = fields
+
+    # drops every view into the buffer, shared memory can only be closed after this
+    def release(self):
+        for field in (self._keys, self._scores, self._moves, self._depths, self._flags, self._gens):
+            field.release()
+        self._view.release()
+
+    def reset_stats(self):
+        self.probes = 0
+        self.hits = 0
+        self.collisions = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    # called once per root search so older entries become preferred victims
+    def new_search(self):
+        self.generation = (self.generation + 1) & 0xFF
+
+    def clear(self):
+        for i in range(self.num_entries):
+            self._flags[i] = EMPTY
+        self.generation = 0
+        self.reset_stats()
+
+    # lockless hashing: a slot holds key ^ data of its own fields, so a
+    # slot torn by two processes writing it at once (LazySMP) no longer matches
+    # its key and is treated as a miss
+    def _data(self, i: int) -> int:
+        return ((self._scores[i] & 0xFFFFFFFF) | (self._moves[i] << 32)
+                | ((self._depths[i] & 0xFF) << 48) | (self._flags[i] << 56))
+
+    # the key of slot i, None if it is empty or torn
+    def _key(self, i: int):
+        if not self._flags[i]:
+            return None
+        return self._keys[i] ^ self._data(i)
+
+    # returns (depth, bound, score, packed move) or None
+    def probe(self, key: int):
+        self.probes += 1
+        slot = (key % self.num_buckets) << 1
+        for i in (slot, slot + 1):
+            bound = self._flags[i]
+            if not bound:
+                continue
+            depth, score, code = self._depths[i], self._scores[i], self._moves[i]
+            data = (score & 0xFFFFFFFF) | (code << 32) | ((depth & 0xFF) << 48) | (bound << 56)
+            if self._keys[i] ^ data == key:
+                self.hits += 1
+                return depth, bound, score, code
+        if self._flags[slot] or self._flags[slot + 1]:
+            self.collisions += 1
+        return None
+
+    # packed best move of a position without touching the probe counters
+    def best_move(self, key: int) -> int:
+        slot = (key % self.num_buckets) << 1
+        for i in (slot, slot + 1):
+            if self._key(i) == key:
+                return self._moves[i]
+        return 0
+
+    def store(self, key: int, depth: int, bound: int, score: int, move=None):
+        self.stores += 1
+        slot = (key % self.num_buckets) << 1
+        flags = self._flags
+        first, second = self._key(slot), self._key(slot + 1)
+        if second == key and depth < self._depths[slot + 1]:
+            # same position already sits in the always-replace slot deeper, keep it
+            return
+        if (first is None or first == key or depth >= self._depths[slot]
+                or self._gens[slot] != self.generation):
+            target = slot
+        else:
+            target = slot + 1
+
+        code = pack_move(move)
+        old = first if target == slot else second
+        if flags[target] and old != key:
+            self.overwrites += 1
+        elif not code and old is not None:
+            # keep the old best move of this position if we have no new one
+            code = self._moves[target]
+
+        depth = max(-128, min(127, depth))
+        self._scores[target] = score
+        self._moves[target] = code
+        self._depths[target] = depth
+        flags[target] = bound
+        self._gens[target] = self.generation
+        self._keys[target] = key ^ ((score & 0xFFFFFFFF) | (code << 32) | ((depth & 0xFF) << 48) | (bound << 56))
+
+    # permille of a sample of slots used by the current search, like uci hashfull
+    def hashfull(self) -> int:
+        sample = min(1000, self.num_entries)
+        used = 0
+        for i in range(sample):
+            if self._flags[i] and self._gens[i] == self.generation:
+                used += 1
+        return used * 1000 // sample
+
+    def stats(self) -> dict:
+        return {
+            "size_mb": round(self.size_mb, 2),
+            "entries": self.num_entries,
+            "probes": self.probes,
+            "hits": self.hits,
+            "hit_rate": self.hits / self.probes if self.probes else 0.0,
+            "collisions": self.collisions,
+            "stores": self.stores,
+            "overwrites": self.overwrites,
+            "hashfull": self.hashfull(),
+        }
@@ -0,0 +1,400 @@
+#Code Modified/writter by Larbalestier, Noah; F006B9P
+#26 October 2025
+#PA3 COSC 076, 25F
+#Scaffold and Driver given by Professor Soroush Vosoughi
+#Texel style tuning of the eval weights / material / piece-square tables from labeled positions (needs numpy)
+
+import argparse
+import io
+import math
+import os
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+
+import chess
+import chess.pgn
+import numpy as np
+
+from AlphaBetaAI import AlphaBetaAI, ORDER_VALUES, save_weights
+from PositionFile import PositionReader, RESULT_POINTS, decode, parse_epd
+
+# pieces_eval is linear in these parameters (white's point of view):
+#   material count difference of P N B R Q   -> weights["material"] * material_values
+#   piece-square occupancy difference 6 x 64 -> weights["piece_square"] * piece_square_tables
+#   king safety, mobility, pawn structure     -> their weights as they are
+MATERIAL_TYPES = (chess.PAWN, chess.KNIGHT, chess.BISHOP, chess.ROOK, chess.QUEEN)
+PST_OFFSET = len(MATERIAL_TYPES)
+TERM_OFFSET = PST_OFFSET + 6 * 64
+TERMS = ("king_safety", "mobility", "pawn_structure")
+FEATURES = TERM_OFFSET + len(TERMS)
+
+
+# ---- streaming input, nothing is read ahead of what the pool is working on
+
+# one labeled line per position: "<fen> c9 "1-0";", "<fen> [0.5]" or "<fen> 1/2-1/2"
+def epd_records(path: str):
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if line and not line.startswith("#"):
+                yield ("epd", line)
+
+
+# raw text of one game at a time, parsed in the workers
+def pgn_records(path: str):
+    lines = []
+    in_moves = False
+    with open(path, errors="replace") as f:
+        for line in f:
+            if line.startswith("[") and in_moves:
+                yield ("pgn", "".join(lines))
+                lines = []
+                in_moves = False
+            elif line.strip() and not line.startswith("["):
+                in_moves = True
+            lines.append(line)
+    if in_moves:
+        yield ("pgn", "".join(lines))
+
+
+# packed records of a .pos file (PositionFile.py)
+def pos_records(path: str):
+    with PositionReader(path) as reader:
+        for index in range(len(reader)):
+            yield ("pos", reader.record(index))
+
+
+def records(paths):
+    for path in paths:
+        if path.lower().endswith(".pgn"):
+            yield from pgn_records(path)
+        elif path.lower().endswith(".pos"):
+            yield from pos_records(path)
+        else:
+            yield from epd_records(path)
+
+
+def chunked(iterable, size: int):
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+# (board, result for white) of every position of a game past min_ply
+def _pgn_positions(text: str, min_ply: int):
+    game = chess.pgn.read_game(io.StringIO(text))
+    if game is None or game.headers.get("Result") not in RESULT_POINTS:
+        return
+    result = RESULT_POINTS[game.headers["Result"]]
+    board = game.board()
+    for ply, move in enumerate(game.mainline_moves(), 1):
+        board.push(move)
+        if ply >= min_ply:
+            yield board.copy(stack=False), result
+
+
+# no check, no promotion and no capture that obviously wins material, so the
+# static eval is close to what quiescence would return
+def is_quiet(board: chess.Board) -> bool:
+    if board.is_check() or board.is_game_over():
+        return False
+    for move in board.generate_legal_captures():
+        if move.promotion:
+            return False
+        victim = ORDER_VALUES[board.piece_type_at(move.to_square) or chess.PAWN]
+        attacker = ORDER_VALUES[board.piece_type_at(move.from_square)]
+        if victim >= attacker or not board.is_attacked_by(not board.turn, move.to_square):
+            return False
+    return not any(board.generate_legal_moves(board.pawns, chess.BB_BACKRANKS))
+
+
+def features(ai: AlphaBetaAI, board: chess.Board, out) -> None:
+    for i, piece_type in enumerate(MATERIAL_TYPES):
+        out[i] = len(board.pieces(piece_type, chess.WHITE)) - len(board.pieces(piece_type, chess.BLACK))
+    for piece_type in chess.PIECE_TYPES:
+        base = PST_OFFSET + (piece_type - 1) * 64
+        for square in board.pieces(piece_type, chess.WHITE):
+            out[base + square] += 1
+        for square in board.pieces(piece_type, chess.BLACK):
+            out[base + chess.square_mirror(square)] -= 1
+    out[TERM_OFFSET] = ai._king_safety_score(board)
+    out[TERM_OFFSET + 1] = ai._mobility_score(board)
+    out[TERM_OFFSET + 2] = ai._pawn_structure_score(board)
+
+
+# parameter vector of an engine's current eval, features @ theta == pieces_eval(board, WHITE)
+def parameters(ai: AlphaBetaAI):
+    theta = np.zeros(FEATURES)
+    for i, piece_type in enumerate(MATERIAL_TYPES):
+        theta[i] = ai.weights["material"] * ai.material_values[piece_type]
+    for piece_type in chess.PIECE_TYPES:
+        base = PST_OFFSET + (piece_type - 1) * 64
+        theta[base:base + 64] = ai.weights["piece_square"] * np.array(ai.piece_square_tables[piece_type], dtype=float)
+    for i, term in enumerate(TERMS):
+        theta[TERM_OFFSET + i] = ai.weights[term]
+    return theta
+
+
+# back to weights / material / tables, the scale weights stay as they are and the
+# integer tables absorb the change (rounded, material to 1 and psts to 10ths of a cp)
+def unpack_parameters(ai: AlphaBetaAI, theta):
+    weights = dict(ai.weights)
+    material = dict(ai.material_values)
+    tables = {}
+    for i, piece_type in enumerate(MATERIAL_TYPES):
+        material[piece_type] = int(round(theta[i] / weights["material"]))
+    for piece_type in chess.PIECE_TYPES:
+        base = PST_OFFSET + (piece_type - 1) * 64
+        tables[piece_type] = [int(round(v / weights["piece_square"])) for v in theta[base:base + 64]]
+    for i, term in enumerate(TERMS):
+        weights[term] = round(float(theta[TERM_OFFSET + i]), 5)
+    return weights, material, tables
+
+
+# ---- pool workers
+
+_worker_ai = None
+
+
+def _worker_engine(start_weights):
+    global _worker_ai
+    if _worker_ai is None:
+        _worker_ai = AlphaBetaAI(weights=start_weights, hash_mb=0)
+    return _worker_ai
+
+
+# one chunk of raw records -> features/labels of its quiet positions, written to
+# <path>_x.npy (int16) / <path>_y.npy so the gradient passes can mmap them
+def extract_chunk(chunk, path: str, start_weights, min_ply: int):
+    ai = _worker_engine(start_weights)
+    rows = []
+    labels = []
+    seen = 0
+    for kind, text in chunk:
+        if kind == "pgn":
+            positions = _pgn_positions(text, min_ply)
+        else:
+            board, _, result = parse_epd(text) if kind == "epd" else decode(text)
+            positions = [(board, result)] if board is not None and result is not None else []
+        for board, result in positions:
+            seen += 1
+            if not is_quiet(board):
+                continue
+            row = np.zeros(FEATURES, dtype=np.int16)
+            features(ai, board, row)
+            rows.append(row)
+            labels.append(result)
+    if rows:
+        np.save(path + "_x.npy", np.array(rows, dtype=np.int16))
+        np.save(path + "_y.npy", np.array(labels, dtype=np.float32))
+    return path if rows else None, len(rows), seen
+
+
+# summed log loss, gradient wrt theta and sum of |features| over some chunks
+def shard_gradient(paths, theta, k: float):
+    loss = 0.0
+    grad = np.zeros(FEATURES)
+    scale = np.zeros(FEATURES)
+    count = 0
+    for path in paths:
+        x = np.load(path + "_x.npy", mmap_mode="r").astype(np.float64)
+        y = np.load(path + "_y.npy", mmap_mode="r").astype(np.float64)
+        p = 1.0 / (1.0 + np.exp(-k * (x @ theta)))
+        p = np.clip(p, 1e-12, 1.0 - 1e-12)
+        loss -= float(np.sum(y * np.log(p) + (1.0 - y) * np.log(1.0 - p)))
+        grad += k * (x.T @ (p - y))
+        scale += np.abs(x).sum(axis=0)
+        count += len(y)
+    return loss, grad, scale, count
+
+
+#Texel tuner: streams positions into a feature cache, then fits the eval with
+#full batch gradient descent, every pass split over a process pool
+class Tuner():
+    def __init__(self, start_weights=None, workers=None, chunk_size: int = 4096, cache_dir=None,
+                 min_ply: int = 8, max_positions=None):
+        self.start_weights = start_weights
+        self.ai = AlphaBetaAI(weights=start_weights, hash_mb=0)
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.cache_dir = cache_dir or tempfile.mkdtemp(prefix="tuner_")
+        os.makedirs(self.cache_dir, exist_ok=True)
+        self.min_ply = min_ply
+        self.max_positions = max_positions
+        self.chunks = []
+        self.positions = 0
+        self.seen = 0
+        self.k = None
+        self._pool = None
+
+    def __enter__(self):
+        self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self
+
+    def __exit__(self, *exc):
+        self._pool.shutdown()
+        self._pool = None
+
+    # fill the feature cache, at most 2 chunks per worker in flight
+    def extract(self, paths, report=print):
+        source = enumerate(chunked(records(paths), self.chunk_size))
+        pending = set()
+
+        def submit():
+            if self.max_positions and self.positions >= self.max_positions:
+                return
+            job = next(source, None)
+            if job is not None:
+                i, chunk = job
+                path = os.path.join(self.cache_dir, f"chunk_{i:06d}")
+                pending.add(self._pool.submit(extract_chunk, chunk, path, self.start_weights, self.min_ply))
+
+        for _ in range(self.workers * 2):
+            submit()
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                path, kept, seen = future.result()
+                if path:
+                    self.chunks.append(path)
+                self.positions += kept
+                self.seen += seen
+                submit()
+            if report:
+                report(f"extracted {self.positions} quiet positions of {self.seen}")
+        self.chunks.sort()
+        return self.positions
+
+    # chunks from an earlier run's cache directory
+    def load_cache(self):
+        self.chunks = sorted(os.path.join(self.cache_dir, name[:-6]) for name in os.listdir(self.cache_dir)
+                             if name.endswith("_x.npy"))
+        self.positions = sum(len(np.load(path + "_y.npy", mmap_mode="r")) for path in self.chunks)
+        return self.positions
+
+    # mean loss, mean gradient, mean |feature| of the whole set at theta
+    def gradient(self, theta, k: float):
+        shards = [self.chunks[i::self.workers] for i in range(self.workers)]
+        shards = [shard for shard in shards if shard]
+        loss, grad, scale, count = 0.0, np.zeros(FEATURES), np.zeros(FEATURES), 0
+        for part in self._pool.map(shard_gradient, shards, [theta] * len(shards), [k] * len(shards)):
+            loss += part[0]
+            grad += part[1]
+            scale += part[2]
+            count += part[3]
+        return loss / count, grad / count, scale / count
+
+    # sigmoid scale that fits the starting eval best (coarse grid, then golden section)
+    def fit_k(self, theta, low: float = 0.0005, high: float = 0.05):
+        grid = np.geomspace(low, high, 12)
+        losses = [self.gradient(theta, k)[0] for k in grid]
+        best = int(np.argmin(losses))
+        a, b = grid[max(best - 1, 0)], grid[min(best + 1, len(grid) - 1)]
+        ratio = (math.sqrt(5) - 1) / 2
+        for _ in range(16):
+            c = b - ratio * (b - a)
+            d = a + ratio * (b - a)
+            if self.gradient(theta, c)[0] < self.gradient(theta, d)[0]:
+                b = d
+            else:
+                a = c
+        self.k = (a + b) / 2
+        return self.k
+
+    # adam steps, each parameter's step scaled to about lr centipawns of eval and
+    # decayed linearly to a tenth by the last iteration; l2 pulls the eval contribution of every parameter towards its start value
+    def tune(self, iterations: int = 200, lr: float = 1.0, l2: float = 1e-6, report=print, every: int = 20):
+        theta0 = parameters(self.ai)
+        k = self.k or self.fit_k(theta0)
+        theta = theta0.copy()
+        m = np.zeros(FEATURES)
+        v = np.zeros(FEATURES)
+        _, _, scale = self.gradient(theta, k)
+        contribution = np.maximum(scale, 1.0)
+        step = lr / contribution
+        # the king has no material value to tune, a square nobody visits no table entry
+        frozen = scale == 0
+        start_loss = None
+        for t in range(1, iterations + 1):
+            loss, grad, _ = self.gradient(theta, k)
+            start_loss = loss if start_loss is None else start_loss
+            grad += 2 * l2 * contribution ** 2 * (theta - theta0)
+            grad[frozen] = 0.0
+            m = 0.9 * m + 0.1 * grad
+            v = 0.999 * v + 0.001 * grad * grad
+            decay = 1.0 - 0.9 * (t - 1) / max(iterations - 1, 1)
+            theta -= decay * step * (m / (1 - 0.9 ** t)) / (np.sqrt(v / (1 - 0.999 ** t)) + 1e-12)
+            if report and (t % every == 0 or t == 1):
+                report(f"iteration {t:4d}  loss {loss:.6f}")
+        final_loss = self.gradient(theta, k)[0]
+        return theta, start_loss, final_loss
+
+    def save(self, path: str, theta):
+        weights, material, tables = unpack_parameters(self.ai, theta)
+        save_weights(path, weights, material, tables)
+        return weights, material, tables
+
+
+# features @ parameters against pieces_eval on random game positions
+def check_features(games: int = 20, seed: int = 5):
+    import random
+    rng = random.Random(seed)
+    ai = AlphaBetaAI(hash_mb=0)
+    theta = parameters(ai)
+    checked = 0
+    for _ in range(games):
+        board = chess.Board()
+        while not board.is_game_over() and len(board.move_stack) < 120:
+            board.push(rng.choice(list(board.legal_moves)))
+            row = np.zeros(FEATURES)
+            features(ai, board, row)
+            # pieces_eval rounds to whole centipawns, the features don't
+            assert abs(row @ theta - ai.pieces_eval(board, chess.WHITE)) <= 0.5 + 1e-6, board.fen()
+            checked += 1
+    return checked
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="tune the AlphaBetaAI eval on positions labeled with game results")
+    parser.add_argument("files", nargs="*", help=".epd (fen + result per line), .pgn and/or .pos files")
+    parser.add_argument("-o", "--output", default="tuned.json", help="weights file, AlphaBetaAI(weights=...) loads it")
+    parser.add_argument("--start", default=None, help="weights file to start from (default: built-in values)")
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument("--chunk", type=int, default=4096, help="records per extraction job")
+    parser.add_argument("--cache", default=None, help="feature cache directory (reused if no files are given)")
+    parser.add_argument("--min-ply", type=int, default=8, help="skip the first plies of every pgn game")
+    parser.add_argument("--max-positions", type=int, default=None)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--lr", type=float, default=1.0, help="step size in centipawns of eval per parameter")
+    parser.add_argument("--l2", type=float, default=1e-6)
+    parser.add_argument("--check", action="store_true", help="only check the features against pieces_eval")
+    args = parser.parse_args()
+
+    if args.check or not (args.files or args.cache):
+        print(f"features match pieces_eval on {check_features()} positions")
+        raise SystemExit(0)
+
+    with Tuner(args.start, args.workers, args.chunk, args.cache, args.min_ply, args.max_positions) as tuner:
+        started = time.perf_counter()
+        if args.files:
+            tuner.extract(args.files, report=None)
+        else:
+            tuner.load_cache()
+        print(f"{tuner.positions} quiet positions ({tuner.seen or tuner.positions} read) in "
+              f"{len(tuner.chunks)} chunks under {tuner.cache_dir}, {time.perf_counter() - started:.1f}s")
+        if not tuner.positions:
+            raise SystemExit("no labeled quiet positions found")
+        print(f"k = {tuner.fit_k(parameters(tuner.ai)):.6f}")
+        theta, start_loss, final_loss = tuner.tune(args.iterations, args.lr, args.l2)
+        weights, material, _ = tuner.save(args.output, theta)
+        rounded = tuner.gradient(parameters(AlphaBetaAI(weights=args.output, hash_mb=0)), tuner.k)[0]
+        print(f"loss {start_loss:.6f} -> {final_loss:.6f} ({rounded:.6f} as saved), {time.perf_counter() - started:.1f}s")
+        print("material", {chess.piece_symbol(pt): v for pt, v in material.items()},
+              {term: weights[term] for term in TERMS})
+        print(f"wrote {args.output}")
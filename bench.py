@@ -0,0 +1,275 @@
+#Code Modified/writter by Larbalestier, Noah; F006B9P
+#26 October 2025
+#PA3 COSC 076, 25F
+#Scaffold and Driver given by Professor Soroush Vosoughi
+#search benchmark: nodes, nps, time-to-depth and a node count signature as json
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import chess
+
+# fixed positions, grouped so a regression can be traced to a kind of position
+BENCH_POSITIONS = {
+    "opening": [
+        chess.STARTING_FEN,
+        "r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3",
+        "rnbqkb1r/pp2pppp/3p1n2/8/3NP3/8/PPP2PPP/RNBQKB1R w KQkq - 1 5",
+    ],
+    "middlegame": [
+        "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+        "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+        "2kr3r/ppp2ppp/2n5/2b1q3/4P3/2N2N2/PPP2PPP/R2QKB1R w KQ - 0 10",
+    ],
+    "endgame": [
+        "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1",
+        "6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1",
+        "8/8/4k3/8/2P5/4K3/8/8 w - - 0 1",
+    ],
+    "tactical": [
+        "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8",
+        "r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/3P1N2/PPP2PPP/RNBQK2R w KQkq - 0 5",
+        "r1b1kb1r/pppp1ppp/5q2/4n3/3KP3/2N3PN/PPP4P/R1BQ1B1R b kq - 0 1",
+    ],
+}
+
+# best moves of the old max_value/min_value search (before the negamax/PVS core)
+# at REGRESSION_DEPTH, no table and no forward pruning: (fen, with quiescence, without)
+REGRESSION_DEPTH = 3
+REGRESSION_SET = [
+    (chess.STARTING_FEN, "g1f3", "g1f3"),
+    ("r1bqkbnr/pppp1ppp/2n5/4p3/4P3/5N2/PPPP1PPP/RNBQKB1R w KQkq - 2 3", "f1d3", "f1b5"),
+    ("r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1", "e2a6", "e2a6"),
+    ("6k1/5ppp/8/8/8/8/5PPP/3R2K1 w - - 0 1", "d1d8", "d1d8"),
+    ("8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", "b4f4", "b4c4"),
+    ("r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10", "c3d5", "c3d5"),
+    ("rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", "d7c8q", "d7c8q"),
+    ("2kr3r/ppp2ppp/2n5/2b1q3/4P3/2N2N2/PPP2PPP/R2QKB1R w KQ - 0 10", "f3e5", "f3e5"),
+    ("4k3/8/8/8/8/8/4P3/4K3 w - - 0 1", "e1f2", "e1f2"),
+    ("r1bqk2r/pppp1ppp/2n2n2/2b1p3/2B1P3/3P1N2/PPP2PPP/RNBQK2R w KQkq - 0 5", "b1c3", "e1g1"),
+]
+
+DEFAULT_DEPTHS = {"MinimaxAI": 2, "AlphaBetaAI": 3, "IDAI": 4}
+DEFAULT_NODE_LIMIT = 10000
+
+
+def _nodes(ai) -> int:
+    return getattr(ai, "_node_count", 0) + getattr(ai, "_qnode_count", 0)
+
+
+def _engine(name: str, depth: int, max_nodes=None):
+    if name == "MinimaxAI":
+        from MinimaxAI import MinimaxAI
+        return MinimaxAI(depth)
+    if name == "AlphaBetaAI":
+        from AlphaBetaAI import AlphaBetaAI
+        return AlphaBetaAI(depth)
+    from IDAI import IDAI
+    ai = IDAI(depth, max_nodes=max_nodes)
+    ai.verbose = False
+    return ai
+
+
+# one search, fresh engine so tables/history never leak between positions
+def bench_position(name: str, fen: str, depth: int, max_nodes=None) -> dict:
+    ai = _engine(name, depth, max_nodes)
+    board = chess.Board(fen)
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        move = ai.choose_move(board)
+        elapsed = time.perf_counter() - start
+    nodes = _nodes(ai)
+    stats = getattr(ai, "stats", None)
+    row = {
+        "fen": fen,
+        "move": move.uci() if move else None,
+        "nodes": nodes,
+        "qnodes": getattr(ai, "_qnode_count", 0),
+        "seconds": elapsed,
+        "nps": nodes / elapsed if elapsed > 0 else 0.0,
+        "depth": depth,
+        "ebf": nodes ** (1.0 / depth) if nodes and depth else 0.0,
+    }
+    if stats is not None:
+        row.update(eval_calls=stats.eval_calls, seldepth=stats.seldepth,
+                   first_move_cutoff_rate=stats.first_move_cutoff_rate, tt_hits=stats.tt_hits)
+    iterations = getattr(ai, "iterations", None)
+    if iterations:
+        # seconds from the start of the search until each depth was finished
+        reached = 0.0
+        time_to_depth = {}
+        for it in iterations:
+            reached += it.seconds
+            time_to_depth[str(it.depth)] = reached
+        row["time_to_depth"] = time_to_depth
+        row["depth"] = iterations[-1].depth
+        last = [it.nodes for it in iterations if it.nodes]
+        if len(last) >= 2:
+            row["ebf"] = last[-1] / last[-2]
+    return row
+
+
+def run_bench(depths=None, node_limit: int = DEFAULT_NODE_LIMIT, engines=None, categories=None) -> dict:
+    depths = dict(DEFAULT_DEPTHS, **(depths or {}))
+    engines = engines or list(DEFAULT_DEPTHS)
+    categories = categories or list(BENCH_POSITIONS)
+    runs = []
+    for name in engines:
+        runs.append((f"{name}/depth{depths[name]}", name, depths[name], None))
+        if name == "IDAI" and node_limit:
+            runs.append((f"IDAI/nodes{node_limit}", name, 64, node_limit))
+
+    report = {"engines": {}, "meta": _meta()}
+    signature = 0
+    for label, name, depth, max_nodes in runs:
+        rows = []
+        for category in categories:
+            for fen in BENCH_POSITIONS[category]:
+                row = bench_position(name, fen, depth, max_nodes)
+                row["category"] = category
+                rows.append(row)
+        nodes = sum(r["nodes"] for r in rows)
+        seconds = sum(r["seconds"] for r in rows)
+        report["engines"][label] = {
+            "positions": rows,
+            "nodes": nodes,
+            "seconds": seconds,
+            "nps": nodes / seconds if seconds > 0 else 0.0,
+            "mean_ebf": sum(r["ebf"] for r in rows) / len(rows),
+        }
+        # node limited runs stop on a count, only the fixed depth runs describe the tree
+        if max_nodes is None:
+            signature += nodes
+    report["signature"] = signature
+    return report
+
+
+# the search must still pick the old best move on REGRESSION_SET, or another one
+# with exactly the same score (a tie broken by a different move order)
+def check_regression() -> int:
+    from AlphaBetaAI import AlphaBetaAI, INF
+    failures = 0
+    for quiescence in (True, False):
+        for fen, *expected in REGRESSION_SET:
+            ai = AlphaBetaAI(REGRESSION_DEPTH, hash_mb=0, quiescence=quiescence,
+                             null_move=False, lmr=False, futility=False)
+            board = chess.Board(fen)
+            move = ai.choose_move(board)
+            old = chess.Move.from_uci(expected[0 if quiescence else 1])
+            if move == old:
+                continue
+            scores = []
+            for root_move in (move, old):
+                ai._begin_search(board)
+                scores.append(ai.search_root(board, [root_move], REGRESSION_DEPTH, -INF, INF)[0])
+                ai._end_search(notify=False)
+            tied = scores[0] == scores[1]
+            failures += not tied
+            print(f"{'tie ' if tied else 'FAIL'} quiescence={quiescence!s:5s} {fen}  "
+                  f"{move.uci()} {scores[0]} vs old {old.uci()} {scores[1]}")
+    print(f"regression set: {2 * len(REGRESSION_SET)} searches, {failures} changed best moves")
+    return failures
+
+
+def _meta() -> dict:
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip()
+    except OSError:
+        rev = ""
+    return {"python": platform.python_version(), "python_chess": chess.__version__,
+            "machine": platform.machine(), "git_rev": rev}
+
+
+def print_report(report: dict):
+    for label, data in report["engines"].items():
+        print(f"{label:22s} nodes {data['nodes']:9d}  time {data['seconds']:7.2f}s  "
+              f"nps {data['nps']:9.0f}  ebf {data['mean_ebf']:.2f}")
+    print(f"signature {report['signature']}")
+
+
+# side by side of two json reports, returns True if the signature changed
+def compare(old: dict, new: dict) -> bool:
+    for label in sorted(set(old["engines"]) | set(new["engines"])):
+        a = old["engines"].get(label)
+        b = new["engines"].get(label)
+        if a is None or b is None:
+            print(f"{label:22s} only in {'new' if a is None else 'old'}")
+            continue
+        node_change = (b["nodes"] - a["nodes"]) / a["nodes"] * 100 if a["nodes"] else 0.0
+        nps_change = (b["nps"] - a["nps"]) / a["nps"] * 100 if a["nps"] else 0.0
+        moves_changed = sum(1 for x, y in zip(a["positions"], b["positions"]) if x["move"] != y["move"])
+        print(f"{label:22s} nodes {a['nodes']:9d} -> {b['nodes']:9d} ({node_change:+6.1f}%)  "
+              f"nps {a['nps']:8.0f} -> {b['nps']:8.0f} ({nps_change:+6.1f}%)  moves changed {moves_changed}")
+    changed = old["signature"] != new["signature"]
+    print(f"signature {old['signature']} -> {new['signature']}" + ("  CHANGED" if changed else "  same"))
+    return changed
+
+
+# runs this bench script against the tree of a git revision, returns its report
+def bench_revision(rev: str, args) -> dict:
+    here = os.path.dirname(os.path.abspath(__file__))
+    tmp = tempfile.mkdtemp(prefix="bench-")
+    try:
+        archive = subprocess.run(["git", "archive", rev], cwd=here, capture_output=True, check=True).stdout
+        subprocess.run(["tar", "-x", "-C", tmp], input=archive, check=True)
+        shutil.copy(os.path.abspath(__file__), os.path.join(tmp, "bench.py"))
+        out = os.path.join(tmp, "bench.json")
+        cmd = [sys.executable, "bench.py", "--json", out, "--nodes", str(args.nodes)]
+        for name, depth in _depth_args(args).items():
+            cmd += [f"--{name.lower()}-depth", str(depth)]
+        if args.engines:
+            cmd += ["--engines"] + args.engines
+        subprocess.run(cmd, cwd=tmp, check=True, stdout=subprocess.DEVNULL)
+        with open(out) as f:
+            return json.load(f)
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+def _depth_args(args) -> dict:
+    return {"MinimaxAI": args.minimaxai_depth, "AlphaBetaAI": args.alphabetaai_depth, "IDAI": args.idai_depth}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="reproducible search benchmark")
+    parser.add_argument("--json", help="write the report to this file")
+    parser.add_argument("--minimaxai-depth", type=int, default=DEFAULT_DEPTHS["MinimaxAI"])
+    parser.add_argument("--alphabetaai-depth", type=int, default=DEFAULT_DEPTHS["AlphaBetaAI"])
+    parser.add_argument("--idai-depth", type=int, default=DEFAULT_DEPTHS["IDAI"])
+    parser.add_argument("--nodes", type=int, default=DEFAULT_NODE_LIMIT, help="IDAI fixed node run, 0 to skip")
+    parser.add_argument("--engines", nargs="+", choices=list(DEFAULT_DEPTHS), default=None)
+    parser.add_argument("--compare", nargs=2, metavar=("OLD_JSON", "NEW_JSON"), help="diff two saved reports")
+    parser.add_argument("--revs", nargs=2, metavar=("OLD_REV", "NEW_REV"), help="bench two git revisions and diff")
+    parser.add_argument("--regression", action="store_true",
+                        help="check the best moves of the old max/min search on the regression set")
+    args = parser.parse_args()
+
+    if args.regression:
+        sys.exit(1 if check_regression() else 0)
+
+    if args.compare:
+        with open(args.compare[0]) as f:
+            old = json.load(f)
+        with open(args.compare[1]) as f:
+            new = json.load(f)
+        sys.exit(1 if compare(old, new) else 0)
+    if args.revs:
+        old = bench_revision(args.revs[0], args)
+        new = bench_revision(args.revs[1], args)
+        sys.exit(1 if compare(old, new) else 0)
+
+    report = run_bench(_depth_args(args), args.nodes, args.engines)
+    print_report(report)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=1)
@@ -3,24 +3,93 @@
 #PA3 COSC 076, 25F
 #Scaffold and Driver given by Professor Soroush Vosoughi
 #Gui/Tests
+#engines search in a worker thread so the window keeps painting, IDAI progress
+#(depth, score, nps, pv arrows) is shown live, humans move by clicking
 
 # brew install pyqt
-from PyQt5 import QtGui, QtSvg
-from PyQt5.QtCore import *
-from PyQt5.QtGui import *
-import MinimaxAI
-
-from PyQt5.QtWidgets import QApplication, QWidget
+from PyQt5 import QtSvg
+from PyQt5.QtCore import QByteArray, QThread, QTimer, Qt, pyqtSignal
+from PyQt5.QtWidgets import QApplication, QLabel, QVBoxLayout, QWidget
+import argparse
 import sys
 import chess, chess.svg
 from RandomAI import RandomAI
 from MinimaxAI import MinimaxAI
 from ChessGame import ChessGame
 from HumanPlayer import HumanPlayer
-from AlphaBetaAI import AlphaBetaAI
+from AlphaBetaAI import AlphaBetaAI, score_text
+from IDAI import IDAI
 import random
 
+# chess.svg draws the 8x8 squares inside a coordinate margin of this width
+BOARD_MARGIN = 15
+BOARD_SIZE = 2 * BOARD_MARGIN + 8 * chess.svg.SQUARE_SIZE
+
+# pv moves drawn as arrows: the move to play green, the expected line after it blue
+PV_ARROWS = 4
+PV_COLORS = ("#15781B80", "#1515788A")
+SELECTED_COLOR = "#cdd16a80"
+
+
+#runs one choose_move on a copy of the board in a background thread
+#IDAI iterations are passed on by the info signal, queued to the gui thread;
+#both signals carry the worker so late signals of an aborted search are told apart
+class SearchWorker(QThread):
+    info = pyqtSignal(object, object)
+    found = pyqtSignal(object, object)
+
+    def __init__(self, player, board: chess.Board):
+        super().__init__()
+        self.player = player
+        self.board = board
+        self.aborted = False
+
+    def _iteration(self, info):
+        self.info.emit(self, info)
+
+    def run(self):
+        listeners = getattr(self.player, "on_iteration", None)
+        if listeners is not None:
+            listeners.append(self._iteration)
+        try:
+            move = self.player.choose_move(self.board)
+        finally:
+            if listeners is not None:
+                listeners.remove(self._iteration)
+        self.found.emit(self, move)
+
+    # IDAI stops at its next node check (and stays stopped until resumed), other
+    # players can't be interrupted and run to the end in the background, either
+    # way the move is thrown away
+    def abort(self):
+        self.aborted = True
+        if isinstance(self.player, IDAI):
+            self.player.stop()
+
+
+#svg board that reports the square under a left click
+class BoardWidget(QtSvg.QSvgWidget):
+    clicked = pyqtSignal(int)
+
+    def mousePressEvent(self, event):
+        if event.button() != Qt.LeftButton:
+            return
+        # the svg is stretched over the whole widget
+        size = chess.svg.SQUARE_SIZE
+        x = event.x() * BOARD_SIZE / self.width() - BOARD_MARGIN
+        y = event.y() * BOARD_SIZE / self.height() - BOARD_MARGIN
+        if 0 <= x < 8 * size and 0 <= y < 8 * size:
+            self.clicked.emit(chess.square(int(x // size), 7 - int(y // size)))
+
 
+class GameWindow(QWidget):
+    key = pyqtSignal(int)
+
+    def keyPressEvent(self, event):
+        self.key.emit(event.key())
+
+
+#escape aborts a running search and pauses the game, space resumes it
 class ChessGui:
     def __init__(self, player1, player2):
         self.player1 = player1
@@ -29,50 +98,169 @@ class ChessGui:
         self.game = ChessGame(player1, player2)
 
         self.app = QApplication(sys.argv)
-        self.svgWidget = QtSvg.QSvgWidget()
-        self.svgWidget.setGeometry(50, 50, 400, 400)
-        self.svgWidget.show()
+        self.app.aboutToQuit.connect(self.shutdown)
+        self.window = GameWindow()
+        self.window.setWindowTitle(f"{player1.__class__.__name__} vs {player2.__class__.__name__}")
+        self.window.key.connect(self.key_pressed)
+        self.svgWidget = BoardWidget()
+        self.svgWidget.setFixedSize(400, 400)
+        self.svgWidget.clicked.connect(self.square_clicked)
+        self.status = QLabel()
+        self.status.setWordWrap(True)
+        layout = QVBoxLayout(self.window)
+        layout.addWidget(self.svgWidget)
+        layout.addWidget(self.status)
+        self.window.setGeometry(50, 50, 420, 480)
+        self.window.show()
 
+        # the running search, and aborted ones still finishing in the background
+        self.worker = None
+        self.stale = []
+        self.paused = False
+        self.selected = None
+        self.pv = []
 
     def start(self):
-        self.timer = QTimer()
-        self.timer.timeout.connect(self.make_move)
-        self.timer.start(10)
-
         self.display_board()
+        self.next_turn()
 
+    # redrawn only when something on it changed: a move, a new pv, a selection
     def display_board(self):
-        svgboard = chess.svg.board(self.game.board)
+        board = self.game.board
+        arrows = [chess.svg.Arrow(move.from_square, move.to_square, color=PV_COLORS[min(i, 1)])
+                  for i, move in enumerate(self.pv[:PV_ARROWS])]
+        fill = {}
+        targets = None
+        if self.selected is not None:
+            fill[self.selected] = SELECTED_COLOR
+            targets = chess.SquareSet([move.to_square for move in board.legal_moves
+                                       if move.from_square == self.selected])
+        svgboard = chess.svg.board(board, lastmove=board.peek() if board.move_stack else None,
+                                   check=board.king(board.turn) if board.is_check() else None,
+                                   arrows=arrows, fill=fill, squares=targets)
 
         svgbytes = QByteArray()
-        svgbytes.append(svgboard)
+        svgbytes.append(svgboard.encode("utf-8"))
         self.svgWidget.load(svgbytes)
 
+    def human_to_move(self) -> bool:
+        return isinstance(self.game.to_move(), HumanPlayer)
+
+    # starts the search of the player to move, humans are waited for
+    def next_turn(self):
+        if self.game.is_game_over():
+            self.status.setText(f"game over {self.game.board.result()}")
+            return
+        if self.paused or self.worker is not None or self.stale:
+            return
+        player = self.game.to_move()
+        side = "white" if self.game.board.turn else "black"
+        if self.human_to_move():
+            self.status.setText(f"{side} to move, click a piece and its target square")
+            return
+        self.status.setText(f"{player.__class__.__name__} ({side}) thinking...")
+        self.worker = SearchWorker(player, self.game.board.copy())
+        self.worker.info.connect(self.show_info)
+        self.worker.found.connect(self.move_found)
+        self.worker.start()
 
-    def make_move(self):
+    def show_info(self, worker, info):
+        if worker is not self.worker:
+            return
+        stats = info.stats
+        nodes = stats.total_nodes if stats is not None else info.nodes
+        nps = int(nodes / max(info.elapsed, 1e-6))
+        pv = " ".join(move.uci() for move in info.pv)
+        self.status.setText(f"{self.game.to_move().__class__.__name__}: depth {info.depth}  "
+                            f"{score_text(info.score)}  {nps} nps  pv {pv}")
+        self.pv = list(info.pv)
+        self.display_board()
 
-        print("making move, white turn " + str(self.game.board.turn))
+    def move_found(self, worker, move):
+        worker.wait()
+        if worker.aborted:
+            self.stale.remove(worker)
+            self.next_turn()
+            return
+        self.worker = None
+        self.play(move)
 
-        self.game.make_move()
+    def play(self, move):
+        self.pv = []
+        self.selected = None
+        self.game.play(move)
         self.display_board()
+        # back to the event loop first so the move is painted before the next search
+        QTimer.singleShot(0, self.next_turn)
+
+    # click once on an own piece, then on its target; pawns promote to a queen
+    def square_clicked(self, square: int):
+        board = self.game.board
+        if not self.human_to_move() or self.game.is_game_over():
+            return
+        piece = board.piece_at(square)
+        if self.selected is not None:
+            move = chess.Move(self.selected, square)
+            if (board.piece_type_at(self.selected) == chess.PAWN
+                    and chess.square_rank(square) in (0, 7)):
+                move.promotion = chess.QUEEN
+            if board.is_legal(move):
+                self.play(move)
+                return
+        self.selected = square if piece is not None and piece.color == board.turn else None
+        self.display_board()
+
+    def key_pressed(self, key: int):
+        if key == Qt.Key_Escape:
+            self.abort()
+        elif key == Qt.Key_Space and self.paused:
+            self.paused = False
+            for player in (self.player1, self.player2):
+                if isinstance(player, IDAI):
+                    player.resume()
+            self.next_turn()
+
+    def abort(self):
+        self.paused = True
+        if self.worker is not None:
+            self.worker.abort()
+            self.stale.append(self.worker)
+            self.worker = None
+            self.pv = []
+            self.display_board()
+        self.status.setText("paused, press space to resume")
+
+    # waits for every search (a non IDAI one still has to finish) and stops pondering
+    def shutdown(self):
+        self.abort()
+        for worker in self.stale:
+            worker.wait()
+        for player in (self.player1, self.player2):
+            if hasattr(player, "close"):
+                player.close()
 
 
+PLAYERS = {
+    "human": HumanPlayer,
+    "random": RandomAI,
+    "minimax": lambda: MinimaxAI(3),
+    "alphabeta": lambda: AlphaBetaAI(5),
+    "idai": lambda: IDAI(5, verbose=False),
+}
 
 
 if __name__ == "__main__":
 
     random.seed(1)
 
-    #player_ronda = RandomAI()
-    # ? do i fix this?
-    # to do: gui does not work well with HumanPlayer, due to input() use on stdin conflict
-    #   with event loop.
+    parser = argparse.ArgumentParser(description="play or watch a game in a window")
+    parser.add_argument("--white", choices=sorted(PLAYERS), default="human")
+    parser.add_argument("--black", choices=sorted(PLAYERS), default="idai")
+    args = parser.parse_args()
 
-    player1 = MinimaxAI(3, eval_fcn = MinimaxAI().pieces_eval)
-    #player2 = AlphaBetaAI()
-    player2 = AlphaBetaAI(5, eval_fcn = AlphaBetaAI().pieces_eval)
+    player1 = PLAYERS[args.white]()
+    player2 = PLAYERS[args.black]()
 
-    game = ChessGame(player1, player2)
     gui = ChessGui(player1, player2)
 
     gui.start()
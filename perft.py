@@ -0,0 +1,179 @@
+#Code Modified/writter by Larbalestier, Noah; F006B9P
+#26 October 2025
+#PA3 COSC 076, 25F
+#Scaffold and Driver given by Professor Soroush Vosoughi
+#perft: SearchBoard move generator validation against python-chess, plus throughput
+
+import argparse
+import sys
+import time
+
+import chess
+import chess.polyglot
+
+from SearchBoard import SearchBoard, MOVES
+
+# standard perft positions (chessprogramming wiki) with published node counts by depth
+PERFT_POSITIONS = [
+    ("startpos", chess.STARTING_FEN, [20, 400, 8902, 197281, 4865609]),
+    ("kiwipete", "r3k2r/p1ppqpb1/bn2pnp1/3PN3/1p2P3/2N2Q1p/PPPBBPPP/R3K2R w KQkq - 0 1",
+     [48, 2039, 97862, 4085603]),
+    ("position3", "8/2p5/3p4/KP5r/1R3p1k/8/4P1P1/8 w - - 0 1", [14, 191, 2812, 43238, 674624]),
+    ("position4", "r3k2r/Pppp1ppp/1b3nbN/nP6/BBP1P3/q4N2/Pp1P2PP/R2Q1RK1 w kq - 0 1",
+     [6, 264, 9467, 422333]),
+    ("position5", "rnbq1k1r/pp1Pbppp/2p5/8/2B5/8/PPP1NnPP/RNBQK2R w KQ - 1 8", [44, 1486, 62379, 2103487]),
+    ("position6", "r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10",
+     [46, 2079, 89890, 3894594]),
+]
+
+
+# leaf nodes at depth (bulk counted on the last ply)
+def perft(board: SearchBoard, depth: int) -> int:
+    codes = board.legal_codes()
+    if depth <= 1:
+        return len(codes) if depth == 1 else 1
+    nodes = 0
+    # the cached list belongs to this position, copy it before making moves
+    for code in list(codes):
+        board.make(code)
+        nodes += perft(board, depth - 1)
+        board.unmake()
+    return nodes
+
+
+def chess_perft(board: chess.Board, depth: int) -> int:
+    if depth <= 1:
+        return board.legal_moves.count() if depth == 1 else 1
+    nodes = 0
+    for move in list(board.legal_moves):
+        board.push(move)
+        nodes += chess_perft(board, depth - 1)
+        board.pop()
+    return nodes
+
+
+# per root move counts of both boards, the moves where they differ
+def divide(fen: str, depth: int):
+    board = chess.Board(fen)
+    sb = SearchBoard(fen)
+    ours = {}
+    for code in list(sb.legal_codes()):
+        sb.make(code)
+        ours[MOVES[code]] = perft(sb, depth - 1)
+        sb.unmake()
+    theirs = {}
+    for move in list(board.legal_moves):
+        board.push(move)
+        theirs[move] = chess_perft(board, depth - 1)
+        board.pop()
+    return [(move.uci(), ours.get(move), theirs.get(move)) for move in sorted(set(ours) | set(theirs), key=str)
+            if ours.get(move) != theirs.get(move)]
+
+
+# walks the tree with both boards side by side: same moves in the same order,
+# same fen after every move and unmove, key equal to the polyglot hash
+def verify_walk(fen: str, depth: int) -> int:
+    board = chess.Board(fen)
+    sb = SearchBoard(fen)
+    checked = 0
+
+    def walk(depth: int):
+        nonlocal checked
+        checked += 1
+        assert sb.key == chess.polyglot.zobrist_hash(board), board.fen()
+        assert sb.to_board().fen(en_passant="fen") == board.fen(en_passant="fen"), (sb.fen(), board.fen())
+        moves = list(board.legal_moves)
+        assert sb.generate_legal_moves() == moves, board.fen()
+        assert sb.is_check() == board.is_check() and sb.is_game_over() == board.is_game_over(), board.fen()
+        assert sb.has_legal_moves() == bool(moves) and sb.is_checkmate() == board.is_checkmate(), board.fen()
+        assert sb.is_stalemate() == board.is_stalemate(), board.fen()
+        if depth == 0:
+            return
+        for move in moves:
+            assert sb.is_capture(move) == board.is_capture(move) and sb.gives_check(move) == board.gives_check(move)
+            board.push(move)
+            sb.push(move)
+            walk(depth - 1)
+            sb.pop()
+            board.pop()
+        assert sb.to_board().fen(en_passant="fen") == board.fen(en_passant="fen"), (sb.fen(), board.fen())
+
+    walk(depth)
+    return checked
+
+
+# make/unmake and legal move generation rates of both boards on the same positions
+def throughput(fens, seconds: float = 1.0):
+    rows = []
+    for name, setup in (("SearchBoard", SearchBoard), ("chess.Board", chess.Board)):
+        boards = [setup(fen) for fen in fens]
+        moves = [list(b.legal_moves) for b in boards]
+        count = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            for board, ms in zip(boards, moves):
+                for move in ms:
+                    board.push(move)
+                    board.pop()
+                count += len(ms)
+        make_rate = count / (time.perf_counter() - start)
+
+        count = 0
+        start = time.perf_counter()
+        while time.perf_counter() - start < seconds:
+            for board in boards:
+                if isinstance(board, SearchBoard):
+                    board._legal_key = None
+                    board.legal_codes()
+                else:
+                    list(board.generate_legal_moves())
+            count += len(boards)
+        gen_rate = count / (time.perf_counter() - start)
+        rows.append((name, make_rate, gen_rate))
+    return rows
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="perft validation of SearchBoard against python-chess")
+    parser.add_argument("--depth", type=int, default=3, help="perft depth for every position")
+    parser.add_argument("--fen", help="only this position (counts compared with python-chess)")
+    parser.add_argument("--walk-depth", type=int, default=2, help="depth of the move by move comparison walk")
+    parser.add_argument("--no-chess", action="store_true", help="skip the python-chess perft (published counts only)")
+    parser.add_argument("--seconds", type=float, default=1.0, help="time per throughput measurement")
+    args = parser.parse_args()
+
+    positions = [("fen", args.fen, [])] if args.fen else PERFT_POSITIONS
+    failed = False
+    total_nodes = 0
+    total_time = 0.0
+    chess_time = 0.0
+    for name, fen, known in positions:
+        start = time.perf_counter()
+        nodes = perft(SearchBoard(fen), args.depth)
+        elapsed = time.perf_counter() - start
+        total_nodes += nodes
+        total_time += elapsed
+        expected = known[args.depth - 1] if 0 < args.depth <= len(known) else None
+        line = f"{name:10s} depth {args.depth} nodes {nodes:9d} {nodes / elapsed:9.0f} n/s"
+        if not args.no_chess:
+            start = time.perf_counter()
+            reference = chess_perft(chess.Board(fen), args.depth)
+            chess_time += time.perf_counter() - start
+            if expected is None:
+                expected = reference
+            elif reference != expected:
+                line += f"  python-chess {reference}"
+        ok = expected is None or nodes == expected
+        failed |= not ok
+        print(line + ("  ok" if ok else f"  MISMATCH expected {expected}"))
+        if not ok:
+            for uci, ours, theirs in divide(fen, args.depth):
+                print(f"    {uci}: {ours} vs python-chess {theirs}")
+        if args.walk_depth:
+            verify_walk(fen, min(args.walk_depth, args.depth))
+    print(f"perft {total_nodes} nodes in {total_time:.2f}s ({total_nodes / total_time:.0f} n/s)"
+          + (f", python-chess {chess_time:.2f}s" if chess_time else ""))
+
+    for name, make_rate, gen_rate in throughput([fen for _, fen, _ in positions], args.seconds):
+        print(f"{name:12s} make/unmake {make_rate:9.0f}/s  legal movegen {gen_rate:8.0f} positions/s")
+    sys.exit(1 if failed else 0)
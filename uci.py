@@ -0,0 +1,389 @@
+#Code Modified/writter by Larbalestier, Noah; F006B9P
+#26 October 2025
+#PA3 COSC 076, 25F
+#Scaffold and Driver given by Professor Soroush Vosoughi
+#UCI front-end for IDAI, run "python3 uci.py" from a GUI or tournament manager
+
+import queue
+import subprocess
+import sys
+import threading
+import time
+
+import chess
+from IDAI import IDAI
+from AlphaBetaAI import is_mate_score, mate_in
+from TimeManager import TimeManager
+from TranspositionTable import TranspositionTable
+
+ENGINE_NAME = "IDAI chessbot"
+ENGINE_AUTHOR = "Noah Larbalestier"
+
+# iterative deepening stops on the clock, this only bounds it
+UCI_MAX_DEPTH = 64
+
+OPTIONS = {
+    "Hash": ("spin", 16, 1, 4096),
+    "Threads": ("spin", 1, 1, 64),
+    "Ponder": ("check", False, None, None),
+}
+
+
+#IDAI that also stops when the front-end raises the stop event
+class _UCIAI(IDAI):
+    def __init__(self, stop_event, **kwargs):
+        super().__init__(**kwargs)
+        self._stop_event = stop_event
+
+    def _poll(self) -> bool:
+        return self._stop_event.is_set() or super()._poll()
+
+
+# per move limits from the go command's clock (milliseconds), None without a clock
+def clock_manager(limits: dict, white: bool):
+    time_left = limits.get("wtime" if white else "btime")
+    if time_left is None:
+        return None
+    increment = limits.get("winc" if white else "binc", 0)
+    return TimeManager.from_clock(time_left / 1000.0, increment / 1000.0, limits.get("movestogo"))
+
+
+# "cp 35" / "mate 3" / "mate -2" from a search score, mates count from the root
+def format_score(score: int) -> str:
+    if is_mate_score(score):
+        return f"mate {mate_in(score)}"
+    return f"cp {score}"
+
+
+def parse_go(tokens) -> dict:
+    limits = {}
+    numeric = ("wtime", "btime", "winc", "binc", "movestogo", "movetime", "nodes", "depth", "mate")
+    i = 0
+    while i < len(tokens):
+        token = tokens[i]
+        if token in numeric and i + 1 < len(tokens):
+            limits[token] = int(tokens[i + 1])
+            i += 2
+            continue
+        if token in ("infinite", "ponder"):
+            limits[token] = True
+        i += 1
+    return limits
+
+
+#reads commands on a background thread and searches on another one, so stop,
+#isready and ponderhit are answered while a search is running
+class UCIEngine():
+    def __init__(self, infile=None, outfile=None):
+        self.infile = infile or sys.stdin
+        self.outfile = outfile or sys.stdout
+        self.options = {name: spec[1] for name, spec in OPTIONS.items()}
+        self.board = chess.Board()
+        self._stop = threading.Event()
+        # infinite/ponder searches keep their bestmove until stop or ponderhit
+        self._release = threading.Event()
+        self._out_lock = threading.Lock()
+        self._commands = queue.Queue()
+        self._search_thread = None
+        self._ponder_clock = None
+        self.ai = self._new_ai()
+
+    def _new_ai(self):
+        ai = _UCIAI(self._stop, depth=UCI_MAX_DEPTH, hash_mb=self.options["Hash"],
+                    threads=self.options["Threads"], verbose=False)
+        ai.on_iteration.append(self._send_info)
+        return ai
+
+    def send(self, line: str):
+        with self._out_lock:
+            self.outfile.write(line + "\n")
+            self.outfile.flush()
+
+    def _read_input(self):
+        for line in self.infile:
+            self._commands.put(line.strip())
+        self._commands.put("quit")
+
+    def run(self):
+        threading.Thread(target=self._read_input, daemon=True).start()
+        while True:
+            line = self._commands.get()
+            if not line:
+                continue
+            if not self.handle(line):
+                break
+
+    # one command, returns False on quit
+    def handle(self, line: str) -> bool:
+        tokens = line.split()
+        command, args = tokens[0], tokens[1:]
+        if command == "uci":
+            self.send(f"id name {ENGINE_NAME}")
+            self.send(f"id author {ENGINE_AUTHOR}")
+            for name, (kind, default, low, high) in OPTIONS.items():
+                if kind == "spin":
+                    self.send(f"option name {name} type spin default {default} min {low} max {high}")
+                else:
+                    self.send(f"option name {name} type check default {str(default).lower()}")
+            self.send("uciok")
+        elif command == "isready":
+            self.send("readyok")
+        elif command == "setoption":
+            self._set_option(args)
+        elif command == "ucinewgame":
+            self._stop_search()
+            self.ai.close()
+            self.ai = self._new_ai()
+            self.board = chess.Board()
+        elif command == "position":
+            self._stop_search()
+            self._set_position(args)
+        elif command == "go":
+            self._stop_search()
+            self._go(parse_go(args))
+        elif command == "stop":
+            self._stop_search()
+        elif command == "ponderhit":
+            self._ponderhit()
+        elif command == "quit":
+            self._stop_search()
+            self.ai.close()
+            return False
+        elif command == "d":
+            self.send(str(self.board))
+            self.send(f"fen {self.board.fen()}")
+        else:
+            self.send(f"info string unknown command {command}")
+        return True
+
+    def _set_option(self, args):
+        if "name" not in args:
+            return
+        value_at = args.index("value") if "value" in args else len(args)
+        name = " ".join(args[args.index("name") + 1:value_at])
+        value = " ".join(args[value_at + 1:])
+        if name not in OPTIONS:
+            self.send(f"info string unknown option {name}")
+            return
+        self._stop_search()
+        kind, _, low, high = OPTIONS[name]
+        if kind == "spin":
+            self.options[name] = max(low, min(high, int(value)))
+        else:
+            self.options[name] = value.lower() == "true"
+        if name == "Hash":
+            self.ai.close()
+            self.ai.tt = TranspositionTable(self.options["Hash"])
+        elif name == "Threads":
+            self.ai.close()
+            self.ai.threads = self.options["Threads"]
+            if self.ai.tt is None:
+                # closing the helpers drops their shared table
+                self.ai.tt = TranspositionTable(self.options["Hash"])
+
+    # a bad fen or move is reported and the old position is kept
+    def _set_position(self, args):
+        if not args:
+            return
+        try:
+            if args[0] == "startpos":
+                board = chess.Board()
+                rest = args[1:]
+            elif args[0] == "fen":
+                end = args.index("moves") if "moves" in args else len(args)
+                board = chess.Board(" ".join(args[1:end]))
+                rest = args[end:]
+            else:
+                self.send(f"info string unknown position {args[0]}")
+                return
+            if rest and rest[0] == "moves":
+                for uci in rest[1:]:
+                    board.push_uci(uci)
+        except ValueError as error:
+            self.send(f"info string bad position: {error}")
+            return
+        self.board = board
+
+    def _go(self, limits: dict):
+        ai = self.ai
+        clock = clock_manager(limits, self.board.turn == chess.WHITE)
+        if "movetime" in limits:
+            clock = TimeManager.fixed(max(0.0, limits["movetime"] / 1000.0 - ai.safety_margin))
+        ai.depth = min(limits.get("depth", UCI_MAX_DEPTH), UCI_MAX_DEPTH)
+        if "mate" in limits:
+            ai.depth = min(2 * limits["mate"] - 1, UCI_MAX_DEPTH)
+        # an asked for depth is searched as is, not moved by the branching heuristic
+        ai.fixed_depth = "depth" in limits or "mate" in limits
+        ai.max_nodes = limits.get("nodes")
+
+        self._stop.clear()
+        if limits.get("infinite") or limits.get("ponder"):
+            # the clock only starts on ponderhit
+            self._ponder_clock = clock if limits.get("ponder") else None
+            self._release.clear()
+            clock = None
+        else:
+            self._release.set()
+        board = self.board.copy()
+        self._search_thread = threading.Thread(target=self._search, args=(board, clock), daemon=True)
+        self._search_thread.start()
+
+    def _search(self, board: chess.Board, clock):
+        move = self.ai.choose_move(board, time_manager=clock)
+        ponder = None
+        if move is not None:
+            pv = self.ai.principal_variation(board, 2)
+            if len(pv) == 2 and pv[0] == move:
+                ponder = pv[1]
+        self._release.wait()
+        if move is None:
+            self.send("bestmove 0000")
+        else:
+            self.send(f"bestmove {move.uci()}" + (f" ponder {ponder.uci()}" if ponder else ""))
+
+    # the predicted move was played: the running search now runs on the clock
+    def _ponderhit(self):
+        if self._search_thread is None:
+            return
+        if self._ponder_clock is not None:
+            self._ponder_clock.start()
+            self.ai._time_manager = self._ponder_clock
+        self._ponder_clock = None
+        self._release.set()
+
+    def _stop_search(self):
+        if self._search_thread is None:
+            return
+        self._stop.set()
+        self._release.set()
+        self._search_thread.join()
+        self._search_thread = None
+        self._stop.clear()
+
+    def _send_info(self, info):
+        stats = info.stats
+        nodes = stats.total_nodes if stats is not None else info.nodes
+        seconds = max(info.elapsed, 1e-6)
+        line = (f"info depth {info.depth} score {format_score(info.score)} "
+                f"nodes {nodes} nps {int(nodes / seconds)} time {int(info.elapsed * 1000)}")
+        if stats is not None:
+            line = line.replace(" score", f" seldepth {stats.seldepth} score", 1)
+        if self.ai.tt is not None:
+            line += f" hashfull {self.ai.tt.hashfull()}"
+        if info.pv:
+            line += " pv " + " ".join(move.uci() for move in info.pv)
+        self.send(line)
+
+
+#drives "python3 uci.py" over pipes like a gui would, for scripted checks
+class UCIHarness():
+    def __init__(self, command=None):
+        self.proc = subprocess.Popen(command or [sys.executable, __file__], stdin=subprocess.PIPE,
+                                     stdout=subprocess.PIPE, text=True, bufsize=1)
+        self.lines = queue.Queue()
+        threading.Thread(target=self._read, daemon=True).start()
+
+    def _read(self):
+        for line in self.proc.stdout:
+            self.lines.put(line.rstrip("\n"))
+
+    def send(self, line: str):
+        self.proc.stdin.write(line + "\n")
+        self.proc.stdin.flush()
+
+    # lines up to and including the first one starting with prefix
+    def expect(self, prefix: str, timeout: float = 10.0):
+        seen = []
+        deadline = time.perf_counter() + timeout
+        while True:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                raise TimeoutError(f"no {prefix!r} after {seen[-5:]}")
+            try:
+                line = self.lines.get(timeout=remaining)
+            except queue.Empty:
+                continue
+            seen.append(line)
+            if line.startswith(prefix):
+                return seen
+
+    def quit(self, timeout: float = 10.0) -> int:
+        self.send("quit")
+        return self.proc.wait(timeout)
+
+
+def self_test():
+    engine = UCIHarness()
+    engine.send("uci")
+    engine.expect("uciok")
+    engine.send("setoption name Hash value 8")
+    engine.send("isready")
+    engine.expect("readyok")
+
+    engine.send("position startpos moves e2e4 e7e5")
+    engine.send("go depth 3")
+    lines = engine.expect("bestmove")
+    assert any(line.startswith("info depth 3") for line in lines), lines
+    print("go depth 3       ->", lines[-1])
+
+    # an explicit depth is kept on a position with many moves (46 legal here)
+    engine.send("position fen r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10")
+    engine.send("go depth 3")
+    lines = engine.expect("bestmove")
+    infos = [line for line in lines if line.startswith("info depth")]
+    assert infos[-1].startswith("info depth 3 "), infos
+    print("go depth 3 (46)  ->", lines[-1])
+
+    # malformed positions are reported, the engine keeps the last good one
+    engine.send("position startpos moves e2e4 e7e5")
+    engine.send("position startpos moves e2e5")
+    lines = engine.expect("info string")
+    engine.send("position fen not a fen")
+    lines += engine.expect("info string")
+    engine.send("d")
+    lines += engine.expect("fen ")
+    assert lines[-1] == "fen " + chess.Board("rnbqkbnr/pppp1ppp/8/4p3/4P3/8/PPPP1PPP/RNBQKBNR w KQkq - 0 2").fen(), lines
+    print("bad position     ->", lines[0])
+
+    engine.send("go infinite")
+    time.sleep(0.5)
+    engine.send("isready")
+    lines = engine.expect("readyok", timeout=2)
+    assert not any(line.startswith("bestmove") for line in lines), lines
+    start = time.perf_counter()
+    engine.send("stop")
+    lines = engine.expect("bestmove", timeout=2)
+    print(f"go infinite/stop -> {lines[-1]} ({time.perf_counter() - start:.2f}s after stop)")
+
+    engine.send("go ponder wtime 2000 btime 2000")
+    time.sleep(0.3)
+    engine.send("ponderhit")
+    start = time.perf_counter()
+    lines = engine.expect("bestmove", timeout=5)
+    print(f"go ponder/hit    -> {lines[-1]} ({time.perf_counter() - start:.2f}s after ponderhit)")
+
+    for go in ("go movetime 500", "go wtime 3000 btime 3000 winc 100 binc 100", "go nodes 2000"):
+        engine.send("position fen r4rk1/1pp1qppp/p1np1n2/2b1p1B1/2B1P1b1/P1NP1N2/1PP1QPPP/R4RK1 w - - 0 10")
+        start = time.perf_counter()
+        engine.send(go)
+        lines = engine.expect("bestmove", timeout=10)
+        print(f"{go:16s} -> {lines[-1]} ({time.perf_counter() - start:.2f}s)")
+
+    engine.send("position fen 8/8/8/4k3/8/8/8/4K2R w - - 0 1")
+    engine.send("go depth 3")
+    lines = engine.expect("bestmove")
+    assert "bestmove 0000" not in lines[-1], lines
+    engine.send("position fen 6k1/5ppp/8/8/8/8/8/3R2K1 w - - 0 1")
+    engine.send("go depth 3")
+    lines = engine.expect("bestmove")
+    assert any("score mate 1" in line for line in lines), lines
+    print("mate in 1        ->", lines[-1])
+    assert engine.quit() == 0
+    print("ok")
+
+
+if __name__ == "__main__":
+    if "--selftest" in sys.argv:
+        self_test()
+    else:
+        UCIEngine().run()